@@ -0,0 +1,328 @@
+# Async serving mode of main.py, an ASGI application.
+#
+# The I/O-bound routes (the TMDb proxies, /movie_page and /recommend with its IMDb scrape) are
+# served natively on the event loop with non-blocking upstream calls (services/async_http.py), so
+# a worker keeps hundreds of slow upstream requests in flight instead of one per thread. CPU-bound
+# work (similarity lookups, sentiment prediction, template rendering) runs in a thread pool of
+# ASGI_CPU_WORKERS threads, and every other route is handed to the Flask app unchanged, on a pool of
+# ASGI_WSGI_WORKERS threads.
+#
+# Run from the repository root:
+#     uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qsl
+
+from werkzeug.exceptions import BadRequestKeyError, InternalServerError
+
+import main
+from services import async_http
+from services import metrics
+from services.movie_page import build_movie_page_async
+from services.reviews import get_reviews_async
+
+
+# threads for the CPU-bound parts of the native routes
+ASGI_CPU_WORKERS = int(os.environ.get('ASGI_CPU_WORKERS', os.cpu_count() or 1))
+
+cpu_executor = ThreadPoolExecutor(ASGI_CPU_WORKERS, thread_name_prefix='asgi-cpu')
+
+# threads running the other routes through the Flask app, one per request in progress
+ASGI_WSGI_WORKERS = int(os.environ.get('ASGI_WSGI_WORKERS', 16))
+
+wsgi_executor = ThreadPoolExecutor(ASGI_WSGI_WORKERS, thread_name_prefix='asgi-wsgi')
+
+NOT_FOUND_ERROR = ('Oops! The movie you requested is not in our records. '
+                   'Please make sure the spelling is correct or try with some other movies')
+INTERNAL_ERROR = 'An error occurred while processing the request'
+
+
+class Request:
+    """
+    The parts of an ASGI http request the native routes use.
+    """
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.root_path = scope.get('root_path', '')
+        self.scheme = scope.get('scheme', 'http')
+        self.query = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+    def form(self):
+        # like request.form[...], the first value of a repeated field
+        form = {}
+        for name, value in parse_qsl(self.body.decode('utf-8'), keep_blank_values=True):
+            form.setdefault(name, value)
+        return form
+
+
+def json_response(payload, status=200):
+    # the response jsonify builds, so both serving modes return the same bytes
+    return status, 'application/json', main.app.json.response(payload).get_data()
+
+
+def run_cpu(fn, *args):
+    """
+    Await fn(*args) run in the CPU thread pool.
+    """
+    return asyncio.get_running_loop().run_in_executor(cpu_executor, fn, *args)
+
+
+async def proxy(request):
+    params_dict = json.loads(request.query['params'])
+    url = params_dict['URL']
+    params_dict['api_key'] = main.API_KEY
+    return json_response(await async_http.get_json(url, params=params_dict))
+
+
+async def movie_id(request):
+    data = request.json()
+    params = {'api_key': main.API_KEY, 'query': data[0].get('query')}
+    return json_response(await async_http.get_json(data[0].get('URL'), params=params))
+
+
+async def tmdb_url(request):
+    # /MovieCastes and /CastesDetails: the TMDb url posted by the browser, with the api key added
+    data = request.json()
+    return json_response(await async_http.get_json(data[0].get('URL'), {'api_key': main.API_KEY}))
+
+
+async def similar(request):
+    title = request.json()[0].get('query')
+    similar_movies = await run_cpu(main.live_recommender.current().recommender.similar, title, 10)
+    if similar_movies is None:
+        return json_response({'error': NOT_FOUND_ERROR}, 404)
+    return json_response(similar_movies[:10])
+
+
+async def movie_page(request):
+    title = request.json()[0].get('query')
+    similar_movies = await run_cpu(main.live_recommender.current().recommender.similar, title, 10)
+    if similar_movies is None:
+        return json_response({'error': NOT_FOUND_ERROR}, 404)
+
+    page = await build_movie_page_async(title, similar_movies, main.sentiment, main.API_KEY, cpu_executor)
+    if page is None:
+        return json_response({'error': 'The movie you requested was not found on TMDb'}, 404)
+    return json_response(page)
+
+
+def bad_request(key):
+    # the response Flask gives for a missing request.form[key]
+    error = BadRequestKeyError(key)
+    return error.code, 'text/html; charset=utf-8', error.get_body().encode('utf-8')
+
+
+def internal_server_error():
+    # the response Flask gives for an exception its view lets through
+    error = InternalServerError()
+    return error.code, 'text/html; charset=utf-8', error.get_body().encode('utf-8')
+
+
+def url_builder(request):
+    """
+    url_for of the templates for this request: urls of the app's endpoints, relative to its root path.
+    """
+    adapter = main.app.url_map.bind(request.headers.get('host', 'localhost'), script_name=request.root_path or '/',
+                                    url_scheme=request.scheme)
+    return lambda endpoint, **values: adapter.build(endpoint, values)
+
+
+async def recommend(request):
+    form = request.form()
+    if 'imdb_id' not in form:
+        return bad_request('imdb_id')
+    imdb_id = form['imdb_id']
+    reviews_list = await get_reviews_async(imdb_id)
+
+    def render():
+        reviews_status, _ = main.sentiment.predict(reviews_list, title_id=imdb_id)
+        try:
+            context = main.recommend_context(form, reviews_list, reviews_status)
+        except KeyError as e:
+            return bad_request(e.args[0])
+        return 200, 'text/html; charset=utf-8', main.render_recommend_page(context, url_builder(request)).encode('utf-8')
+
+    return await run_cpu(render)
+
+
+# (method, path) -> native handler, returning (status, content type, body)
+ROUTES = {
+    ('GET', '/proxy'): proxy,
+    ('POST', '/similar'): similar,
+    ('POST', '/movie_id'): movie_id,
+    ('POST', '/MovieCastes'): tmdb_url,
+    ('POST', '/CastesDetails'): tmdb_url,
+    ('POST', '/movie_page'): movie_page,
+    ('POST', '/recommend'): recommend,
+}
+
+
+# native routes whose Flask view has no error handling of its own: an exception gets Flask's HTML
+# 500 page instead of the JSON error of the other routes
+UNHANDLED_ERRORS = {('GET', '/proxy'), ('POST', '/CastesDetails'), ('POST', '/recommend')}
+
+
+def native_handler(scope):
+    handler = ROUTES.get((scope['method'], scope['path']))
+    if handler is recommend:
+        # multipart forms are left to Flask's form parser
+        content_type = dict(scope['headers']).get(b'content-type', b'')
+        if not content_type.startswith(b'application/x-www-form-urlencoded'):
+            return None
+    return handler
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError('client disconnected')
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def serve(handler, scope, receive, send):
+    start = time.perf_counter()
+    try:
+        status, content_type, body = await handler(Request(scope, await read_body(receive)))
+    except ConnectionResetError:
+        return
+    except Exception as e:
+        if (scope['method'], scope['path']) in UNHANDLED_ERRORS:
+            main.app.logger.error(f"Exception on {scope['path']} [{scope['method']}]", exc_info=e)
+            status, content_type, body = internal_server_error()
+        else:
+            # Handle any exceptions gracefully
+            print(f"Error in {scope['path']} route:", e)
+            status, content_type, body = json_response({'error': INTERNAL_ERROR}, 500)
+
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type.encode('latin-1')),
+                            (b'content-length', str(len(body)).encode('latin-1'))]})
+    await send({'type': 'http.response.body', 'body': body})
+    metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, scope['path'], scope['method'], str(status))
+
+
+def wsgi_environ(scope, body):
+    """
+    The WSGI environ of an ASGI http request whose body has been read.
+    """
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('',))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+def run_wsgi(environ, send):
+    """
+    Run the Flask app on environ, in a worker thread, passing its response to send as ASGI messages
+    chunk by chunk (/similar/batch streams its results).
+    """
+    start = {'type': 'http.response.start'}
+    started = False
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        start['status'] = int(status.split(' ', 1)[0])
+        start['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    output = main.app(environ, start_response)
+    try:
+        for chunk in output:
+            if not started:
+                started = True
+                send(start)
+            send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        if hasattr(output, 'close'):
+            output.close()
+    if not started:
+        send(start)
+    send({'type': 'http.response.body'})
+
+
+async def wsgi_fallback(scope, receive, send):
+    # Flask is thread safe: each request runs on a thread of the pool, its sends scheduled back on
+    # the event loop (asgiref's WsgiToAsgi would run them all on one shared thread, one at a time)
+    try:
+        body = await read_body(receive)
+    except ConnectionResetError:
+        return
+    loop = asyncio.get_running_loop()
+
+    def send_from_thread(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    await loop.run_in_executor(wsgi_executor, run_wsgi, wsgi_environ(scope, body), send_from_thread)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_http.aclose()
+            cpu_executor.shutdown(wait=False)
+            wsgi_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def reject_websocket(receive, send):
+    # the app has no websocket routes: close the connection at the handshake (the server answers 403)
+    message = await receive()
+    if message['type'] == 'websocket.connect':
+        await send({'type': 'websocket.close', 'code': 1000})
+
+
+async def app(scope, receive, send):
+    """
+    The ASGI application: native async routes, everything else through the Flask app.
+    """
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'websocket':
+        return await reject_websocket(receive, send)
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+    handler = native_handler(scope)
+    if handler is None:
+        return await wsgi_fallback(scope, receive, send)
+    return await serve(handler, scope, receive, send)
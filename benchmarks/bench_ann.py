@@ -0,0 +1,74 @@
+"""
+Recall@10 vs. latency of the similarity engines behind `/similar`.
+
+For every catalog size the exact engine and the IVF engine at several nprobe values build the full
+neighbour table (what build_recommender does) and answer single-title queries. Their top 10 is
+compared against sklearn's cosine_similarity over the whole catalog. The synthetic catalogs have many
+tied scores, so a result counts as a hit when its score reaches the baseline's 10th best score.
+
+Run from the repository root:
+    python -m benchmarks.bench_ann --sizes 5000 20000 100000 --nprobe 1 2 4 8 16
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from benchmarks.bench_similar import synthetic_catalog
+from recommender.engines import make_engine
+from recommender.index import top_k
+
+
+def baseline_kth(count_matrix, queries, n=10):
+    """
+    10th best cosine_similarity score of every query, excluding the title itself.
+    """
+    kth = np.empty(len(queries), dtype=np.float32)
+    for i, row in enumerate(queries):
+        scores = cosine_similarity(count_matrix[row], count_matrix)[0]
+        scores[row] = -np.inf
+        kth[i] = top_k(scores, n)[1][-1]
+    return kth
+
+
+def recall(scores, kth, n=10):
+    return float(np.mean(scores[:, :n] >= kth[:, None] - 1e-5))
+
+
+def run_engine(name, count_matrix, queries, kth, k, **params):
+    start = time.perf_counter()
+    engine = make_engine(name, count_matrix, **params)
+    indices, scores = engine.search(np.arange(count_matrix.shape[0]), k)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in queries:
+        engine.search(np.array([row]), 10)
+    query_ms = (time.perf_counter() - start) / len(queries) * 1000
+    return recall(scores[queries], kth), build, query_ms
+
+
+def run(sizes, nprobes, n_queries, k):
+    print(f"{'rows':>8} {'engine':>12} {'recall@10':>10} {'table s':>8} {'query ms':>9}")
+    for n_rows in sizes:
+        data = synthetic_catalog(n_rows)
+        count_matrix = CountVectorizer().fit_transform(data['all_info'])
+        queries = np.random.default_rng(0).choice(n_rows, min(n_queries, n_rows), replace=False)
+        kth = baseline_kth(count_matrix, queries)
+
+        configs = [('exact', 'exact', {})] + [(f'ivf/{nprobe}', 'ivf', {'nprobe': nprobe}) for nprobe in nprobes]
+        for label, name, params in configs:
+            hit_ratio, build, query_ms = run_engine(name, count_matrix, queries, kth, k, **params)
+            print(f"{n_rows:>8} {label:>12} {hit_ratio:>10.3f} {build:>8.2f} {query_ms:>9.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000])
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=50, help='neighbours kept per title in the table')
+    args = parser.parse_args()
+    run(args.sizes, args.nprobe, args.queries, args.k)
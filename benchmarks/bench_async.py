@@ -0,0 +1,125 @@
+"""
+Load test of the blocking (WSGI) and async (ASGI) serving modes against a slow stubbed TMDb.
+
+Three processes: a stub upstream answering every GET after --latency-ms, the app under test, and
+this load driver keeping --clients requests in flight for --seconds. Every request posts a
+distinct TMDb url to /MovieCastes, so neither the response cache nor single-flight can absorb it.
+The app runs one process in either mode:
+  wsgi  main.app on a server with a fixed pool of --threads threads (like gunicorn --threads)
+  asgi  asgi:app under uvicorn, upstream calls non-blocking on the event loop
+
+For each mode it reports throughput, p50/p95/p99 latency, and the largest number of requests the
+stub saw in flight at once, i.e. the concurrent upstream connections one process sustained.
+
+The app is started on a synthetic catalog of --rows titles (and the sentiment model in artifact/),
+with the harness of benchmarks/load.py.
+Run from the repository root:
+    python -m benchmarks.bench_async --clients 200 --latency-ms 200 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.load import REPO, drive, free_port, http_get, prepare_workdir, serve_app, wait_for
+from benchmarks.stub_server import StubHandler, StubServer
+
+
+class TrackingHandler(StubHandler):
+    """
+    The stub TMDb handler, also tracking the peak number of requests in flight (GET /__stats,
+    GET /__stats/reset to start a new peak).
+    """
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith('/__stats'):
+            if self.path == '/__stats/reset':
+                with server.lock:
+                    server.peak_in_flight = server.in_flight
+            body = json.dumps({'requests': server.requests, 'peak_in_flight': server.peak_in_flight}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        with server.lock:
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+        try:
+            super().do_GET()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+def serve_stub(port, latency_ms):
+    stub = StubServer(TrackingHandler, latency_ms=latency_ms, port=port, backlog=4096)
+    stub.httpd.in_flight = stub.httpd.peak_in_flight = 0
+    stub.httpd.serve_forever()
+
+
+def credits_request(upstream):
+    # a distinct TMDb url per request
+    def next_request(worker_id, i):
+        return 'POST', '/MovieCastes', {'json': [{'URL': f'{upstream}/3/movie/{worker_id}-{i}/credits'}]}
+    return next_request
+
+
+def run(clients, latency_ms, seconds, threads, rows):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = prepare_workdir(workdir, rows, build_artifact=False)
+
+        stub_port = free_port()
+        upstream = f'http://127.0.0.1:{stub_port}'
+        stub = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_async', '--serve-stub', str(stub_port),
+                                 '--latency-ms', str(latency_ms)], cwd=REPO)
+        try:
+            wait_for(f'{upstream}/__stats')
+            print(f"{clients} clients for {seconds:.0f}s, {latency_ms:.0f} ms upstream latency, one app process")
+            print(f"{'mode':<18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'peak upstream':>14}")
+            for mode in ['wsgi', 'asgi']:
+                port = free_port()
+                app = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_async', '--serve-app', mode,
+                                        '--port', str(port), '--threads', str(threads), '--workdir', workdir],
+                                       cwd=REPO, env=env, stdout=subprocess.DEVNULL)
+                try:
+                    wait_for(f'http://127.0.0.1:{port}/metrics')
+                    http_get(f'{upstream}/__stats/reset')
+                    latencies, errors, elapsed = asyncio.run(drive(f'http://127.0.0.1:{port}', credits_request(upstream),
+                                                                   clients, seconds))
+                    peak = http_get(f'{upstream}/__stats')['peak_in_flight']
+                finally:
+                    app.terminate()
+                    app.wait()
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+                label = f'{mode} ({threads} threads)' if mode == 'wsgi' else f'{mode} (event loop)'
+                print(f"{label:<18} {len(latencies) / elapsed:8.1f} {p50:8.0f} {p95:8.0f} {p99:8.0f} {errors:7d} "
+                      f"{peak:14d}")
+        finally:
+            stub.terminate()
+            stub.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200, help='requests kept in flight by the load driver')
+    parser.add_argument('--latency-ms', type=float, default=200, help='stub upstream response latency')
+    parser.add_argument('--seconds', type=float, default=10, help='duration of each run')
+    parser.add_argument('--threads', type=int, default=8, help='request threads of the wsgi server')
+    parser.add_argument('--rows', type=int, default=5000, help='titles in the synthetic catalog')
+    parser.add_argument('--serve-stub', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--serve-app', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve_stub:
+        serve_stub(args.serve_stub, args.latency_ms)
+    elif args.serve_app:
+        serve_app(args.serve_app, args.port, args.threads, args.workdir)
+    else:
+        run(args.clients, args.latency_ms, args.seconds, args.threads, args.rows)
@@ -0,0 +1,73 @@
+"""
+Write/read throughput and on-disk size of the response cache with its SQLite backend.
+
+Writes --writes distinct entries of --value-bytes through a ResponseCache whose backend is capped at
+--disk-max-entries rows, reports sets/s and gets/s, and checks that the file stays within its caps
+(expired rows purged, oldest rows evicted) and that clear() empties both the memory and the disk level.
+
+Run from the repository root:
+    python -m benchmarks.bench_cache --writes 20000 --disk-max-entries 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from services.cache import ResponseCache, SQLiteBackend
+
+
+def run(writes, value_bytes, disk_max_entries, prune_every):
+    value = b'x' * value_bytes
+    disk_max_bytes = disk_max_entries * value_bytes // 2
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.sqlite')
+        backend = SQLiteBackend(path, max_entries=disk_max_entries, max_bytes=disk_max_bytes, prune_every=prune_every)
+        cache = ResponseCache(max_entries=1000, backend=backend)
+
+        # a batch of short-lived entries, expired by the time the writes below prune
+        for i in range(prune_every):
+            cache.set(f'expiring/{i}', value, ttl=0.01)
+        time.sleep(0.05)
+
+        start = time.perf_counter()
+        for i in range(writes):
+            cache.set(f'key/{i}', value)
+        set_rate = writes / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        hits = sum(backend.get(f'key/{i}') is not None for i in range(writes - 1000, writes))
+        get_rate = 1000 / (time.perf_counter() - start)
+
+        backend.prune()
+        disk = backend.stats()
+        expired_left = backend._connection().execute(
+            "SELECT COUNT(*) FROM responses WHERE key LIKE 'expiring/%'").fetchone()[0]
+        print(f"{writes} writes of {value_bytes} bytes: {set_rate:9.0f} sets/s, {get_rate:9.0f} backend gets/s")
+        print(f"on disk: {disk['entries']} rows, {disk['bytes'] / 2 ** 20:.1f} MB "
+              f"(caps {disk_max_entries} rows, {disk_max_bytes / 2 ** 20:.1f} MB), {hits}/1000 newest keys found")
+
+        cache.clear()
+        cleared = cache.get('key/0') is None and cache.stats()['entries'] == 0 and backend.stats()['entries'] == 0
+
+    failures = []
+    if disk['entries'] > disk_max_entries or disk['bytes'] > disk_max_bytes:
+        failures.append('the SQLite file exceeds its caps')
+    if expired_left:
+        failures.append(f'{expired_left} expired rows were not purged')
+    if hits != min(1000, disk['entries']):
+        failures.append('the newest entries were evicted before older ones')
+    if not cleared:
+        failures.append('clear() left entries behind')
+    if failures:
+        raise SystemExit('; '.join(failures))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writes', type=int, default=20000, help='distinct entries written')
+    parser.add_argument('--value-bytes', type=int, default=2048, help='size of each cached value')
+    parser.add_argument('--disk-max-entries', type=int, default=5000, help='row cap of the SQLite file '
+                                                                           '(the byte cap is half as many values)')
+    parser.add_argument('--prune-every', type=int, default=256, help='writes between two prunes')
+    args = parser.parse_args()
+    run(args.writes, args.value_bytes, args.disk_max_entries, args.prune_every)
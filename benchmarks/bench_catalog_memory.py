@@ -0,0 +1,82 @@
+"""
+Resident memory of the catalog a worker keeps for title lookups.
+
+Each representation is loaded in a fresh child process and the RSS growth is reported:
+  dataframe  the original global `data` DataFrame (every column as object-dtype strings)
+  catalog    titles as a StringTable (one UTF-8 buffer + offsets) plus the TitleIndex hash table,
+             all_info and the name/genre columns dropped after reading
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog_memory --rows 200000
+    python -m benchmarks.bench_catalog_memory --data ./data/final_data.csv
+"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from benchmarks.bench_similar import synthetic_catalog
+from recommender.index import TitleIndex
+from recommender.strings import StringTable
+from services.memory import rss_bytes
+
+
+def load(mode, path):
+    if mode == 'dataframe':
+        data = pd.read_csv(path)
+        return data, list(data['movie_title'].str.capitalize())
+
+    data = pd.read_csv(path, usecols=['movie_title'])
+    titles = StringTable.from_strings(data['movie_title'])
+    del data
+    return titles, TitleIndex(titles)
+
+
+def child(mode, path):
+    gc.collect()
+    before = rss_bytes()
+    catalog = load(mode, path)
+    gc.collect()
+    print(rss_bytes() - before)
+    return catalog
+
+
+def run(path, rows):
+    tmp = None
+    if path is None:
+        tmp = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        data = synthetic_catalog(rows)
+        for column in ['director_name', 'actor_1_name', 'actor_2_name', 'actor_3_name', 'genres']:
+            data[column] = data['all_info'].str.split().str[0]
+        data.to_csv(tmp.name, index=False)
+        path = tmp.name
+
+    try:
+        results = {}
+        for mode in ['dataframe', 'catalog']:
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_catalog_memory', '--child', mode,
+                                  '--data', path], capture_output=True, text=True, check=True)
+            results[mode] = int(out.stdout.strip().splitlines()[-1])
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+    for mode, growth in results.items():
+        print(f"{mode:>10}: {growth / 2 ** 20:8.1f} MB RSS")
+    print(f"catalog uses {results['catalog'] / results['dataframe']:.0%} of the DataFrame's resident size")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', help='final_data.csv to load, a synthetic catalog is generated when omitted')
+    parser.add_argument('--rows', type=int, default=200000, help='rows of the synthetic catalog')
+    parser.add_argument('--child', choices=['dataframe', 'catalog'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.data)
+    else:
+        run(args.data, args.rows)
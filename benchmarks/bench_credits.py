@@ -0,0 +1,124 @@
+"""
+Benchmark of the credits extraction in preprocess.utils.process_merged_df.
+
+Compares the original path (ast.literal_eval of the genres, cast and crew columns, then one
+Python lambda per extracted column) with the single-pass regex parser parse_credits, and checks
+that both produce the same values, also on records with empty names.
+
+Run from the repository root, on the real Kaggle files:
+    python -m benchmarks.bench_credits --metadata ../data/movies_metadata.csv --credits ../data/credits.csv
+or on a synthetic credits table of the same shape:
+    python -m benchmarks.bench_credits --rows 45000
+"""
+import argparse
+import ast
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocess.utils import parse_credits
+
+
+FIRST = ['Tom', 'Anna', "D'Arcy", 'José', 'Mei', 'John', 'Lupita', 'Sean', 'Zoë', 'Ken']
+LAST = ['Hanks', "O'Brien", 'Nyong\'o', 'Smith', 'Müller', 'Watanabe', 'Connery', 'Kahn', 'Doe', 'Li']
+GENRES = ['Action', 'Drama', 'Comedy', 'Science Fiction', 'Thriller', 'Romance', 'Animation', 'Family']
+JOBS = ['Screenplay', 'Producer', 'Editor', 'Original Music Composer', 'Director of Photography', 'Casting']
+
+
+def synthetic_credits(n_rows, seed=42):
+    """
+    Genres, cast and crew columns formatted like movies_metadata.csv / credits.csv (python-repr'd lists of dicts).
+    """
+    rng = random.Random(seed)
+
+    def name():
+        return f'{rng.choice(FIRST)} {rng.choice(LAST)}'
+
+    genres, cast, crew = [], [], []
+    for _ in range(n_rows):
+        genres.append(repr([{'id': rng.randint(1, 99), 'name': g} for g in rng.sample(GENRES, rng.randint(0, 3))]))
+        cast.append(repr([{'cast_id': i, 'character': name(), 'credit_id': '52fe4284c3a36847f8024f49',
+                           'gender': rng.randint(0, 2), 'id': rng.randint(1, 10 ** 6), 'name': name(), 'order': i,
+                           'profile_path': '/pQFoyx7rp09CJTAb932F2g8Nlho.jpg'} for i in range(rng.randint(0, 25))]))
+        members = [{'credit_id': '52fe4284c3a36847f8024f4f', 'department': 'Writing', 'gender': 0,
+                    'id': rng.randint(1, 10 ** 6), 'job': rng.choice(JOBS), 'name': name(), 'profile_path': None}
+                   for _ in range(rng.randint(0, 40))]
+        if members and rng.random() < 0.9:
+            members.insert(rng.randrange(len(members)), {
+                'credit_id': '52fe4284c3a36847f8024f55', 'department': 'Directing', 'gender': 2,
+                'id': rng.randint(1, 10 ** 6), 'job': 'Director', 'name': name(), 'profile_path': None})
+        crew.append(repr(members))
+    return pd.Series(genres), pd.Series(cast), pd.Series(crew)
+
+
+def legacy(genres, cast, crew):
+    """The original literal_eval + lambda extraction."""
+    genres = genres.map(ast.literal_eval)
+    cast = cast.map(ast.literal_eval)
+    crew = crew.map(ast.literal_eval)
+    return pd.DataFrame({
+        'genres': genres.apply(lambda x: ' '.join([genre.get('name', '') for genre in x]) or np.nan),
+        'actor_1_name': cast.apply(lambda x: x[0]['name'] if x and len(x) > 0 else np.nan),
+        'actor_2_name': cast.apply(lambda x: x[1]['name'] if x and len(x) > 1 else np.nan),
+        'actor_3_name': cast.apply(lambda x: x[2]['name'] if x and len(x) > 2 else np.nan),
+        'director_name': crew.apply(lambda x: next(
+            (member['name'] for member in x if member.get('job') == 'Director'), np.nan)),
+    })
+
+
+def load_real(metadata_path, credits_path):
+    metadata = pd.read_csv(metadata_path, usecols=['id', 'genres'], low_memory=False)
+    metadata['id'] = pd.to_numeric(metadata['id'], errors='coerce')
+    metadata = metadata.dropna(subset=['id']).astype({'id': 'int64'})
+    merged = pd.merge(metadata, pd.read_csv(credits_path), on='id', how='inner')
+    return merged['genres'], merged['cast'], merged['crew']
+
+
+def empty_names():
+    """
+    Records with empty names (genre, actor, director), which literal_eval keeps as ''.
+    """
+    genres = pd.Series([repr([{'id': 18, 'name': ''}, {'id': 35, 'name': 'Comedy'}]), repr([{'id': 18, 'name': ''}])])
+    cast = pd.Series([repr([{'id': 1, 'name': ''}, {'id': 2, 'name': 'Anna Li'}]), repr([{'id': 1, 'name': ""}])])
+    crew = pd.Series([repr([{'id': 3, 'job': 'Director', 'name': ''}]), repr([])])
+    return genres, cast, crew
+
+
+def differing_rows(columns):
+    expected = legacy(*columns)
+    got = parse_credits(*columns)
+    return int((expected.fillna('<nan>') != got[expected.columns].fillna('<nan>')).any(axis=1).sum())
+
+
+def run(columns):
+    start = time.perf_counter()
+    expected = legacy(*columns)
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = parse_credits(*columns)
+    new = time.perf_counter() - start
+
+    mismatches = int((expected.fillna('<nan>') != got[expected.columns].fillna('<nan>')).any(axis=1).sum())
+    print(f"{len(expected)} rows")
+    print(f"literal_eval + lambdas: {old:7.2f}s")
+    print(f"parse_credits:          {new:7.2f}s  ({old / new:.1f}x faster)")
+    print(f"rows that differ:       {mismatches}")
+
+    # regression case: empty names must stay '' instead of becoming NaN
+    if differing_rows(empty_names()):
+        raise SystemExit("parse_credits differs from literal_eval on records with empty names")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--metadata', help='movies_metadata.csv')
+    parser.add_argument('--credits', help='credits.csv')
+    parser.add_argument('--rows', type=int, default=45000, help='rows of the synthetic table')
+    args = parser.parse_args()
+    if args.metadata and args.credits:
+        run(load_real(args.metadata, args.credits))
+    else:
+        run(synthetic_credits(args.rows))
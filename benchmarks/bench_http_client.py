@@ -0,0 +1,54 @@
+"""
+Per-page-load latency of the TMDb proxy calls: module-level requests.get vs the pooled session.
+
+One movie page issues roughly 33 upstream calls (movie search and details, credits, one bio per
+cast member, a search and details call per recommended title). The stub server delays every new
+connection by --handshake-ms to stand in for the DNS + TCP + TLS setup of a cold TMDb call.
+
+Run from the repository root:
+    python -m benchmarks.bench_http_client --pages 10 --handshake-ms 30
+"""
+import argparse
+import time
+
+import requests
+
+from benchmarks.stub_server import StubServer
+from services.http_client import create_session
+
+CALLS_PER_PAGE = 33
+
+
+def page_load(get, base_url):
+    for i in range(CALLS_PER_PAGE):
+        get(f'{base_url}/3/movie/{i}', params={'api_key': 'stub'}).json()
+
+
+def run(pages, handshake_ms, latency_ms):
+    with StubServer(handshake_ms=handshake_ms, latency_ms=latency_ms) as server:
+        start = time.perf_counter()
+        for _ in range(pages):
+            page_load(requests.get, server.url)
+        plain = (time.perf_counter() - start) / pages
+        plain_connections = server.connections
+
+        session = create_session()
+        start = time.perf_counter()
+        for _ in range(pages):
+            page_load(lambda url, params: session.get(url, params=params, timeout=5), server.url)
+        pooled = (time.perf_counter() - start) / pages
+        pooled_connections = server.connections - plain_connections
+
+    print(f"{CALLS_PER_PAGE} upstream calls per page, {pages} pages, handshake {handshake_ms} ms")
+    print(f"requests.get:   {plain * 1000:8.1f} ms/page  {plain_connections:5d} connections")
+    print(f"pooled session: {pooled * 1000:8.1f} ms/page  {pooled_connections:5d} connections")
+    print(f"saved per page: {(plain - pooled) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--handshake-ms', type=float, default=30, help='delay per new connection')
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay per response')
+    args = parser.parse_args()
+    run(args.pages, args.handshake_ms, args.latency_ms)
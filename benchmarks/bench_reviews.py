@@ -0,0 +1,118 @@
+"""
+Benchmark of the IMDb review extraction behind /recommend and /movie_page.
+
+Compares the original path (whole page in memory, full BeautifulSoup lxml tree, find_all) with the
+streaming extract_reviews over the same page fed in 16 KB chunks, reading the whole page and
+stopping after --limit reviews, and checks that they return the same reviews.
+
+Run from the repository root, on saved reviews pages:
+    python -m benchmarks.bench_reviews --fixtures 'fixtures/imdb/*.html'
+or on synthetic pages shaped like IMDb's (scripts, navigation and 25 review blocks, some with <br>):
+    python -m benchmarks.bench_reviews --pages 20
+"""
+import argparse
+import glob
+import html
+import random
+import time
+
+import bs4 as bs
+
+from services.reviews import CHUNK_SIZE, REVIEW_CLASS, extract_reviews
+
+
+WORDS = ('the movie plot acting was great terrible brilliant boring scene director cast story ending '
+         'music camera character performance film watch again never loved hated & "quoted" <3').split()
+
+
+def imdb_reviews_page(n_reviews=25, seed=0):
+    """
+    HTML of a synthetic IMDb reviews page, about the size and markup density of the real one.
+    """
+    rng = random.Random(seed)
+
+    def text(n_words):
+        return html.escape(' '.join(rng.choice(WORDS) for _ in range(n_words)))
+
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>User Reviews</title>',
+             '<script>' + 'window.IMDbTracking={"a":1};' * 4000 + '</script>',
+             '<link rel="stylesheet" href="/css/site.css"></head><body><div id="wrapper"><nav>',
+             ''.join(f'<div class="nav-item"><a href="/chart/{i}">{text(2)}</a></div>' for i in range(150)),
+             '</nav><div class="lister-list">']
+    for i in range(n_reviews):
+        paragraphs = [text(rng.randint(30, 120)) for _ in range(rng.choice([1, 1, 1, 2, 3]))]
+        parts.append(
+            f'<div class="lister-item mode-detail imdb-user-review collapsable" data-review-id="rw{i}">'
+            f'<div class="review-container"><div class="lister-item-content">'
+            f'<div class="ipl-ratings-bar"><span class="rating-other-user-rating"><span>{rng.randint(1, 10)}'
+            f'</span><span class="point-scale">/10</span></span></div>'
+            f'<a href="/review/rw{i}/" class="title"> {text(6)}</a>'
+            f'<div class="display-name-date"><span class="display-name-link"><a href="/user/ur{i}/">user{i}</a>'
+            f'</span><span class="review-date">1 January 2020</span></div>'
+            f'<div class="content"><div class="{REVIEW_CLASS}">{"<br/><br/>".join(paragraphs)}</div>'
+            f'<div class="actions text-muted">{rng.randint(0, 900)} out of {rng.randint(900, 2000)} '
+            f'found this helpful.</div></div></div></div></div>')
+    parts.append('</div><footer>' + text(200) + '</footer>' + '<script>var x=1;</script>' * 50 + '</div></body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def legacy(page):
+    """The original BeautifulSoup extraction."""
+    soup = bs.BeautifulSoup(page, 'lxml')
+    soup_result = soup.find_all("div", {"class": "text show-more__control"})
+    return [str(reviews.string) for reviews in soup_result if reviews.string]
+
+
+def chunked(page):
+    return [page[i:i + CHUNK_SIZE] for i in range(0, len(page), CHUNK_SIZE)]
+
+
+def streaming(page, limit=None):
+    """extract_reviews over the page in CHUNK_SIZE pieces, also returning the bytes it consumed."""
+    chunks = chunked(page)
+    consumed = []
+
+    def feed():
+        for chunk in chunks:
+            consumed.append(len(chunk))
+            yield chunk
+    return extract_reviews(feed(), limit), sum(consumed)
+
+
+def time_per_page(fn, pages):
+    start = time.perf_counter()
+    for page in pages:
+        fn(page)
+    return (time.perf_counter() - start) / len(pages) * 1000
+
+
+def run(pages, limit):
+    size = sum(map(len, pages)) / len(pages)
+    mismatches = sum(legacy(page) != streaming(page)[0] for page in pages)
+    read = sum(streaming(page, limit)[1] for page in pages) / len(pages)
+
+    old = time_per_page(legacy, pages)
+    full = time_per_page(streaming, pages)
+    limited = time_per_page(lambda page: streaming(page, limit), pages)
+    print(f"{len(pages)} pages, {size / 1024:.0f} KB on average")
+    print(f"BeautifulSoup tree + find_all:   {old:7.2f} ms/page")
+    print(f"streaming, whole page:           {full:7.2f} ms/page  ({old / full:.1f}x faster)")
+    print(f"streaming, first {limit:<3} reviews:    {limited:7.2f} ms/page  ({old / limited:.1f}x faster, "
+          f"{read / size:.0%} of the page read)")
+    print(f"pages with different reviews:    {mismatches}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', help='glob of saved IMDb reviews pages')
+    parser.add_argument('--pages', type=int, default=20, help='number of synthetic pages')
+    parser.add_argument('--limit', type=int, default=10, help='reviews kept by the early-stopping run')
+    args = parser.parse_args()
+    if args.fixtures:
+        fixtures = []
+        for path in sorted(glob.glob(args.fixtures)):
+            with open(path, 'rb') as f:
+                fixtures.append(f.read())
+    else:
+        fixtures = [imdb_reviews_page(seed=seed) for seed in range(args.pages)]
+    run(fixtures, args.limit)
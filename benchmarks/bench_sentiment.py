@@ -0,0 +1,68 @@
+"""
+Throughput benchmark for review sentiment inference.
+
+Compares the original per-review loop (one vectorizer.transform + clf.predict per review)
+with one batched SentimentClassifier.predict call, using the pickled artifacts.
+
+Run from the repository root:
+    python -m benchmarks.bench_sentiment --reviews 25 --repeat 20
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from services.sentiment import MODEL_PATH, TRANSFORM_PATH, SentimentClassifier
+
+
+def synthetic_reviews(vectorizer, n_reviews, words_per_review=120, seed=42):
+    """
+    Random reviews drawn from the vectorizer vocabulary, about the length of an IMDb user review.
+    """
+    rng = random.Random(seed)
+    vocabulary = list(vectorizer.vocabulary_)
+    return [' '.join(rng.choices(vocabulary, k=words_per_review)) for _ in range(n_reviews)]
+
+
+def per_review(vectorizer, clf, reviews):
+    """The original loop from recommend()."""
+    status = []
+    for review in reviews:
+        movie_review_list = np.array([review])
+        movie_vector = vectorizer.transform(movie_review_list)
+        status.append(clf.predict(movie_vector))
+    return status
+
+
+def run(n_reviews, repeat):
+    sentiment = SentimentClassifier.load(TRANSFORM_PATH, MODEL_PATH)
+    reviews = synthetic_reviews(sentiment.vectorizer, n_reviews)
+
+    # warm up both paths once
+    per_review(sentiment.vectorizer, sentiment.clf, reviews[:1])
+    sentiment.predict(reviews[:1])
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        per_review(sentiment.vectorizer, sentiment.clf, reviews)
+    looped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sentiment.predict(reviews)
+    batched = time.perf_counter() - start
+
+    total = n_reviews * repeat
+    print(f"{n_reviews} reviews per page, {repeat} pages")
+    print(f"per-review: {total / looped:10.0f} reviews/s  {looped / repeat * 1000:8.2f} ms/page")
+    print(f"batched:    {total / batched:10.0f} reviews/s  {batched / repeat * 1000:8.2f} ms/page")
+    print(f"speedup:    {looped / batched:10.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=25, help='reviews per page view')
+    parser.add_argument('--repeat', type=int, default=20, help='number of page views')
+    args = parser.parse_args()
+    run(args.reviews, args.repeat)
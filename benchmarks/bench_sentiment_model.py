@@ -0,0 +1,115 @@
+"""
+Load time, resident memory and throughput of the two sentiment model formats.
+
+  pickle   transform.pkl + sentiment_model.pkl (TfidfVectorizer with its vocabulary dict, MultinomialNB)
+  compact  the memory-mapped arrays written by export_compact_model
+
+Load time and RSS growth (after loading, and after classifying one page of reviews, which faults in
+the mapped pages it touches) are measured in a fresh child process per format. Throughput and the
+share of identical labels are measured in this process.
+
+Run from the repository root:
+    python -m benchmarks.bench_sentiment_model --reviews 25 --repeat 200
+    python -m benchmarks.bench_sentiment_model --compact artifact/sentiment
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_sentiment import synthetic_reviews
+from services.memory import rss_bytes
+from services.sentiment import MODEL_PATH, TRANSFORM_PATH, SentimentClassifier, export_compact_model
+
+
+def load(mode, compact_dir):
+    if mode == 'pickle':
+        return SentimentClassifier.load(TRANSFORM_PATH, MODEL_PATH)
+    return SentimentClassifier.load_compact(compact_dir)
+
+
+def child(mode, compact_dir, reviews_path):
+    with open(reviews_path) as f:
+        reviews = json.load(f)
+    gc.collect()
+    before = rss_bytes()
+    start = time.perf_counter()
+    sentiment = load(mode, compact_dir)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    loaded = rss_bytes()
+    sentiment.predict(reviews)
+    gc.collect()
+    print(json.dumps({'seconds': seconds, 'loaded': loaded - before, 'used': rss_bytes() - before}))
+
+
+def throughput(sentiment, reviews, repeat):
+    sentiment.predict(reviews)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sentiment.predict(reviews)
+    return len(reviews) * repeat / (time.perf_counter() - start)
+
+
+def run(compact_dir, n_reviews, repeat):
+    tmp = None
+    if compact_dir is None:
+        tmp = tempfile.TemporaryDirectory()
+        compact_dir = tmp.name
+        reference = SentimentClassifier.load(TRANSFORM_PATH, MODEL_PATH)
+        export_compact_model(reference.vectorizer, reference.clf, compact_dir)
+        del reference
+
+    pickled = SentimentClassifier.load(TRANSFORM_PATH, MODEL_PATH)
+    compact = SentimentClassifier.load_compact(compact_dir)
+    reviews = synthetic_reviews(pickled.vectorizer, n_reviews)
+    try:
+        results = {}
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as reviews_file:
+            json.dump(reviews, reviews_file)
+            reviews_file.flush()
+            for mode in ['pickle', 'compact']:
+                out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_sentiment_model', '--child', mode,
+                                      '--compact', compact_dir, '--reviews-file', reviews_file.name],
+                                     capture_output=True, text=True, check=True)
+                results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+        for mode, sentiment in [('pickle', pickled), ('compact', compact)]:
+            results[mode]['reviews_per_sec'] = throughput(sentiment, reviews, repeat)
+
+        many = synthetic_reviews(pickled.vectorizer, 2000, seed=7)
+        pickled_labels, pickled_proba = pickled.predict(many)
+        compact_labels, compact_proba = compact.predict(many)
+        agreement = np.mean([a == b for a, b in zip(pickled_labels, compact_labels)])
+        max_diff = np.abs(pickled_proba - compact_proba).max()
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    print(f"{n_reviews} reviews per call, {repeat} calls")
+    for mode, result in results.items():
+        print(f"{mode:>8}: load {result['seconds'] * 1000:8.1f} ms  RSS {result['loaded'] / 2 ** 20:6.1f} MB loaded, "
+              f"{result['used'] / 2 ** 20:6.1f} MB after a page  {result['reviews_per_sec']:9.0f} reviews/s")
+    print(f"load {results['pickle']['seconds'] / results['compact']['seconds']:.1f}x faster, "
+          f"{results['compact']['used'] / results['pickle']['used']:.0%} of the pickles' resident size")
+    print(f"identical labels: {agreement:.2%}, max |P(positive) difference|: {max_diff:.2e}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--compact', help='exported compact model, the pickles are exported to a temporary directory '
+                                          'when omitted')
+    parser.add_argument('--reviews', type=int, default=25, help='reviews per predict call (one page view)')
+    parser.add_argument('--repeat', type=int, default=200, help='predict calls timed per format')
+    parser.add_argument('--child', choices=['pickle', 'compact'], help=argparse.SUPPRESS)
+    parser.add_argument('--reviews-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.compact, args.reviews_file)
+    else:
+        run(args.compact, args.reviews, args.repeat)
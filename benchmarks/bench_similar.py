@@ -0,0 +1,94 @@
+"""
+Latency benchmark for the `/similar` lookup.
+
+Compares the original per-request path (rebuild the capitalized title list, linear `in` scan,
+boolean-mask lookup, sort of all N scores) against the title hash index + neighbour table.
+
+Run from the repository root:
+    python -m benchmarks.bench_similar --sizes 1000 5000 20000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from recommender.index import NeighborIndex, TitleIndex
+
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Family',
+          'Fantasy', 'Horror', 'Mystery', 'Romance', 'Thriller', 'War', 'Western']
+
+
+def synthetic_catalog(n_rows, seed=42):
+    """
+    Build a final_data.csv-like DataFrame with n_rows random titles.
+    """
+    rng = random.Random(seed)
+    actors = [f'actor{i}' for i in range(max(50, n_rows // 2))]
+    directors = [f'director{i}' for i in range(max(20, n_rows // 8))]
+    titles, all_info = [], []
+    for i in range(n_rows):
+        cast = rng.sample(actors, 3)
+        genres = ' '.join(rng.sample(GENRES, rng.randint(1, 3)))
+        titles.append(f'movie number {i}')
+        all_info.append(' '.join(cast + [rng.choice(directors), genres]))
+    return pd.DataFrame({'movie_title': titles, 'all_info': all_info})
+
+
+def legacy_similar(data, count_matrix, title):
+    """
+    The original `/similar` body. The dense similarity row is computed on the fly so the
+    benchmark does not need the N x N matrix in memory.
+    """
+    movies_list = list(data['movie_title'].str.capitalize())
+    if title not in movies_list:
+        return []
+    idx = data.loc[data['movie_title'].str.capitalize() == title].index[0]
+    lst = list(enumerate(cosine_similarity(count_matrix[idx], count_matrix)[0]))
+    lst = sorted(lst, key=lambda x: x[1], reverse=True)[1:11]
+    return [data['movie_title'][a] for a, _ in lst]
+
+
+def indexed_similar(data, title_index, similarity, title):
+    idx = title_index.get(title)
+    if idx is None:
+        return []
+    neighbor_ids, _ = similarity.neighbors(idx, 10)
+    return [data['movie_title'][a] for a in neighbor_ids]
+
+
+def time_per_call(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def run(sizes, n_queries):
+    print(f"{'rows':>8} {'legacy ms':>10} {'indexed ms':>11} {'speedup':>8} {'build s':>8}")
+    for n_rows in sizes:
+        data = synthetic_catalog(n_rows)
+        count_matrix = CountVectorizer().fit_transform(data['all_info'])
+
+        start = time.perf_counter()
+        similarity = NeighborIndex.from_matrix(count_matrix)
+        title_index = TitleIndex(data['movie_title'])
+        build = time.perf_counter() - start
+
+        rng = random.Random(0)
+        queries = [data['movie_title'][rng.randrange(n_rows)].capitalize() for _ in range(n_queries)]
+
+        legacy = time_per_call(lambda q: legacy_similar(data, count_matrix, q), queries)
+        indexed = time_per_call(lambda q: indexed_similar(data, title_index, similarity, q), queries)
+        print(f"{n_rows:>8} {legacy:>10.3f} {indexed:>11.4f} {legacy / indexed:>7.0f}x {build:>8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.queries)
@@ -0,0 +1,104 @@
+"""
+Request coalescing of concurrent identical upstream fetches, against the local stub server.
+
+--clients threads start the same call at once (a title trending), for a TMDb JSON fetch
+(http_client.get_json, behind /MovieCastes and /CastesDetails) and for the IMDb reviews scrape
+(get_reviews, behind /recommend). Each round starts with an empty response cache and reports the
+upstream requests the stub server received, the calls collapsed by single-flight and the wall time,
+next to the same clients calling http_client.get directly (one upstream request each).
+
+Run from the repository root:
+    python -m benchmarks.bench_single_flight --clients 50 --latency-ms 200
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_reviews import imdb_reviews_page
+from benchmarks.stub_server import StubHandler, StubServer
+from services import http_client
+from services import metrics
+from services import reviews
+
+
+class ReviewsHandler(StubHandler):
+    """
+    The stub TMDb server, also answering IMDb reviews page urls with a synthetic page.
+    """
+
+    page = imdb_reviews_page()
+
+    def do_GET(self):
+        if '/reviews' not in self.path:
+            return super().do_GET()
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.page)))
+        self.end_headers()
+        self.wfile.write(self.page)
+
+
+def collapsed(group):
+    samples = {labels: value for _, labels, value in metrics.SINGLE_FLIGHT_CALLS.samples()}
+    return samples.get(f'{{group="{group}",role="follower"}}', 0)
+
+
+def burst(fn, clients):
+    """
+    Run fn from clients threads released at the same moment, return the results and the wall time.
+    """
+    barrier = threading.Barrier(clients)
+
+    def call(_):
+        barrier.wait()
+        return fn()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(call, range(clients)))
+    return results, time.perf_counter() - start
+
+
+def round_trip(server, name, fn, clients, group=None):
+    http_client.cache.clear()
+    requests_before = server.requests
+    collapsed_before = collapsed(group) if group else 0
+    results, seconds = burst(fn, clients)
+    upstream = server.requests - requests_before
+    shared = collapsed(group) - collapsed_before if group else 0
+    identical = all(result == results[0] for result in results)
+    print(f"{name:<28} {upstream:>8} {shared:>9} {seconds * 1000:>9.0f}   {'yes' if identical else 'NO'}")
+    return upstream
+
+
+def run(clients, latency_ms):
+    # enough keep-alive connections for every client of the uncoalesced round
+    http_client.session = http_client.create_session(pool_maxsize=clients)
+    with StubServer(ReviewsHandler, latency_ms=latency_ms) as server:
+        movie_url = f'{server.url}/3/movie/550/credits'
+        reviews.IMDB_REVIEWS_URL = server.url + '/title/{}/reviews'
+
+        print(f"{clients} concurrent clients, {latency_ms} ms upstream latency")
+        print(f"{'':<28} {'upstream':>8} {'collapsed':>9} {'wall ms':>9}   identical results")
+        round_trip(server, 'tmdb json, uncoalesced', lambda: http_client.get(movie_url).content, clients)
+        tmdb = round_trip(server, 'tmdb json, single-flight', lambda: http_client.get_json(movie_url, {'api_key': 'k'}),
+                          clients, 'fetch')
+        scrape = round_trip(server, 'imdb reviews, single-flight', lambda: reviews.get_reviews('tt0137523'),
+                            clients, 'imdb_reviews')
+
+    if tmdb != 1 or scrape != 1:
+        raise SystemExit(f"expected one upstream request per burst, got {tmdb} (tmdb) and {scrape} (imdb)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50, help='concurrent identical calls')
+    parser.add_argument('--latency-ms', type=float, default=200, help='stub server response latency')
+    args = parser.parse_args()
+    run(args.clients, args.latency_ms)
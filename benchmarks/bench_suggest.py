@@ -0,0 +1,63 @@
+"""
+Latency benchmark for `/titles/suggest` (TitleSuggester prefix and typo tolerant lookups).
+
+Run from the repository root:
+    python -m benchmarks.bench_suggest --titles 500000
+"""
+import argparse
+import random
+import string
+import time
+
+from recommender.autocomplete import TitleSuggester
+
+
+def synthetic_titles(n_titles, seed=42):
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(20000)]
+    return [' '.join(rng.sample(words, rng.randint(1, 4))) for _ in range(n_titles)]
+
+
+def typo(text, rng):
+    """Swap two neighbouring characters."""
+    if len(text) < 3:
+        return text
+    i = rng.randrange(len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def run(n_titles, n_queries):
+    titles = synthetic_titles(n_titles)
+
+    start = time.perf_counter()
+    suggester = TitleSuggester(titles)
+    build = time.perf_counter() - start
+
+    rng = random.Random(0)
+    picks = [titles[rng.randrange(n_titles)] for _ in range(n_queries)]
+    prefixes = [title[:rng.randint(2, len(title))] for title in picks]
+    typos = [typo(title, rng) for title in picks]
+
+    prefix_ms = time_per_query(lambda q: suggester.suggest(q, 10), prefixes)
+    fuzzy_ms = time_per_query(lambda q: suggester.fuzzy(q, 10), typos)
+    found = sum(picks[i] in [titles[row] for row in suggester.suggest(q, 10, fuzzy=True)]
+                for i, q in enumerate(typos))
+
+    print(f"{n_titles} titles, index built in {build:.2f}s")
+    print(f"prefix:          {prefix_ms:.3f} ms/query")
+    print(f"typo tolerant:   {fuzzy_ms:.3f} ms/query, intended title in top 10 for {found}/{n_queries} typos")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--titles', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    run(args.titles, args.queries)
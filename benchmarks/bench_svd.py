@@ -0,0 +1,68 @@
+"""
+Overlap and latency of the SVD embedding engine against today's exact `/similar` neighbours.
+
+For every catalog size the exact engine and the SVD engine at several embedding dimensions build
+the full top 10 table. Reported per dimension: the mean overlap of the two top 10 lists, the share
+of SVD results whose exact score reaches the exact 10th best (the synthetic catalogs have many tied
+scores, which the plain overlap counts as misses), table build time, single-title query latency and
+the size of the embeddings next to the sparse matrix.
+
+Run from the repository root:
+    python -m benchmarks.bench_svd --sizes 5000 20000 --components 32 64 128 256
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from benchmarks.bench_similar import synthetic_catalog
+from recommender.engines import make_engine
+
+
+def build(name, count_matrix, **params):
+    start = time.perf_counter()
+    engine = make_engine(name, count_matrix, **params)
+    indices, _ = engine.search(np.arange(count_matrix.shape[0]), 10)
+    return engine, indices, time.perf_counter() - start
+
+
+def query_ms(engine, queries):
+    start = time.perf_counter()
+    for row in queries:
+        engine.search(np.array([row]), 10)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def run(sizes, components, n_queries):
+    print(f"{'rows':>8} {'engine':>10} {'overlap':>8} {'tie-hits':>9} {'table s':>8} {'query ms':>9} {'MB':>7}")
+    for n_rows in sizes:
+        data = synthetic_catalog(n_rows)
+        count_matrix = CountVectorizer().fit_transform(data['all_info'])
+        queries = np.random.default_rng(0).choice(n_rows, min(n_queries, n_rows), replace=False)
+
+        exact, exact_indices, exact_build = build('exact', count_matrix)
+        matrix = exact.matrix
+        sparse_mb = (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 2 ** 20
+        # exact score of every (title, neighbour) pair, the 10th best being the hit threshold
+        kth = np.asarray(matrix[np.arange(n_rows)].multiply(matrix[exact_indices[:, -1]]).sum(axis=1)).ravel()
+        print(f"{n_rows:>8} {'exact':>10} {1:>8.3f} {1:>9.3f} {exact_build:>8.2f} "
+              f"{query_ms(exact, queries):>9.3f} {sparse_mb:>7.1f}")
+
+        for n_components in components:
+            engine, indices, build_s = build('svd', count_matrix, n_components=n_components)
+            overlap = np.mean([len(np.intersect1d(a, b)) / 10 for a, b in zip(indices, exact_indices)])
+            rows = np.repeat(np.arange(n_rows), 10)
+            exact_scores = np.asarray(matrix[rows].multiply(matrix[indices.ravel()]).sum(axis=1)).reshape(n_rows, 10)
+            tie_hits = np.mean(exact_scores >= kth[:, None] - 1e-5)
+            print(f"{n_rows:>8} {f'svd/{n_components}':>10} {overlap:>8.3f} {tie_hits:>9.3f} {build_s:>8.2f} "
+                  f"{query_ms(engine, queries):>9.3f} {engine.embeddings.nbytes / 2 ** 20:>7.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000])
+    parser.add_argument('--components', type=int, nargs='+', default=[32, 64, 128, 256])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    run(args.sizes, args.components, args.queries)
@@ -0,0 +1,141 @@
+"""
+Synthetic catalog generator: final_data.csv scaled to any number of rows.
+
+Every generated row takes its genres, director and three actors from randomly drawn rows of a
+source catalog (the real data/final_data.csv when present, otherwise a synthetic one with the same
+columns), so the token frequencies of all_info, and with them the shape of the count matrix, follow
+the source while the catalog grows. Titles are the source titles, numbered from their second copy
+on ("avatar", "avatar (2)", ...), so they stay unique. Rows are generated and written in chunks of
+CHUNK_ROWS, each from its own seed, so memory stays flat, the output only depends on --seed and
+every catalog is a prefix of the larger ones.
+
+Run from the repository root:
+    python -m benchmarks.generate_catalog --rows 10k 100k 1M --out benchmarks/data
+"""
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_similar import GENRES
+
+
+FINAL_COLUMNS = ['movie_title', 'genres', 'director_name', 'actor_1_name', 'actor_2_name', 'actor_3_name',
+                 'all_info']
+ACTOR_COLUMNS = ['actor_1_name', 'actor_2_name', 'actor_3_name']
+
+DEFAULT_SOURCE = 'data/final_data.csv'
+
+# rows generated (and written) at a time
+CHUNK_ROWS = 100000
+
+
+def synthetic_source(n_rows=5000, seed=42):
+    """
+    A final_data.csv-like DataFrame with every column, for when the real catalog is not available.
+    """
+    rng = random.Random(seed)
+    actors = [f'actor{i}' for i in range(max(50, n_rows // 2))]
+    directors = [f'director{i}' for i in range(max(20, n_rows // 8))]
+    rows = []
+    for i in range(n_rows):
+        rows.append([f'movie number {i}', ' '.join(rng.sample(GENRES, rng.randint(1, 3))).lower(),
+                     rng.choice(directors)] + rng.sample(actors, 3))
+    return pd.DataFrame(rows, columns=FINAL_COLUMNS[:-1])
+
+
+def load_source(path=DEFAULT_SOURCE):
+    """
+    The source catalog: the csv at path when it exists, otherwise synthetic_source().
+    """
+    if path and os.path.exists(path):
+        data = pd.read_csv(path, usecols=FINAL_COLUMNS[:-1]).fillna('unknown')
+        return data.drop_duplicates(subset='movie_title').reset_index(drop=True)
+    return synthetic_source()
+
+
+def scale_chunk(source, start, n_rows, seed=42):
+    """
+    Rows start to start + n_rows of the scaled catalog, as a DataFrame with the final_data.csv columns.
+    """
+    n_source = len(source)
+    rows = np.arange(start, start + n_rows)
+
+    base = source['movie_title'].to_numpy()[rows % n_source]
+    copy = rows // n_source
+    titles = pd.Series(base, dtype=object)
+    numbered = copy > 0
+    titles[numbered] = titles[numbered] + ' (' + (copy[numbered] + 1).astype(str).astype(object) + ')'
+
+    def draw(values, column):
+        # one stream per chunk and column, so a smaller catalog is a prefix of a larger one
+        rng = np.random.default_rng([seed, start, column])
+        return pd.Series(values[rng.integers(0, len(values), n_rows)], dtype=object)
+
+    actors = np.concatenate([source[column].to_numpy() for column in ACTOR_COLUMNS])
+    data = pd.DataFrame({
+        'movie_title': titles,
+        'genres': draw(source['genres'].to_numpy(), 1),
+        'director_name': draw(source['director_name'].to_numpy(), 2),
+        'actor_1_name': draw(actors, 3),
+        'actor_2_name': draw(actors, 4),
+        'actor_3_name': draw(actors, 5),
+    })
+    # built like get_processed_df1
+    data['all_info'] = (data['actor_1_name'] + ' ' + data['actor_2_name'] + ' ' + data['actor_3_name'] + ' ' +
+                        data['director_name'] + ' ' + data['genres'])
+    data.index = rows
+    return data
+
+
+def scale_catalog(source, n_rows, seed=42):
+    """
+    The whole scaled catalog of n_rows rows in memory (see write_catalog for large sizes).
+    """
+    return pd.concat([scale_chunk(source, start, min(CHUNK_ROWS, n_rows - start), seed)
+                      for start in range(0, n_rows, CHUNK_ROWS)])
+
+
+def write_catalog(path, source, n_rows, seed=42):
+    """
+    Write the scaled catalog of n_rows rows to the csv at path, one chunk at a time.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for start in range(0, n_rows, CHUNK_ROWS):
+        chunk = scale_chunk(source, start, min(CHUNK_ROWS, n_rows - start), seed)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def parse_rows(text):
+    """'10k' -> 10000, '1M' -> 1000000."""
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1].lower(), 1)
+    return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+
+
+def label(n_rows):
+    for suffix, size in [('M', 1000000), ('k', 1000)]:
+        if n_rows >= size and n_rows % size == 0:
+            return f'{n_rows // size}{suffix}'
+    return str(n_rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help='catalog to scale, a synthetic one when missing')
+    parser.add_argument('--rows', nargs='+', type=parse_rows, default=[10000, 100000, 1000000],
+                        help='catalog sizes, e.g. 10k 100k 1M')
+    parser.add_argument('--out', default='benchmarks/data', help='directory of the final_data_<rows>.csv files')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    source = load_source(args.source)
+    origin = args.source if os.path.exists(args.source) else 'a synthetic catalog'
+    for n_rows in args.rows:
+        path = os.path.join(args.out, f'final_data_{label(n_rows)}.csv')
+        start = time.perf_counter()
+        write_catalog(path, source, n_rows, args.seed)
+        print(f"{path}: {n_rows} rows from {len(source)} of {origin} in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(path) / 2 ** 20:.0f} MB)")
@@ -0,0 +1,326 @@
+"""
+Load driver: throughput and p50/p95/p99 latency of the app's routes under concurrent clients.
+
+Starts the replay server (benchmarks/replay_server.py) as TMDb and IMDb, and the app in one process
+on a synthetic catalog of --rows titles (benchmarks/generate_catalog.py) with its recommender
+artifact built beforehand, in either serving mode:
+  wsgi  main.app on a server with a fixed pool of --threads threads (like gunicorn --threads)
+  asgi  asgi:app under uvicorn
+then keeps --clients requests in flight for --seconds per scenario, after a --warmup run:
+  titles      GET /titles
+  suggest     GET /titles/suggest for the first letters of a title
+  similar     POST /similar
+  credits     POST /MovieCastes with a TMDb credits url
+  movie_page  POST /movie_page (TMDb calls, IMDb scrape and sentiment)
+  recommend   POST /recommend (IMDb scrape, sentiment and the rendered page)
+  mixed       all of the above interleaved, mostly autocomplete and similar
+Titles are drawn in a fixed order from the app's /titles, so the same run sends the same requests.
+With --url an already running app is driven instead (pointed at a replay server with TMDB_API_URL
+and IMDB_REVIEWS_URL, see --upstream).
+
+Run from the repository root:
+    python -m benchmarks.load --scenarios similar movie_page --modes wsgi asgi --compare
+    python -m benchmarks.load --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import aiohttp
+import numpy as np
+
+from benchmarks import results
+from benchmarks.generate_catalog import DEFAULT_SOURCE, load_source, write_catalog
+from benchmarks.replay_server import DEFAULT_FIXTURES, ReplayServer, stable_id
+
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ['titles', 'suggest', 'similar', 'credits', 'movie_page', 'recommend', 'mixed']
+
+# requests of the mixed scenario, in turn
+MIXED = ['suggest', 'suggest', 'suggest', 'similar', 'similar', 'titles', 'credits', 'movie_page', 'recommend']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def http_get(url):
+    with urlopen(url, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def wait_for(url, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urlopen(url, timeout=1).close()
+            return
+        except HTTPError:
+            # up, answering with an error status
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f'{url} did not come up')
+
+
+def prepare_workdir(workdir, rows, build_artifact=True, source=DEFAULT_SOURCE):
+    """
+    Lay out a working directory for main.py: data/final_data.csv scaled to rows titles, the
+    sentiment model files of artifact/ and, with build_artifact, the recommender artifact built
+    from the catalog (otherwise main.py fits it at startup).
+
+    Returns:
+        dict: The environment variables to start the app with.
+    """
+    os.makedirs(os.path.join(workdir, 'data'))
+    csv_path = os.path.join(workdir, 'data', 'final_data.csv')
+    write_catalog(csv_path, load_source(os.path.join(REPO, source)), rows)
+
+    os.makedirs(os.path.join(workdir, 'artifact'))
+    for name in os.listdir(os.path.join(REPO, 'artifact')):
+        if name != 'recommender':
+            os.symlink(os.path.join(REPO, 'artifact', name), os.path.join(workdir, 'artifact', name))
+
+    recommender_dir = os.path.join(workdir, 'artifact', 'recommender')
+    if build_artifact:
+        import pandas as pd
+        from recommender.artifact import save_artifact
+        from recommender.model import Recommender
+
+        recommender = Recommender.from_frame(pd.read_csv(csv_path, usecols=['movie_title', 'all_info']))
+        save_artifact(recommender, recommender_dir, source=csv_path)
+    return dict(os.environ, PYTHONPATH=REPO, RECOMMENDER_DIR=recommender_dir, RECOMMENDER_RELOAD_INTERVAL='0')
+
+
+def serve_stub(port, latency_ms, fixtures=DEFAULT_FIXTURES):
+    ReplayServer(fixtures, latency_ms, port, backlog=4096).httpd.serve_forever()
+
+
+def serve_app(mode, port, threads, workdir):
+    # main.py loads ./data and ./artifact relative to the working directory
+    os.chdir(workdir)
+    sys.path.insert(0, REPO)
+    if mode == 'asgi':
+        import uvicorn
+        uvicorn.run('asgi:app', host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+        return
+
+    from werkzeug.serving import BaseWSGIServer
+    import main
+
+    # no access log line per request
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    class PoolWSGIServer(BaseWSGIServer):
+        """A WSGI server handling connections on a fixed pool of threads."""
+
+        request_queue_size = 4096
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PoolWSGIServer('127.0.0.1', port, main.app).serve_forever()
+
+
+def start(args, env=None):
+    """
+    Run this module with args in a child process from the repository root.
+    """
+    return subprocess.Popen([sys.executable, '-m', 'benchmarks.load'] + [str(arg) for arg in args], cwd=REPO,
+                            env=env, stdout=subprocess.DEVNULL)
+
+
+def stop(process):
+    process.terminate()
+    process.wait()
+
+
+def recommend_form(title, imdb_id):
+    """
+    The form the browser posts to /recommend, with ten cast members.
+    """
+    def quoted(values):
+        return '[' + ','.join(f'"{value}"' for value in values) + ']'
+
+    cast = range(10)
+    return {
+        'title': title, 'imdb_id': imdb_id, 'poster': f'/{imdb_id}.jpg', 'genres': 'Drama, Thriller',
+        'overview': f'The story of {title}.', 'rating': '7.1', 'release_date': '2001-01-01', 'runtime': '1 hour(s) 40 min(s)',
+        'cast_ids': '[' + ','.join(str(1000 + i) for i in cast) + ']',
+        'cast_names': quoted(f'Actor {i}' for i in cast),
+        'cast_chars': quoted(f'Role {i}' for i in cast),
+        'cast_profiles': quoted(f'/p{i}.jpg' for i in cast),
+        'cast_bdays': quoted('1970-01-01' for _ in cast),
+        'cast_bios': quoted(f'Actor {i} is an actor.' for i in cast),
+        'cast_places': quoted('Los Angeles' for _ in cast),
+        'recommended_movies': quoted(f'Movie {i}' for i in range(10)),
+        'posters': quoted(f'/m{i}.jpg' for i in range(10)),
+    }
+
+
+def scenario(name, titles, upstream):
+    """
+    The request sender of a scenario: a function (worker id, request number) -> (method, path,
+    aiohttp request arguments), drawing titles in a fixed order.
+    """
+    def request(kind, title):
+        if kind == 'titles':
+            return 'GET', '/titles', {}
+        if kind == 'suggest':
+            return 'GET', '/titles/suggest', {'params': {'q': title[:4]}}
+        if kind in ('similar', 'movie_page'):
+            return 'POST', f'/{kind}', {'json': [{'query': title}]}
+        if kind == 'credits':
+            return 'POST', '/MovieCastes', {'json': [{'URL': f'{upstream}/3/movie/{stable_id(title)}/credits'}]}
+        return 'POST', '/recommend', {'data': recommend_form(title, f'tt{stable_id(title):07d}')}
+
+    def next_request(worker_id, i):
+        title = titles[(worker_id * 7919 + i * 104729) % len(titles)]
+        return request(MIXED[(worker_id + i) % len(MIXED)] if name == 'mixed' else name, title)
+
+    return next_request
+
+
+async def drive(base_url, next_request, clients, seconds):
+    """
+    Keep clients requests from next_request in flight against base_url for seconds.
+
+    Returns:
+        tuple: (array of request durations in seconds, number of failed requests, elapsed seconds)
+    """
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    connector = aiohttp.TCPConnector(limit=clients)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as client:
+        async def worker(worker_id):
+            nonlocal errors
+            i = 0
+            while time.monotonic() < deadline:
+                method, path, kwargs = next_request(worker_id, i)
+                i += 1
+                start = time.perf_counter()
+                try:
+                    async with client.request(method, base_url + path, **kwargs) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+    return np.array(latencies), errors, elapsed
+
+
+def measure(base_url, next_request, clients, seconds):
+    latencies, errors, elapsed = asyncio.run(drive(base_url, next_request, clients, seconds))
+    return dict(results.latency_summary(latencies), req_per_s=len(latencies) / elapsed, errors=errors)
+
+
+def drive_app(label, base_url, upstream, scenarios, clients, seconds, warmup):
+    titles = http_get(f'{base_url}/titles')
+    measured = {}
+    for name in scenarios:
+        next_request = scenario(name, titles, upstream)
+        if warmup:
+            asyncio.run(drive(base_url, next_request, clients, warmup))
+        result = measure(base_url, next_request, clients, seconds)
+        measured[f'{label}/{name}'] = result
+        print(f"{label + '/' + name:<20} {result['req_per_s']:8.1f} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} "
+              f"{result['p99_ms']:8.1f} {result['errors']:7d}")
+    return measured
+
+
+def run(args):
+    print(f"{args.clients} clients, {args.seconds:.0f}s per scenario, {args.latency_ms:.0f} ms upstream latency")
+    print(f"{'':<20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    stub = None
+    upstream = args.upstream
+    if upstream is None:
+        stub_port = free_port()
+        upstream = f'http://127.0.0.1:{stub_port}'
+        stub = start(['--serve-stub', stub_port, '--latency-ms', args.latency_ms, '--fixtures', args.fixtures])
+    try:
+        wait_for(f'{upstream}/3/configuration')
+        if args.url:
+            measured = drive_app('external', args.url.rstrip('/'), upstream, args.scenarios, args.clients,
+                                 args.seconds, args.warmup)
+        else:
+            measured = {}
+            with tempfile.TemporaryDirectory() as workdir:
+                env = prepare_workdir(workdir, args.rows)
+                env.update(TMDB_API_URL=f'{upstream}/3', IMDB_REVIEWS_URL=upstream + '/title/{}/reviews')
+                for mode in args.modes:
+                    port = free_port()
+                    app = start(['--serve-app', mode, '--port', port, '--threads', args.threads, '--workdir', workdir],
+                                env)
+                    try:
+                        wait_for(f'http://127.0.0.1:{port}/metrics')
+                        measured.update(drive_app(mode, f'http://127.0.0.1:{port}', upstream, args.scenarios,
+                                                  args.clients, args.seconds, args.warmup))
+                    finally:
+                        stop(app)
+    finally:
+        if stub is not None:
+            stop(stub)
+
+    params = {'clients': args.clients, 'seconds': args.seconds, 'latency_ms': args.latency_ms, 'rows': args.rows,
+              'threads': args.threads}
+    results.finish(args, measured, params)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=['similar', 'movie_page', 'mixed'])
+    parser.add_argument('--modes', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    parser.add_argument('--clients', type=int, default=50, help='requests kept in flight')
+    parser.add_argument('--seconds', type=float, default=10, help='duration of each scenario')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of unmeasured load before each scenario')
+    parser.add_argument('--latency-ms', type=float, default=50, help='replay server response latency')
+    parser.add_argument('--threads', type=int, default=8, help='request threads of the wsgi server')
+    parser.add_argument('--rows', type=int, default=10000, help='titles in the synthetic catalog')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='recorded TMDb/IMDb responses to replay')
+    parser.add_argument('--url', help='drive this running app instead of starting one')
+    parser.add_argument('--upstream', help='replay server the app already uses, one is started when omitted')
+    parser.add_argument('--serve-stub', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--serve-app', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    results.add_arguments(parser, 'load.json')
+    args = parser.parse_args()
+    if args.serve_stub:
+        serve_stub(args.serve_stub, args.latency_ms, args.fixtures)
+    elif args.serve_app:
+        serve_app(args.serve_app, args.port, args.threads, args.workdir)
+    else:
+        run(args)
@@ -0,0 +1,167 @@
+"""
+Micro-benchmarks of the app's hot paths on a synthetic catalog of --rows titles.
+
+  startup    seconds and resident memory of `import main` in a fresh process, loading the
+             prebuilt recommender artifact, and fitting the recommender from the csv instead
+  titles     GET /titles through the Flask test client
+  similar    POST /similar for --requests titles drawn at random
+  sentiment  one predict call for a page of 25 reviews, without the prediction cache
+  clean_data preprocess.utils.clean_data on the whole catalog
+
+Each reports p50/p95/p99 (or the median of its runs) and a throughput. The catalog is generated by
+benchmarks/generate_catalog.py and the sentiment model is the one main.py loads from artifact/.
+
+Run from the repository root:
+    python -m benchmarks.micro --rows 10000 --compare
+    python -m benchmarks.micro --rows 10000 --save-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import results
+from benchmarks.bench_sentiment import synthetic_reviews
+from benchmarks.load import REPO, prepare_workdir
+from services.memory import rss_bytes
+
+
+BENCHMARKS = ['startup', 'titles', 'similar', 'sentiment', 'clean_data']
+
+
+def timings(fn, repeat, warmup=1):
+    """
+    Durations in seconds of repeat calls of fn, after warmup untimed calls.
+    """
+    for _ in range(warmup):
+        fn()
+    seconds = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds[i] = time.perf_counter() - start
+    return seconds
+
+
+def child_startup():
+    start = time.perf_counter()
+    import main  # noqa: F401
+    print(json.dumps({'seconds': time.perf_counter() - start, 'rss': rss_bytes()}))
+
+
+def bench_startup(workdir, env, runs):
+    measured = {}
+    for name, recommender_dir in [('artifact', env['RECOMMENDER_DIR']), ('fit', os.path.join(workdir, 'no-artifact'))]:
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.micro', '--child-startup'], cwd=workdir,
+                                 env=dict(env, RECOMMENDER_DIR=recommender_dir), capture_output=True, text=True,
+                                 check=True)
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        measured[f'startup_{name}'] = {
+            'seconds': statistics.median(sample['seconds'] for sample in samples),
+            'rss_mb': statistics.median(sample['rss'] for sample in samples) / 2 ** 20,
+        }
+    return measured
+
+
+def bench_routes(client, titles, n_requests, repeat):
+    measured = {}
+    seconds = timings(lambda: client.get('/titles'), repeat)
+    measured['titles'] = dict(results.latency_summary(seconds), req_per_s=repeat / seconds.sum())
+
+    queries = iter(random.Random(42).choices(titles, k=n_requests + 1))
+
+    def similar():
+        response = client.post('/similar', json=[{'query': next(queries)}])
+        assert response.status_code == 200, response.status_code
+
+    # the route prints its result, kept out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = timings(similar, n_requests)
+    measured['similar'] = dict(results.latency_summary(seconds), req_per_s=n_requests / seconds.sum())
+    return measured
+
+
+def bench_sentiment(repeat, n_reviews=25):
+    import main
+    from services.sentiment import MODEL_PATH, TRANSFORM_PATH, SentimentClassifier
+
+    # the model main.py serves (pickles or compact format), without its prediction cache
+    sentiment = SentimentClassifier(main.sentiment.vectorizer, main.sentiment.clf)
+    reviews = synthetic_reviews(SentimentClassifier.load(TRANSFORM_PATH, MODEL_PATH).vectorizer, n_reviews)
+    seconds = timings(lambda: sentiment.predict(reviews), repeat)
+    return {'sentiment': dict(results.latency_summary(seconds), reviews_per_s=n_reviews * repeat / seconds.sum())}
+
+
+def bench_clean_data(csv_path, runs):
+    from preprocess.utils import clean_data
+
+    data = pd.read_csv(csv_path)
+    seconds = timings(lambda: clean_data(data.copy()), runs, warmup=0)
+    median = float(np.median(seconds))
+    return {'clean_data': {'seconds': median, 'rows_per_s': len(data) / median}}
+
+
+def run(args):
+    selected = args.benchmarks
+    measured = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        env = prepare_workdir(workdir, args.rows)
+        print(f"catalog of {args.rows} titles and its recommender artifact built in {time.perf_counter() - start:.1f}s")
+
+        if 'startup' in selected:
+            measured.update(bench_startup(workdir, env, args.startup_runs))
+
+        if set(selected) & {'titles', 'similar', 'sentiment'}:
+            # main.py loads ./data and ./artifact relative to the working directory, at import
+            os.chdir(workdir)
+            os.environ.update(RECOMMENDER_DIR=env['RECOMMENDER_DIR'], RECOMMENDER_RELOAD_INTERVAL='0')
+            with contextlib.redirect_stdout(io.StringIO()):
+                import main
+            titles = [title.capitalize() for title in main.live_recommender.current().recommender.titles]
+            if set(selected) & {'titles', 'similar'}:
+                routes = bench_routes(main.app.test_client(), titles, args.requests, args.repeat)
+                measured.update({name: routes[name] for name in routes if name in selected})
+            if 'sentiment' in selected:
+                measured.update(bench_sentiment(args.repeat * 5))
+
+        if 'clean_data' in selected:
+            measured.update(bench_clean_data(os.path.join(workdir, 'data', 'final_data.csv'), args.startup_runs))
+        os.chdir(REPO)
+
+    print(f"{'benchmark':<18} {'metric':<14} {'value':>12}")
+    for name, metrics in measured.items():
+        for metric, value in metrics.items():
+            print(f"{name:<18} {metric:<14} {value:12.3f}")
+
+    params = {'rows': args.rows, 'requests': args.requests, 'repeat': args.repeat, 'startup_runs': args.startup_runs}
+    results.finish(args, measured, params)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument('--rows', type=int, default=10000, help='titles in the synthetic catalog')
+    parser.add_argument('--requests', type=int, default=500, help='/similar requests timed')
+    parser.add_argument('--repeat', type=int, default=100, help='/titles requests timed (x5 sentiment calls)')
+    parser.add_argument('--startup-runs', type=int, default=3, help='fresh processes per startup variant, '
+                                                                    'and clean_data runs')
+    parser.add_argument('--child-startup', action='store_true', help=argparse.SUPPRESS)
+    results.add_arguments(parser, 'micro.json')
+    args = parser.parse_args()
+    if args.child_startup:
+        child_startup()
+    else:
+        run(args)
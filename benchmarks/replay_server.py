@@ -0,0 +1,196 @@
+"""
+Local stand-in for TMDb and IMDb replaying recorded responses.
+
+Requests are answered from a fixtures directory laid out like the upstream urls:
+  tmdb/<path>.json                 GET https://api.themoviedb.org/<path>, e.g. tmdb/3/movie/550/credits.json
+  tmdb/<path>/<query>.json         the same with query parameters (api_key left out), e.g.
+                                   tmdb/3/search/movie/query=fight+club.json
+  imdb/<imdb id>.html              the IMDb reviews page of a title, e.g. imdb/tt0137523.html
+Anything not recorded is synthesized in the shape of the real response (search results, movie
+details with an imdb_id, credits, person bios, a reviews page of 25 reviews), derived from the
+requested id or query so every run sees the same bodies. `latency_ms` delays every response.
+
+Record fixtures once, with a TMDb api key and network access:
+    python -m benchmarks.replay_server --record "fight club" "the matrix" --api-key <key>
+then replay them (the app reaches it with TMDB_API_URL=<url>/3 and IMDB_REVIEWS_URL=<url>/title/{}/reviews):
+    python -m benchmarks.replay_server --port 8765 --latency-ms 100
+"""
+import argparse
+import functools
+import json
+import os
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from benchmarks.bench_reviews import imdb_reviews_page
+from benchmarks.bench_similar import GENRES
+from benchmarks.stub_server import StubHandler, StubServer
+
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+TMDB_NOT_FOUND = {'status_code': 34, 'status_message': 'The resource you requested could not be found.',
+                  'success': False}
+
+
+def fixture_path(root, path, params=None):
+    """
+    File of the recorded response to GET path (with params), see the module docstring.
+    """
+    if path.startswith('/title/'):
+        return os.path.join(root, 'imdb', path.split('/')[2] + '.html')
+    params = sorted((name, value) for name, value in (params or {}).items() if name != 'api_key')
+    name = path.strip('/') + ('/' + urlencode(params) if params else '')
+    return os.path.join(root, 'tmdb', *name.split('/')) + '.json'
+
+
+def stable_id(text, low=1000, high=10 ** 6):
+    return low + zlib.crc32(text.encode('utf-8')) % (high - low)
+
+
+def synthesize(path, params):
+    """
+    A made-up TMDb response to GET path in the shape of the real one, None for unknown paths.
+    """
+    parts = path.strip('/').split('/')[1:]
+    if parts == ['search', 'movie']:
+        query = params.get('query', '')
+        movie_id = stable_id(query)
+        return {'page': 1, 'total_pages': 1, 'total_results': 1, 'results': [{
+            'id': movie_id, 'title': query.title(), 'original_title': query.title(), 'poster_path': f'/{movie_id}.jpg',
+            'overview': f'The story of {query}.', 'release_date': '2001-01-01', 'vote_average': 7.1}]}
+    if len(parts) >= 2 and parts[0] == 'movie' and parts[1].isdigit():
+        movie_id = int(parts[1])
+        if len(parts) == 2:
+            return {'id': movie_id, 'imdb_id': f'tt{movie_id:07d}', 'title': f'Movie {movie_id}',
+                    'original_title': f'Movie {movie_id}', 'overview': f'Overview of movie {movie_id}.',
+                    'poster_path': f'/{movie_id}.jpg', 'vote_average': 5 + movie_id % 50 / 10,
+                    'release_date': f'{1950 + movie_id % 70}-01-01', 'runtime': 80 + movie_id % 90,
+                    'genres': [{'id': 10 + i, 'name': GENRES[(movie_id + i) % len(GENRES)]} for i in range(2)]}
+        if parts[2:] == ['credits']:
+            cast = [{'id': stable_id(f'{movie_id}/{i}'), 'name': f'Actor {movie_id}-{i}', 'character': f'Role {i}',
+                     'profile_path': f'/p{movie_id}-{i}.jpg', 'order': i} for i in range(15)]
+            crew = [{'id': stable_id(f'{movie_id}/director'), 'name': f'Director {movie_id}', 'job': 'Director',
+                     'department': 'Directing'}]
+            return {'id': movie_id, 'cast': cast, 'crew': crew}
+    if len(parts) == 2 and parts[0] == 'person' and parts[1].isdigit():
+        person_id = int(parts[1])
+        return {'id': person_id, 'name': f'Person {person_id}', 'birthday': f'{1940 + person_id % 60}-06-15',
+                'place_of_birth': 'Los Angeles, California, USA',
+                'biography': f'Person {person_id} is an actor.\nThey appeared in many films.'}
+    return None
+
+
+@functools.lru_cache(maxsize=256)
+def synthetic_reviews_page(imdb_id):
+    return imdb_reviews_page(seed=stable_id(imdb_id))
+
+
+class ReplayHandler(StubHandler):
+    """
+    The stub server answering TMDb api and IMDb reviews urls from the fixtures directory, see the
+    module docstring. Counts the replayed and synthesized responses on the server.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        path = fixture_path(server.fixtures, url.path, params)
+        status, replayed = 200, os.path.exists(path)
+        if replayed:
+            with open(path, 'rb') as f:
+                body = f.read()
+        elif url.path.startswith('/title/'):
+            body = synthetic_reviews_page(url.path.split('/')[2])
+        else:
+            payload = synthesize(url.path, params)
+            if payload is None:
+                status, payload = 404, TMDB_NOT_FOUND
+            body = json.dumps(payload).encode('utf-8')
+        with server.lock:
+            if replayed:
+                server.replayed += 1
+            else:
+                server.synthesized += 1
+
+        content_type = 'text/html; charset=utf-8' if url.path.startswith('/title/') else 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReplayServer(StubServer):
+    """
+    StubServer running ReplayHandler on the recordings in fixtures.
+    """
+
+    def __init__(self, fixtures=DEFAULT_FIXTURES, latency_ms=0, port=0, backlog=128, handler=ReplayHandler):
+        super().__init__(handler, latency_ms=latency_ms, port=port, backlog=backlog)
+        self.httpd.fixtures = fixtures
+        self.httpd.replayed = 0
+        self.httpd.synthesized = 0
+
+
+def record(titles, api_key, root=DEFAULT_FIXTURES, cast=10):
+    """
+    Save the upstream responses behind the movie page of each title: the TMDb search, details,
+    credits, the bios of the top cast and the IMDb reviews page.
+    """
+    from services import http_client
+    from services import movie_page
+    from services import reviews
+
+    def save(path, params, body):
+        file = fixture_path(root, path, params)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        with open(file, 'wb') as f:
+            f.write(body)
+        print(f"{len(body):>9} bytes  {os.path.relpath(file, root)}")
+
+    def get(url, params=None):
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        save(urlsplit(url).path, params, response.content)
+        return response
+
+    api = movie_page.TMDB_API_URL
+    for title in titles:
+        results = get(f'{api}/search/movie', {'api_key': api_key, 'query': title}).json().get('results')
+        if not results:
+            print(f"no TMDb match for {title!r}")
+            continue
+        movie_url = f"{api}/movie/{results[0]['id']}"
+        details = get(movie_url, {'api_key': api_key}).json()
+        credits = get(f'{movie_url}/credits', {'api_key': api_key}).json()
+        for member in (credits.get('cast') or [])[:cast]:
+            get(f"{api}/person/{member['id']}", {'api_key': api_key})
+        if details.get('imdb_id'):
+            url = reviews.IMDB_REVIEWS_URL.format(details['imdb_id'])
+            response = http_client.get(url)
+            response.raise_for_status()
+            save(urlsplit(url).path, None, response.content)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='directory of the recorded responses')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay of every response')
+    parser.add_argument('--record', nargs='+', metavar='TITLE', help='record the responses for these titles instead')
+    parser.add_argument('--api-key', default=os.environ.get('API_KEY'), help='TMDb api key for --record')
+    args = parser.parse_args()
+    if args.record:
+        record(args.record, args.api_key, args.fixtures)
+    else:
+        server = ReplayServer(args.fixtures, args.latency_ms, args.port, backlog=4096)
+        print(f"replaying {args.fixtures} on {server.url}")
+        server.httpd.serve_forever()
@@ -0,0 +1,149 @@
+"""
+Benchmark results: latency percentiles, and baselines stored as JSON for regression comparison.
+
+A result set maps a benchmark name to its metrics, e.g. {"similar": {"p50_ms": 1.2, "req_per_s": 800}}.
+Metrics ending in `_per_s` are throughputs (higher is better), every other metric is a cost (lower
+is better). A baseline file keeps one result set with the parameters it was run with and the machine
+it ran on: a run with other parameters is not compared at all, one on another machine is compared
+with a warning (the committed baselines only mean something on the machine that saved them).
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# relative change (20%) beyond which a metric counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# exit statuses of --compare: a metric regressed, or the baseline was run with other parameters
+EXIT_REGRESSION = 1
+EXIT_PARAMS_MISMATCH = 2
+
+
+def latency_summary(seconds):
+    """
+    p50 / p95 / p99 / mean in milliseconds of an array of durations in seconds.
+    """
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+    return {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'mean_ms': float(np.mean(seconds)) * 1000}
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_s')
+
+
+def save_baseline(path, results, params):
+    """
+    Write results, with params and the machine description, to the baseline file at path.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    baseline = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'machine': machine_info(),
+        'params': params,
+        'results': {name: {metric: round(float(value), 4) for metric, value in metrics.items()}
+                    for name, metrics in results.items()},
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"baseline written to {path}")
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare results with a baseline result set.
+
+    Returns:
+        list of tuple: (benchmark, metric, baseline value, current value, relative change,
+        regressed) for every metric present in both, the change signed so that positive is worse.
+    """
+    rows = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            if metric not in baseline.get(name, {}):
+                continue
+            before = baseline[name][metric]
+            if before:
+                change = (value - before) / before
+            else:
+                change = 0.0 if value == before else float('inf')
+            if higher_is_better(metric):
+                change = -change
+            rows.append((name, metric, before, value, change, change > tolerance))
+    return rows
+
+
+def report(results, baseline_path=None, tolerance=DEFAULT_TOLERANCE, params=None):
+    """
+    Print the comparison of results with the baseline file at baseline_path and return the number of
+    regressed metrics, or None without comparing when the run parameters differ from the baseline's.
+    A differing machine is printed first, as a warning.
+    """
+    baseline = load_baseline(baseline_path)
+    if params is not None and baseline.get('params') != params:
+        print(f"not comparing: params differ from the baseline's: {baseline.get('params')} != {params}",
+              file=sys.stderr)
+        return None
+    if baseline.get('machine') != machine_info():
+        print(f"warning: machine differs from the baseline's: {baseline.get('machine')} != {machine_info()}",
+              file=sys.stderr)
+
+    rows = compare(results, baseline['results'], tolerance)
+    print(f"{'benchmark':<24} {'metric':<14} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, metric, before, value, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<24} {metric:<14} {before:11.3f} {value:11.3f} {change:+8.1%}{flag}")
+    regressions = sum(regressed for *_, regressed in rows)
+    print(f"{regressions} of {len(rows)} metrics regressed by more than {tolerance:.0%} "
+          f"(positive change is worse)")
+    return regressions
+
+
+def add_arguments(parser, default_baseline):
+    """
+    The --save-baseline / --compare / --tolerance options shared by the suite's drivers.
+    """
+    parser.add_argument('--baseline', default=os.path.join(BASELINE_DIR, default_baseline),
+                        help='baseline file to write or compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--compare', action='store_true',
+                        help=f'compare with the baseline, exit with status {EXIT_REGRESSION} on a regression '
+                             f'and {EXIT_PARAMS_MISMATCH} when it was run with other parameters')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='relative change tolerated before a metric counts as regressed')
+
+
+def finish(args, results, params):
+    """
+    Store or compare results as requested by the add_arguments options.
+    """
+    if args.save_baseline:
+        save_baseline(args.baseline, results, params)
+    if not args.compare:
+        return
+    regressions = report(results, args.baseline, args.tolerance, params)
+    if regressions is None:
+        sys.exit(EXIT_PARAMS_MISMATCH)
+    if regressions:
+        sys.exit(EXIT_REGRESSION)
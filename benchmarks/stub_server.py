@@ -0,0 +1,89 @@
+"""
+Local stub HTTP server standing in for TMDb in benchmarks.
+
+Every GET is answered with a small JSON body. `handshake_ms` delays each newly accepted
+connection, emulating the DNS + TCP + TLS setup a real TMDb call pays when it does not
+reuse a keep-alive connection; `latency_ms` delays every response.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, avoid Nagle + delayed ACK stalls on reused connections
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.handshake_ms:
+            time.sleep(server.handshake_ms / 1000)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+
+        body = json.dumps({'path': self.path, 'id': 550, 'title': 'Fight Club'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Context manager running the stub server on a free localhost port in a background thread.
+
+    Attributes:
+        url (str): Base URL of the running server.
+        requests (int): Number of requests served.
+        connections (int): Number of TCP connections accepted.
+    """
+
+    def __init__(self, handler=StubHandler, handshake_ms=0, latency_ms=0, port=0, backlog=128):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler, bind_and_activate=False)
+        # listen backlog, large enough for bursts of concurrent connections
+        self.httpd.request_queue_size = backlog
+        self.httpd.server_bind()
+        self.httpd.server_activate()
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.connections = 0
+        self.httpd.handshake_ms = handshake_ms
+        self.httpd.latency_ms = latency_ms
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
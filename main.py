@@ -1,37 +1,79 @@
 import os
 from dotenv import load_dotenv
-import numpy as np
 import pandas as pd
-from flask import Flask, render_template, request, jsonify
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 import json
-import bs4 as bs
-import urllib.request
-import pickle
-import requests
+import time
+from recommender.artifact import DEFAULT_ARTIFACT_DIR, load_artifact
+from recommender.catalog import is_catalog, load_catalog
+from recommender.engines import DEFAULT_ENGINE
+from recommender.live import LiveRecommender
+from recommender.model import Recommender
+from services import http_client
+from services import metrics
+from services.cache import ResponseCache, cache_metrics
+from services.movie_page import build_movie_page
+from services.reviews import get_reviews
+from services.memory import log_rss
+from services.sentiment import COMPACT_MANIFEST, COMPACT_MODEL_DIR, SentimentClassifier
 
 # Load environment variables from .env file
 load_dotenv()
 
 API_KEY = os.environ.get('API_KEY')
 
+RECOMMENDER_DIR = os.environ.get('RECOMMENDER_DIR', DEFAULT_ARTIFACT_DIR)
+# seconds between checks for a newer recommender artifact build, 0 disables hot reloading
+RECOMMENDER_RELOAD_INTERVAL = float(os.environ.get('RECOMMENDER_RELOAD_INTERVAL', 30))
+# engine computing the neighbour table when fitting at startup: exact, or the approximate ivf
+SIMILARITY_ENGINE = os.environ.get('SIMILARITY_ENGINE', DEFAULT_ENGINE)
+# movies whose neighbours /similar/batch computes (and streams) at once
+SIMILAR_BATCH_CHUNK = int(os.environ.get('SIMILAR_BATCH_CHUNK', 1000))
+# memory-mapped sentiment model written by preprocess/export_sentiment_model.py, used over the pickles when present
+SENTIMENT_MODEL_DIR = os.environ.get('SENTIMENT_MODEL_DIR', COMPACT_MODEL_DIR)
 
 
-# global avialbe variable
-data = pd.read_csv('./data/final_data.csv', nrows=5000)
+rss_before_catalog = log_rss("before catalog load")
 
-# creating a count matrix
-cv = CountVectorizer()
-count_matrix = cv.fit_transform(data['all_info'])
-# creating a similarity score matrix
-similarity = cosine_similarity(count_matrix)
+# global avialbe variable
+# load the precomputed recommender artifact (memory-mapped, shared by all workers),
+# fall back to fitting from the csv when it has not been built yet
+try:
+    recommender = load_artifact(RECOMMENDER_DIR)
+except FileNotFoundError:
+    print(f"No recommender artifact in {RECOMMENDER_DIR}, fitting from ./data/final_data "
+          "(run preprocess/build_recommender.py to skip this at startup)")
+    if is_catalog('./data/final_data'):
+        # columnar catalog written by preprocess/bollywood_processing.py, memory-mapped
+        catalog = load_catalog('./data/final_data', columns=['movie_title', 'all_info'])
+        recommender = Recommender.from_catalog(catalog['movie_title'], catalog['all_info'], engine=SIMILARITY_ENGINE)
+        del catalog
+    else:
+        # only the columns the recommender uses, the DataFrame is dropped once vectorized
+        recommender = Recommender.from_frame(pd.read_csv('./data/final_data.csv', usecols=['movie_title', 'all_info']),
+                                             engine=SIMILARITY_ENGINE)
+
+# the served recommender (and the prefix / typo tolerant index behind /titles/suggest),
+# hot-swapped when preprocess/update_recommender.py publishes a new artifact build
+live_recommender = LiveRecommender(recommender, RECOMMENDER_DIR)
+if RECOMMENDER_RELOAD_INTERVAL > 0:
+    live_recommender.start_polling(RECOMMENDER_RELOAD_INTERVAL)
+del recommender
+
+log_rss("after catalog load", since=rss_before_catalog)
 
 
 # load the nlp model and tfidf vectorizer from disk
-filename = 'artifact/sentiment_model.pkl'
-clf = pickle.load(open(filename, 'rb'))
-vectorizer = pickle.load(open('artifact/transform.pkl', 'rb'))
+# predictions memoised per review and per title by content hash (SENTIMENT_CACHE_* variables,
+# SENTIMENT_CACHE_PATH for a SQLite file shared by the workers, pruned of expired rows and capped at
+# SENTIMENT_CACHE_DISK_MAX_ENTRIES / _DISK_MAX_BYTES), keyed by the model files' hash
+sentiment_cache = ResponseCache.from_env('SENTIMENT_CACHE', max_entries=100000, max_bytes=16 * 1024 * 1024,
+                                         ttl=30 * 24 * 3600)
+metrics.REGISTRY.add_collector(lambda: cache_metrics(sentiment_cache, 'sentiment_cache'))
+if os.path.exists(os.path.join(SENTIMENT_MODEL_DIR, COMPACT_MANIFEST)):
+    sentiment = SentimentClassifier.load_compact(SENTIMENT_MODEL_DIR, cache=sentiment_cache)
+else:
+    sentiment = SentimentClassifier.load('artifact/transform.pkl', 'artifact/sentiment_model.pkl', cache=sentiment_cache)
 
 
 # converting list of string to list (eg. "["abc","def"]" to ["abc","def"])
@@ -47,6 +89,38 @@ def convert_to_list(my_list):
 app = Flask(__name__)
 
 
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_latency(response):
+    # labelled by the route pattern (not the raw path) so the number of series stays bounded
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (route, request.method, str(response.status_code))
+    start = g.request_start
+
+    def observe():
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, *labels)
+
+    if response.is_streamed:
+        # after_request runs before a streamed body (/similar/batch) is generated: time it until the
+        # server has sent the whole body and closes the response
+        response.call_on_close(observe)
+    else:
+        observe()
+    return response
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus text exposition of the request / stage latency histograms, upstream and cache metrics.
+    """
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route("/")
 @app.route("/home")
 def home():
@@ -55,13 +129,31 @@ def home():
 
 @app.route("/titles")
 def titles():
-    titles = list(data['movie_title'].str.capitalize())
+    recommender = live_recommender.current().recommender
+    titles = [title.capitalize() for title in recommender.titles]
 
     # Convert HTML entities to regular characters
     # titles = [html.unescape(title) for title in titles]
     return jsonify(titles)
 
 
+@app.route("/titles/suggest")
+def titles_suggest():
+    """
+    Top matches for the autocomplete box: ?q=<typed text>&limit=<n, max 50>&fuzzy=<0|1>.
+    """
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    fuzzy = request.args.get('fuzzy', '1') != '0'
+
+    if not query:
+        return jsonify([])
+
+    state = live_recommender.current()
+    rows = state.suggester.suggest(query, limit, fuzzy)
+    return jsonify([state.recommender.titles[row].capitalize() for row in rows])
+
+
 # Create an endpoint to proxy requests to external APIs
 @app.route("/proxy", methods=["GET"])
 def proxy_request():
@@ -77,10 +169,10 @@ def proxy_request():
     params_dict['api_key'] = API_KEY
 
     # Make the request to the external API with the API key
-    response = requests.get(url, params=params_dict)
+    response = http_client.get_json(url, params=params_dict)
 
     # Return the response from the external API to the client
-    return jsonify(response.json())
+    return jsonify(response)
 
 
 @app.route("/similar", methods=["POST"])
@@ -90,27 +182,13 @@ def similar():
         dat = request.get_json()
         title = dat[0].get("query")
 
-        movies_list = list(data['movie_title'].str.capitalize())
+        # neighbours are already sorted and never contain the requested movie itself
+        similar_movies = live_recommender.current().recommender.similar(title, 10)
 
-        if title not in movies_list:
+        if similar_movies is None:
             return jsonify({'error': 'Oops! The movie you requested is not in our records. Please make sure the spelling is correct or try with some other movies'}), 404
         else:
 
-            idx = data.loc[data['movie_title'].str.capitalize()
-                           == title].index[0]
-
-            lst = list(enumerate(similarity[idx]))
-
-            sorted_list = sorted(lst, key=lambda x: x[1], reverse=True)
-
-            # excluding first item since it is the requested movie itself
-            lst = sorted_list[1:11]
-
-            similar_movies = []
-            for index in range(len(lst)):
-                a = lst[index][0]
-                similar_movies.append(data['movie_title'][a])
-
             # Send just the top 10 most similar movie titles
 
             print("similar movies", similar_movies)
@@ -121,6 +199,42 @@ def similar():
         return jsonify({'error': 'An error occurred while processing the request'}), 500
 
 
+@app.route("/similar/batch", methods=["POST"])
+def similar_batch():
+    """
+    Neighbours of many movies in one request, for offline jobs (digests, carousels).
+
+    Body: a JSON list of titles or catalog row ids (also {"query": <title>} / {"id": <row id>} objects),
+    ?n=<neighbours per movie, max 100>. Streams one JSON object per line (NDJSON) in request order:
+    {"query": ..., "id": <row id>, "similar": [...]}, or {"query": ..., "error": ...} for unknown movies.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        return jsonify({'error': 'Expected a JSON list of titles or ids'}), 400
+    n = max(1, min(request.args.get('n', 10, type=int), 100))
+
+    queries = [item.get('id', item.get('query')) if isinstance(item, dict) else item for item in data]
+    # the whole batch is answered from the same catalog version, even if a new build is swapped in meanwhile
+    recommender = live_recommender.current().recommender
+
+    rows = recommender.resolve(queries)
+
+    def generate():
+        for start in range(0, len(queries), SIMILAR_BATCH_CHUNK):
+            chunk = rows[start:start + SIMILAR_BATCH_CHUNK]
+            found = chunk >= 0
+            # one vectorized neighbour lookup for all the known movies of the chunk
+            similar_movies = iter(recommender.similar_many(chunk[found], n))
+            for query, row, known in zip(queries[start:start + SIMILAR_BATCH_CHUNK], chunk.tolist(), found):
+                if known:
+                    line = {'query': query, 'id': row, 'similar': next(similar_movies)}
+                else:
+                    line = {'query': query, 'error': 'The movie you requested is not in our records'}
+                yield json.dumps(line) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route("/movie_id", methods=["POST"])
 def movie_id():
     try:
@@ -134,8 +248,8 @@ def movie_id():
             'query': title}
 
         # Make the request to the external API with the API key
-        response = requests.get(url, params=params)
-        return jsonify(response.json())
+        response = http_client.get_json(url, params=params)
+        return jsonify(response)
 
     except Exception as e:
         # Handle any exceptions gracefully
@@ -152,8 +266,8 @@ def MovieCastes():
         url = data[0].get("URL")
 
         # Make the request to the external API with the API key
-        response = requests.get(url, {'api_key': API_KEY})
-        return jsonify(response.json())
+        response = http_client.get_json(url, {'api_key': API_KEY})
+        return jsonify(response)
 
     except Exception as e:
         # Handle any exceptions gracefully
@@ -166,31 +280,60 @@ def CastesDetails():
     data = request.get_json()
     url = data[0].get("URL")
     # Make the request to the external API with the API key
-    response = requests.get(url, {'api_key': API_KEY})
+    response = http_client.get_json(url, {'api_key': API_KEY})
 
-    return jsonify(response.json())
+    return jsonify(response)
 
 
-@app.route("/recommend", methods=["POST"])
-def recommend():
+@app.route("/movie_page", methods=["POST"])
+def movie_page():
+    """
+    Everything the movie page needs (details, cast with bios, similar titles with posters and
+    reviews with sentiment) in one payload, fetched concurrently on the server.
+    """
+    try:
+        # Get the JSON data from the request
+        dat = request.get_json()
+        title = dat[0].get("query")
+
+        similar_movies = live_recommender.current().recommender.similar(title, 10)
+        if similar_movies is None:
+            return jsonify({'error': 'Oops! The movie you requested is not in our records. Please make sure the spelling is correct or try with some other movies'}), 404
+
+        page = build_movie_page(title, similar_movies, sentiment, API_KEY)
+        if page is None:
+            return jsonify({'error': 'The movie you requested was not found on TMDb'}), 404
+        return jsonify(page)
+
+    except Exception as e:
+        # Handle any exceptions gracefully
+        print("Error in movie_page route:", e)
+        return jsonify({'error': 'An error occurred while processing the request'}), 500
+
+
+def recommend_context(form, reviews_list, reviews_status):
+    """
+    Template variables of the recommend page from the posted movie details (form) and the classified
+    reviews, shared by the /recommend view and its async counterpart in asgi.py. Raises KeyError for a
+    missing form field.
+    """
     # getting data from AJAX request
-    title = request.form['title']
-    cast_ids = request.form['cast_ids']
-    cast_names = request.form['cast_names']
-    cast_chars = request.form['cast_chars']
-    cast_bdays = request.form['cast_bdays']
-    cast_bios = request.form['cast_bios']
-    cast_places = request.form['cast_places']
-    cast_profiles = request.form['cast_profiles']
-    imdb_id = request.form['imdb_id']
-    poster = request.form['poster']
-    genres = request.form['genres']
-    overview = request.form['overview']
-    vote_average = request.form['rating']
-    release_date = request.form['release_date']
-    runtime = request.form['runtime']
-    rec_movies = request.form['recommended_movies']
-    rec_posters = request.form['posters']
+    title = form['title']
+    cast_ids = form['cast_ids']
+    cast_names = form['cast_names']
+    cast_chars = form['cast_chars']
+    cast_bdays = form['cast_bdays']
+    cast_bios = form['cast_bios']
+    cast_places = form['cast_places']
+    cast_profiles = form['cast_profiles']
+    poster = form['poster']
+    genres = form['genres']
+    overview = form['overview']
+    vote_average = form['rating']
+    release_date = form['release_date']
+    runtime = form['runtime']
+    rec_movies = form['recommended_movies']
+    rec_posters = form['posters']
 
     # call the convert_to_list function for every string that needs to be converted to list
     rec_movies = convert_to_list(rec_movies)
@@ -222,31 +365,39 @@ def recommend():
     cast_details = {cast_names[i]: [cast_ids[i], cast_profiles[i], cast_bdays[i],
                                     cast_places[i], cast_bios[i]] for i in range(len(cast_places))}
 
-    # web scraping to get user reviews from IMDB site
-    sauce = urllib.request.urlopen(
-        'https://www.imdb.com/title/{}/reviews?ref_=tt_ov_rt'.format(imdb_id)).read()
-    soup = bs.BeautifulSoup(sauce, 'lxml')
-    soup_result = soup.find_all("div", {"class": "text show-more__control"})
-
-    reviews_list = []  # list of reviews
-    reviews_status = []  # list of comments (good or bad)
-    for reviews in soup_result:
-        if reviews.string:
-            reviews_list.append(reviews.string)
-            # passing the review to our model
-            movie_review_list = np.array([reviews.string])
-            movie_vector = vectorizer.transform(movie_review_list)
-            pred = clf.predict(movie_vector)
-            reviews_status.append('Good' if pred else 'Bad')
-
     # combining reviews and comments into a dictionary
     movie_reviews = {reviews_list[i]: reviews_status[i]
                      for i in range(len(reviews_list))}
 
     # passing all the data to the html file
-    return render_template('recommend.html', title=title, poster=poster, overview=overview, vote_average=vote_average,
-                           release_date=release_date, runtime=runtime,  genres=genres,
-                           movie_cards=movie_cards, reviews=movie_reviews, casts=casts, cast_details=cast_details)
+    return dict(title=title, poster=poster, overview=overview, vote_average=vote_average,
+                release_date=release_date, runtime=runtime,  genres=genres,
+                movie_cards=movie_cards, reviews=movie_reviews, casts=casts, cast_details=cast_details)
+
+
+def render_recommend(form, reviews_list, reviews_status):
+    """
+    The recommend page of the /recommend view, see recommend_context().
+    """
+    return render_template('recommend.html', **recommend_context(form, reviews_list, reviews_status))
+
+
+def render_recommend_page(context, url_for):
+    """
+    recommend.html rendered from recommend_context() outside of a Flask request (the async mode in
+    asgi.py), url_for building its static urls.
+    """
+    return app.jinja_env.get_template('recommend.html').render(context, url_for=url_for)
+
+
+@app.route("/recommend", methods=["POST"])
+def recommend():
+    imdb_id = request.form['imdb_id']
+    # web scraping to get user reviews from IMDB site, list of reviews
+    reviews_list = get_reviews(imdb_id)
+    # passing all the reviews to our model at once, list of comments (good or bad)
+    reviews_status, _ = sentiment.predict(reviews_list, title_id=imdb_id)
+    return render_recommend(request.form, reviews_list, reviews_status)
 
 
 if __name__ == '__main__':
@@ -1,24 +1,15 @@
 # import utils functions
-from preprocess.utils import store_csv
-from preprocess.utils import get_final_data
-from preprocess.utils import clean_data
+from preprocess.utils import CHUNKSIZE
+from preprocess.utils import detect_encoding
+from preprocess.utils import get_processed_df3
+from preprocess.utils import stream_final_data
 
 # import libraries
+import itertools
 import pandas as pd
-import chardet
-
-df1 = pd.read_csv("../data/data.csv")
-df2 = pd.read_csv("../data/BollywoodMovieDetail.csv")
-
-
-# Detect encoding for the problematic file
-with open("../data/IMDb Movies India.csv", 'rb') as f:
-    result = chardet.detect(f.read())
-
-# Use the detected encoding
-df3 = pd.read_csv("../data/IMDb Movies India.csv", encoding=result['encoding'])
 
 
+# df2 ("../data/BollywoodMovieDetail.csv") is not needed:
 # df2['releaseYear'].unique()
 
 # df3['Year'].unique()
@@ -26,9 +17,15 @@ df3 = pd.read_csv("../data/IMDb Movies India.csv", encoding=result['encoding'])
 # Just process df3 it has already movies from the year present in df2.
 
 
-df = get_final_data(df1, df3)
+# Detect encoding for the problematic file
+encoding = detect_encoding("../data/IMDb Movies India.csv")
+
+# Read both files in chunks, the first occurrence of a title wins (data.csv first)
+df1_chunks = pd.read_csv("../data/data.csv", chunksize=CHUNKSIZE)
+df3_chunks = (get_processed_df3(chunk)
+              for chunk in pd.read_csv("../data/IMDb Movies India.csv", encoding=encoding, chunksize=CHUNKSIZE))
 
-# clean data
-df = clean_data(df)
-# save df to csv
-store_csv(df, "../data/final_data.csv")
+# clean, deduplicate and save to csv and to the columnar catalog loaded by the app
+n_rows = stream_final_data(itertools.chain(df1_chunks, df3_chunks),
+                           csv_path="../data/final_data.csv", catalog_dir="../data/final_data", clean=True)
+print(f"{n_rows} movies written")
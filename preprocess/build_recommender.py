@@ -0,0 +1,55 @@
+# Offline build step for the recommender used by main.py.
+# Vectorizes final_data.csv (or the columnar ./data/final_data catalog), computes the top-K neighbour table once and writes a versioned
+# artifact that every app worker memory-maps at startup instead of refitting.
+#
+# Run from the repository root:
+#     python -m preprocess.build_recommender --data ./data/final_data.csv --out ./artifact/recommender
+
+# import recommender functions
+from recommender.artifact import DEFAULT_ARTIFACT_DIR
+from recommender.artifact import save_artifact
+from recommender.catalog import is_catalog
+from recommender.catalog import load_catalog
+from recommender.engines import DEFAULT_COMPONENTS
+from recommender.engines import DEFAULT_ENGINE
+from recommender.engines import DEFAULT_NPROBE
+from recommender.engines import ENGINES
+from recommender.index import DEFAULT_K
+from recommender.model import Recommender
+
+# import libraries
+import argparse
+import time
+import pandas as pd
+
+
+parser = argparse.ArgumentParser(description="Build the recommender artifact loaded by main.py")
+parser.add_argument("--data", default="./data/final_data.csv", help="final_data.csv or catalog directory to vectorize")
+parser.add_argument("--out", default=DEFAULT_ARTIFACT_DIR, help="artifact root directory")
+parser.add_argument("-k", type=int, default=DEFAULT_K, help="neighbours kept per title")
+parser.add_argument("--engine", choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                    help="similarity engine: exact, or approximate ivf / svd for large catalogs")
+parser.add_argument("--nlist", type=int, help="ivf: number of clusters (default sqrt of the catalog size)")
+parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="ivf: clusters scored per title")
+parser.add_argument("--components", type=int, default=DEFAULT_COMPONENTS, help="svd: embedding dimension")
+args = parser.parse_args()
+
+engine_params = {
+    "exact": {},
+    "ivf": {"nlist": args.nlist, "nprobe": args.nprobe},
+    "svd": {"n_components": args.components},
+}[args.engine]
+
+start = time.perf_counter()
+
+if is_catalog(args.data):
+    catalog = load_catalog(args.data, columns=["movie_title", "all_info"])
+    recommender = Recommender.from_catalog(catalog["movie_title"], catalog["all_info"], k=args.k,
+                                           engine=args.engine, **engine_params)
+else:
+    df = pd.read_csv(args.data, usecols=["movie_title", "all_info"])
+    recommender = Recommender.from_frame(df, k=args.k, engine=args.engine, **engine_params)
+build_dir = save_artifact(recommender, args.out, source=args.data)
+
+print(f"Recommender artifact ({args.engine}) for {len(recommender)} titles written to {build_dir} "
+      f"in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,38 @@
+# Offline bulk export of the top-K neighbours of every title, e.g. to prewarm a CDN or cache.
+# Scores the whole catalog of the current recommender artifact in blocks across a process pool,
+# memory is bounded by the block size instead of N^2, and writes compact .npy files
+# (int32 row ids, float32 or float16 scores, plus the titles) to the output directory.
+#
+# Run from the repository root, after preprocess/build_recommender.py:
+#     python -m preprocess.export_neighbors --out ./data/neighbors -k 100 --workers 8
+
+# import recommender functions
+from recommender.artifact import DEFAULT_ARTIFACT_DIR
+from recommender.export import export_neighbors
+from recommender.index import DEFAULT_BLOCK_BYTES
+from recommender.index import DEFAULT_K
+from services.memory import format_mb
+
+# import libraries
+import argparse
+import numpy as np
+
+
+parser = argparse.ArgumentParser(description="Export the top-K neighbours of every title")
+parser.add_argument("--out", required=True, help="output directory")
+parser.add_argument("--root", default=DEFAULT_ARTIFACT_DIR, help="artifact root directory")
+parser.add_argument("-k", type=int, default=DEFAULT_K, help="neighbours per title")
+parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+parser.add_argument("--block-rows", type=int, help="titles per task (default: fit the block memory budget)")
+parser.add_argument("--block-mb", type=float, default=DEFAULT_BLOCK_BYTES / 2 ** 20,
+                    help="memory budget of one worker's dense score block in MB")
+parser.add_argument("--scores-dtype", choices=["float32", "float16"], default="float32")
+args = parser.parse_args()
+
+manifest = export_neighbors(args.out, root=args.root, k=args.k, workers=args.workers, block_rows=args.block_rows,
+                            block_bytes=int(args.block_mb * 2 ** 20), scores_dtype=np.dtype(args.scores_dtype))
+
+print(f"Exported {manifest['k']} neighbours of {manifest['n_titles']} titles to {args.out} "
+      f"in {manifest['seconds']:.1f}s ({manifest['rows_per_sec']:.0f} rows/s), peak RSS "
+      f"{format_mb(manifest['peak_rss_bytes'])} (parent), "
+      f"{format_mb(manifest['peak_worker_rss_bytes'])} (largest worker)")
@@ -0,0 +1,27 @@
+# Export the pickled sentiment artifacts (transform.pkl + sentiment_model.pkl, from either training
+# mode of sentiment-model/naive-bayes.py) as a directory of memory-mappable float32 arrays.
+# main.py loads that directory instead of the pickles when it exists: startup skips rebuilding the
+# vocabulary dict, and all workers share one copy of the model pages.
+#
+# Run from the repository root, after training:
+#     python -m preprocess.export_sentiment_model --out ./artifact/sentiment
+
+# import sentiment functions
+from services.sentiment import COMPACT_MODEL_DIR, MODEL_PATH, TRANSFORM_PATH
+from services.sentiment import SentimentClassifier, export_compact_model
+
+# import libraries
+import argparse
+
+
+parser = argparse.ArgumentParser(description="Export the sentiment model as memory-mappable arrays")
+parser.add_argument("--transform", default=TRANSFORM_PATH, help="pickled vectorizer")
+parser.add_argument("--model", default=MODEL_PATH, help="pickled MultinomialNB")
+parser.add_argument("--out", default=COMPACT_MODEL_DIR, help="output directory")
+args = parser.parse_args()
+
+sentiment = SentimentClassifier.load(args.transform, args.model)
+manifest = export_compact_model(sentiment.vectorizer, sentiment.clf, args.out)
+
+print(f"Exported the {manifest['kind']} model ({manifest['n_features']} features, "
+      f"classes {manifest['classes']}) to {args.out}, version {manifest['version'][:16]}")
@@ -4,17 +4,19 @@ from preprocess.utils import get_wiki_df
 from preprocess.utils import get_processed_df1
 from preprocess.utils import get_processed_df2
 from preprocess.utils import process_merged_df
-from preprocess.utils import get_final_df
-from preprocess.utils import store_csv
+from preprocess.utils import stream_final_data
+from preprocess.utils import CHUNKSIZE
 
 # import libraries
+import itertools
 import pandas as pd
-import numpy as np
 
 
-df1 = pd.read_csv("../data/movie_metadata.csv")
-df2 = pd.read_csv("../data/movies_metadata.csv")
-df3 = pd.read_csv("../data/credits.csv")
+# movie_metadata.csv and credits.csv are read in chunks, only the columns of movies_metadata.csv
+# needed for the merge are loaded in full
+df1 = pd.read_csv("../data/movie_metadata.csv", chunksize=CHUNKSIZE)
+df2 = pd.read_csv("../data/movies_metadata.csv", usecols=['id', 'genres', 'title'], low_memory=False)
+df3 = pd.read_csv("../data/credits.csv", chunksize=CHUNKSIZE)
 
 # Links of wikipedia tables
 
@@ -43,15 +45,15 @@ df23 = get_wiki_df(tables23)
 
 
 # Process df1
-df1 = get_processed_df1(df1)
+df1 = (get_processed_df1(chunk) for chunk in df1)
 
 
 # Process df2
 df2 = get_processed_df2(df2)
 
 
-# Process combined df2 and df3
-df4 = process_merged_df(df2, df3)
+# Process combined df2 and df3, one credits chunk at a time
+df4 = (process_merged_df(df2, chunk) for chunk in df3)
 
 
 # Process 2018 Movies
@@ -81,9 +83,7 @@ df23 = get_wiki_process_data(df23)
 
 # Merge and Clean final dataframes
 # We get first level clean data as df1, df4 (got from df2 and df3), df18 to df23.
-# Lets merge it to a single df and preprocess that.
-df = get_final_df(df1, df4, df18, df19, df20, df21, df22, df23)
-
-
-# store to csv
-store_csv(df, '../data/data.csv')
+# Lets stream them in that order, deduplicating titles across chunks, and store to csv.
+chunks = itertools.chain(df1, df4, [df18, df19, df20, df21, df22, df23])
+n_rows = stream_final_data(chunks, csv_path='../data/data.csv')
+print(f"{n_rows} movies written")
@@ -0,0 +1,40 @@
+# Incremental catalog update for the recommender artifact.
+# Appends new releases (a csv with the final_data.csv columns) to the current artifact without
+# refitting: the vocabulary is extended, only the new rows are scored against the catalog and only
+# the neighbour lists the new movies enter are rewritten. The result is published as a new build,
+# running app workers pick it up on their next reload check (RECOMMENDER_RELOAD_INTERVAL).
+# Only artifacts built with the exact engine can be extended, ivf / svd ones have to be rebuilt.
+#
+# Run from the repository root:
+#     python -m preprocess.update_recommender --data ./data/new_movies.csv
+
+# import utils and recommender functions
+from preprocess.utils import clean_data
+from recommender.artifact import DEFAULT_ARTIFACT_DIR
+from recommender.artifact import load_artifact
+from recommender.artifact import save_artifact
+from recommender.incremental import append_movies
+
+# import libraries
+import argparse
+import time
+import pandas as pd
+
+
+parser = argparse.ArgumentParser(description="Append new movies to the recommender artifact")
+parser.add_argument("--data", required=True, help="csv with movie_title and all_info columns")
+parser.add_argument("--root", default=DEFAULT_ARTIFACT_DIR, help="artifact root directory")
+args = parser.parse_args()
+
+start = time.perf_counter()
+
+recommender = load_artifact(args.root)
+df = clean_data(pd.read_csv(args.data, usecols=["movie_title", "all_info"]).dropna())
+
+updated = append_movies(recommender, list(df["movie_title"]), list(df["all_info"]))
+added = len(updated) - len(recommender)
+if added:
+    build_dir = save_artifact(updated, args.root, source=args.data)
+    print(f"Appended {added} movies ({len(updated)} total) to {build_dir} in {time.perf_counter() - start:.1f}s")
+else:
+    print("No new movies to append")
@@ -4,9 +4,19 @@ import requests
 from tmdbv3api import Movie
 from tmdbv3api import TMDb
 import ast
+import chardet
+import contextlib
+import html
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import os
 
+from recommender.catalog import CatalogWriter
+
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,33 +28,155 @@ tmdb.api_key = API_KEY
 tmdb_movie = Movie()
 
 
+def fetch_genre(movie, limiter=None):
+    """
+    Look up the genres of a movie on TMDb (a search plus a details call), letting errors propagate.
+
+    Args:
+        movie (str): The name of the movie to search for.
+        limiter (TokenBucket): Optional rate limiter, one token is taken per TMDb call.
+
+    Returns:
+        str: The genres of the movie separated by spaces, or np.nan if the movie is not found.
+    """
+    if limiter is not None:
+        limiter.acquire()
+    result = tmdb_movie.search(movie)
+    if len(result) == 0:
+        return np.nan
+
+    movie_id = result[0].id
+    if limiter is not None:
+        limiter.acquire()
+    response = requests.get(
+        f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={tmdb.api_key}", timeout=10)
+    response.raise_for_status()  # Check for request errors
+    json_data = response.json()
+    genres_list = json_data.get('genres', [])
+    return ' '.join(genre.get('name', '') for genre in genres_list) or np.nan
+
+
 def get_genre(movie):
     """
     A function to retrieve the genres of a movie using the TMDb API.
     Args:
         movie (str): The name of the movie to search for.
-        API_KEY (str): The API key for accessing the TMDb API.
     Returns:
         str: A string containing the genres of the movie separated by spaces, or np.NaN if the movie is not found or an error occurs.
     """
 
     try:
-        result = tmdb_movie.search(movie)
-        if len(result) > 0:
-            movie_id = result[0].id
-            response = requests.get(
-                f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={tmdb.api_key}")
-            response.raise_for_status()  # Check for request errors
-            json_data = response.json()
-            genres_list = json_data.get('genres', [])
-            movie_genres = ' '.join(genre.get('name', '')
-                                    for genre in genres_list) or np.NaN
-            return movie_genres
-        else:
-            return np.NaN
+        return fetch_genre(movie)
     except Exception as e:
         print(f"Error for movie '{movie}': {e}")
-        return np.NaN
+        return np.nan
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_genre_checkpoint(path):
+    """
+    Read a genre checkpoint file (one {"title": ..., "genres": ...} JSON object per line) into a dict.
+    A partially written last line from an interrupted run is ignored.
+    """
+    genres = {}
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                genres[record['title']] = record['genres']
+    return genres
+
+
+def get_genres(titles, max_workers=8, rate=20, checkpoint_path='../data/genre_checkpoint.jsonl'):
+    """
+    Retrieve the genres of many movies concurrently, respecting the TMDb rate limit and resuming from a checkpoint.
+
+    Titles are looked up by a bounded thread pool; every TMDb call takes a token from a shared token bucket.
+    Each completed lookup (including "not found") is appended to the checkpoint file right away, so a rerun
+    after a crash only queries the titles that are still missing. Failed lookups are not checkpointed and
+    are retried on the next run.
+
+    Parameters:
+        titles (iterable of str): The movie titles.
+        max_workers (int): Number of concurrent lookups.
+        rate (float): Maximum TMDb calls per second.
+        checkpoint_path (str): JSON-lines file of finished lookups (its directory is created if needed),
+            None disables checkpointing. The default is relative to the working directory, like the other
+            ../data paths of the preprocess scripts.
+
+    Returns:
+        list: The genres of every title in input order (np.nan when unknown).
+    """
+    titles = [str(title) for title in titles]
+    done = load_genre_checkpoint(checkpoint_path)
+    pending = sorted(set(titles) - set(done))
+    print(f"Genres: {len(titles)} titles, {len(set(titles)) - len(pending)} from checkpoint, {len(pending)} to fetch")
+
+    limiter = TokenBucket(rate)
+    errors = 0
+    start = time.perf_counter()
+    checkpoint = None
+    if checkpoint_path:
+        # the default path is relative to the working directory, which may not have a data directory yet
+        os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+        checkpoint = open(checkpoint_path, 'a', encoding='utf-8')
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_genre, title, limiter): title for title in pending}
+            for count, future in enumerate(as_completed(futures), 1):
+                title = futures[future]
+                try:
+                    genres = future.result()
+                except Exception as e:
+                    errors += 1
+                    print(f"Error for movie '{title}': {e}")
+                    continue
+                genres = None if pd.isna(genres) else genres
+                done[title] = genres
+                if checkpoint is not None:
+                    checkpoint.write(json.dumps({'title': title, 'genres': genres}) + '\n')
+                    checkpoint.flush()
+                if count % 500 == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"Genres: {count}/{len(pending)} fetched, {count / elapsed:.1f} titles/s")
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    elapsed = time.perf_counter() - start
+    fetched = len(pending) - errors
+    print(f"Genres: fetched {fetched} titles in {elapsed:.1f}s "
+          f"({fetched / elapsed if elapsed else 0:.1f} titles/s), {errors} errors")
+    return [np.nan if done.get(title) is None else done[title] for title in titles]
 
 
 def get_wiki_df(tables):
@@ -152,12 +284,14 @@ def get_wiki_process_data(df):
     Returns:
         DataFrame: Processed dataframe with 'movie_title', 'genres', 'director_name', 'actor_1_name', 'actor_2_name', 'actor_3_name' columns.
     """
-    df['genres'] = df['Title'].map(lambda x: get_genre(str(x)))
+    df['genres'] = get_genres(df['Title'])
     df['director_name'] = df['Cast and crew'].map(
         lambda x: get_director(str(x)))
-    df['actor_1_name'] = df['Cast and crew'].map(lambda x: get_actor1(str(x)))
-    df['actor_2_name'] = df['Cast and crew'].map(lambda x: get_actor2(str(x)))
-    df['actor_3_name'] = df['Cast and crew'].map(lambda x: get_actor3(str(x)))
+    # split the actors part once, same result as get_actor1/2/3
+    actors = df['Cast and crew'].astype(str).str.split("(screenplay); ").str[-1].str.split(", ")
+    df['actor_1_name'] = actors.str[0]
+    df['actor_2_name'] = actors.str[1]
+    df['actor_3_name'] = actors.str[2]
     df = df.loc[:, ['Title', 'genres', 'director_name',
                     'actor_1_name', 'actor_2_name', 'actor_3_name']]
     df = df.rename(columns={'Title': 'movie_title'})
@@ -202,35 +336,90 @@ def get_processed_df2(df2):
 
     # convert id into int
     df2['id'] = df2['id'].astype('int64')
+    return df2
 
 
-def process_merged_df(df2, df3):
-    # Combine df2 and df3
-    merged_df = pd.merge(df2, df3, on='id', how='inner')
+# a python-repr'd string value: '...' or "..." with backslash escapes
+_QUOTED = r"""(?:'((?:[^'\\]|\\.)*)'|"((?:[^"\\]|\\.)*)")"""
+NAME_PATTERN = r"'name': " + _QUOTED
+# the first group marks a match, so an empty name ('') can be told apart from no director
+DIRECTOR_PATTERN = r"('job': 'Director', 'name': )" + _QUOTED
+
+
+def _unquote(single, double):
+    """
+    Combine the two alternatives of a _QUOTED match into the plain string values.
+    """
+    def unescape(values, quote):
+        escaped = values.str.contains('\\', regex=False, na=False)
+        if escaped.any():
+            values = values.copy()
+            values[escaped] = values[escaped].map(lambda v: ast.literal_eval(quote + v + quote))
+        return values
 
-    merged_df['genres'] = merged_df['genres'].map(convert_to_objects)
-    merged_df['cast'] = merged_df['cast'].map(convert_to_objects)
-    merged_df['crew'] = merged_df['crew'].map(convert_to_objects)
+    return unescape(single, "'").fillna(unescape(double, '"'))
 
-    merged_df['genres_list'] = merged_df['genres'].apply(
-        lambda x: ' '.join([genre.get('name', '') for genre in x]) or np.NaN)
 
-    # actors
-    merged_df['actor_1_name'] = merged_df['cast'].apply(
-        lambda x: x[0]['name'] if x and len(x) > 0 else np.NaN)
-    merged_df['actor_2_name'] = merged_df['cast'].apply(
-        lambda x: x[1]['name'] if x and len(x) > 1 else np.NaN)
-    merged_df['actor_3_name'] = merged_df['cast'].apply(
-        lambda x: x[2]['name'] if x and len(x) > 2 else np.NaN)
+def parse_credits(genres, cast, crew):
+    """
+    Extract genres, the top 3 actors and the director from the raw credits/metadata columns in one pass.
+
+    The columns hold python-repr'd lists of dicts (e.g. "[{'id': 18, 'name': 'Drama'}]"). Instead of
+    materialising every dict with ast.literal_eval, only the needed 'name' values are pulled out with
+    vectorized regular expressions: every 'name' in genres, the first three in cast (cast is in billing
+    order) and the name following the first 'job': 'Director' in crew.
+
+    Parameters:
+        genres (Series): Raw genres column of movies_metadata.csv.
+        cast (Series): Raw cast column of credits.csv.
+        crew (Series): Raw crew column of credits.csv.
 
-    # directors
-    merged_df['director_name'] = merged_df['crew'].apply(lambda x: next(
-        (crew['name'] for crew in x if crew.get('job') == 'Director'), np.NaN))
+    Returns:
+        DataFrame: Columns 'genres', 'actor_1_name', 'actor_2_name', 'actor_3_name' and 'director_name',
+        np.nan where a value is missing, indexed like the inputs.
+    """
+    out = pd.DataFrame(index=genres.index)
 
-    df4 = merged_df.loc[:, ['title', 'genres_list', 'director_name',
-                            'actor_1_name', 'actor_2_name', 'actor_3_name']]
+    # an empty name ('') is extracted as NaN, it stays an empty string like with literal_eval
+    names = genres.astype(str).str.extractall(NAME_PATTERN)
+    names = _unquote(names[0], names[1]).fillna('')
+    out['genres'] = names.groupby(level=0).agg(' '.join).reindex(out.index)
+    out['genres'] = out['genres'].replace('', np.nan)
 
-    df4 = df4.rename(columns={'title': 'movie_title', 'genres_list': 'genres'})
+    actors = cast.astype(str).str.extractall(NAME_PATTERN)
+    actors = actors[actors.index.get_level_values('match') < 3]
+    actors = _unquote(actors[0], actors[1]).fillna('').unstack('match').reindex(index=out.index, columns=range(3))
+    for i in range(3):
+        out[f'actor_{i + 1}_name'] = actors[i]
+
+    director = crew.astype(str).str.extract(DIRECTOR_PATTERN)
+    out['director_name'] = _unquote(director[1], director[2]).mask(director[0].notna(), lambda name: name.fillna(''))
+    return out
+
+
+def process_merged_df(df2, df3):
+    """
+    Merge movies_metadata (df2) with credits (df3) and extract genres, top 3 actors and director.
+
+    Parameters:
+        df2 (DataFrame): Output of get_processed_df2 ('id', 'genres', 'title').
+        df3 (DataFrame): credits.csv ('cast', 'crew', 'id').
+
+    Returns:
+        DataFrame: 'movie_title', 'genres', 'director_name', 'actor_1_name', 'actor_2_name', 'actor_3_name'.
+    """
+    # Combine df2 and df3
+    merged_df = pd.merge(df2, df3, on='id', how='inner')
+
+    # genres, actors and directors in a single pass over the raw strings
+    credits = parse_credits(merged_df['genres'], merged_df['cast'], merged_df['crew'])
+
+    df4 = pd.concat([merged_df[['title']], credits], axis=1)
+    df4 = df4.loc[:, ['title', 'genres', 'director_name',
+                      'actor_1_name', 'actor_2_name', 'actor_3_name']]
+
+    df4 = df4.rename(columns={'title': 'movie_title'})
+    return df4
 
 
 def get_final_df(df1, df4, df18, df19, df20, df21, df22, df23):
@@ -270,15 +459,23 @@ def store_csv(df, path):
     df.to_csv(path, index=False)
 
 
-def get_final_data(df1, df3):
+def get_processed_df3(df3):
+    """
+    Select and rename the columns of IMDb Movies India.csv and build its all_info feature.
+    """
     df3 = df3[["Name", "Genre", "Director", "Actor 1", "Actor 2", "Actor 3"]]
-    df3.fillna("unknown", inplace=True)
+    df3 = df3.fillna("unknown")
 
     df3 = df3.rename(columns={"Name": "movie_title", "Genre": "genres", "Director": "director_name",
                      "Actor 1": "actor_1_name", "Actor 2": "actor_2_name", "Actor 3": "actor_3_name"})
     df3["all_info"] = df3["genres"] + " " + df3["director_name"] + " " + \
         df3["actor_1_name"] + " " + \
         df3["actor_2_name"] + " " + df3["actor_3_name"]
+    return df3
+
+
+def get_final_data(df1, df3):
+    df3 = get_processed_df3(df3)
 
     df = pd.concat([df1, df3], ignore_index=True)
 
@@ -311,3 +508,90 @@ def clean_data(data):
     data['all_info'] = data['all_info'].str.lower()
 
     return data
+
+
+# Streaming pipeline: the input csvs are read in chunks of CHUNKSIZE rows, so memory is bounded by a
+# chunk plus the set of titles already written instead of by the size of the concatenated inputs.
+
+CHUNKSIZE = 20000
+
+FINAL_COLUMNS = ['movie_title', 'genres', 'director_name',
+                 'actor_1_name', 'actor_2_name', 'actor_3_name', 'all_info']
+
+
+def detect_encoding(path, max_bytes=1 << 20):
+    """
+    Detect the encoding of a file from at most max_bytes, instead of reading the whole file for chardet.detect.
+    """
+    detector = chardet.UniversalDetector()
+    read = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            detector.feed(line)
+            read += len(line)
+            if detector.done or read >= max_bytes:
+                break
+    detector.close()
+    return detector.result['encoding']
+
+
+def finalize_chunk(df, seen, clean=False):
+    """
+    Apply the get_final_df steps to one chunk: lowercase titles, fill missing values as unknown,
+    build all_info when the chunk has none and drop the titles already in seen (which is updated).
+
+    Parameters:
+        df (DataFrame): Chunk with the FINAL_COLUMNS, all_info optional.
+        seen (set): Titles kept from the previous chunks.
+        clean (bool): Run clean_data on the chunk, before deduplicating so the cleaned titles are unique.
+
+    Returns:
+        DataFrame: The chunk restricted to the FINAL_COLUMNS.
+    """
+    df = df.copy()
+    df['movie_title'] = df['movie_title'].str.lower()
+    for column in ['movie_title', 'genres', 'director_name', 'actor_1_name', 'actor_2_name', 'actor_3_name']:
+        df[column] = df[column].fillna('unknown')
+
+    if 'all_info' not in df:
+        df['all_info'] = df['actor_1_name'] + ' ' + df['actor_2_name'] + ' ' + \
+            df['actor_3_name'] + ' ' + df['director_name'] + ' ' + df['genres']
+    df['all_info'] = df['all_info'].fillna('unknown')
+
+    if clean:
+        df = clean_data(df)
+
+    titles = df['movie_title']
+    keep = ~titles.duplicated() & ~titles.isin(seen)
+    df = df.loc[keep, FINAL_COLUMNS]
+    seen.update(df['movie_title'])
+    return df
+
+
+def stream_final_data(chunks, csv_path=None, catalog_dir=None, clean=False):
+    """
+    Deduplicate and finalize a stream of DataFrame chunks, writing each chunk as soon as it is processed.
+
+    Parameters:
+        chunks (iterable of DataFrame): Chunks in priority order, the first occurrence of a title is kept.
+        csv_path (str): Optional csv output, with the same columns as get_final_df.
+        catalog_dir (str): Optional columnar catalog output (see recommender.catalog), which the app
+            and build_recommender load memory-mapped instead of parsing the csv.
+        clean (bool): Run clean_data on every chunk.
+
+    Returns:
+        int: Number of rows written.
+    """
+    seen = set()
+    n_rows = 0
+    # the catalog is only finalized (given its manifest) when every chunk went through
+    with CatalogWriter(catalog_dir, FINAL_COLUMNS) if catalog_dir else contextlib.nullcontext() as writer:
+        for i, chunk in enumerate(chunks):
+            df = finalize_chunk(chunk, seen, clean=clean)
+            if csv_path:
+                df.to_csv(csv_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            if writer is not None:
+                writer.append(df)
+            n_rows += len(df)
+            print(f"chunk {i}: {len(df)} of {len(chunk)} rows kept, {n_rows} total")
+    return n_rows
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from recommender.index import NeighborIndex, TitleIndex
+from recommender.model import Recommender
+from recommender.strings import StringTable
+
+
+# bump whenever the on-disk layout changes, old artifacts are then rejected at load time
+FORMAT_VERSION = 2
+
+DEFAULT_ARTIFACT_DIR = 'artifact/recommender'
+
+# file (inside the artifact root) naming the build directory currently in use
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Hex sha256 digest of a file, read in chunks, or of the files of a directory (e.g. a columnar
+    catalog) taken in name order.
+    """
+    paths = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+    digest = hashlib.sha256()
+    for file_path in paths:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def save_artifact(recommender, root=DEFAULT_ARTIFACT_DIR, source=None):
+    """
+    Write a recommender to a new versioned build directory and point root/CURRENT at it.
+
+    Layout of a build directory:
+        manifest.json                       format version, sizes, source checksum
+        titles.{bin,offsets}.npy            catalog titles (StringTable)
+        vocabulary.{bin,offsets}.npy        CountVectorizer terms in column order (StringTable)
+        matrix.{data,indices,indptr}.npy    L2-normalised CSR count matrix
+        neighbors.{indices,scores}.npy      top-K neighbour table (int32 / float32)
+        title_index.slots.npy               open-addressing title hash table (TitleIndex)
+
+    Args:
+        recommender (Recommender): The recommender to persist.
+        root (str): Artifact root directory.
+        source (str): Optional path of the CSV or catalog the recommender was built from, recorded with its checksum.
+
+    Returns:
+        str: Path of the new build directory.
+    """
+    build_id = time.strftime('%Y%m%d-%H%M%S')
+    build_dir = os.path.join(root, build_id)
+    suffix = 1
+    while os.path.exists(build_dir):
+        build_dir = os.path.join(root, f'{build_id}-{suffix}')
+        suffix += 1
+    os.makedirs(build_dir)
+
+    recommender.titles.save(build_dir, 'titles')
+    recommender.vocabulary.save(build_dir, 'vocabulary')
+
+    matrix = recommender.matrix.tocsr()
+    np.save(os.path.join(build_dir, 'matrix.data.npy'), matrix.data.astype(np.float32))
+    # indices and indptr keep scipy's (shared) index dtype so loading does not copy them
+    np.save(os.path.join(build_dir, 'matrix.indices.npy'), matrix.indices)
+    np.save(os.path.join(build_dir, 'matrix.indptr.npy'), matrix.indptr)
+
+    np.save(os.path.join(build_dir, 'neighbors.indices.npy'), recommender.neighbors.indices)
+    np.save(os.path.join(build_dir, 'neighbors.scores.npy'), recommender.neighbors.scores)
+
+    np.save(os.path.join(build_dir, 'title_index.slots.npy'), recommender.title_index.slots)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'n_titles': len(recommender),
+        'n_terms': len(recommender.vocabulary),
+        'k': recommender.neighbors.k,
+        'engine': recommender.neighbors.engine,
+        'source': source,
+        'source_sha256': file_sha256(source) if source else None,
+    }
+    with open(os.path.join(build_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # switch readers over only once the build directory is complete
+    _write_atomic(os.path.join(root, CURRENT_FILE), os.path.basename(build_dir))
+    return build_dir
+
+
+def current_build(root=DEFAULT_ARTIFACT_DIR):
+    """
+    Path of the build directory root/CURRENT points at, or None when there is no artifact.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def load_artifact(root=DEFAULT_ARTIFACT_DIR, mmap_mode='r'):
+    """
+    Load the current recommender artifact.
+
+    With mmap_mode='r' every array is memory-mapped read-only, so gunicorn workers share the
+    same pages through the OS page cache instead of each holding a private copy.
+
+    Args:
+        root (str): Artifact root directory.
+        mmap_mode (str): Passed to np.load, None reads the arrays into memory.
+
+    Returns:
+        Recommender: The loaded recommender.
+
+    Raises:
+        FileNotFoundError: If no artifact has been built under root.
+        ValueError: If the artifact was written with a different FORMAT_VERSION.
+    """
+    build_dir = current_build(root)
+    if build_dir is None:
+        raise FileNotFoundError(f'No recommender artifact in {root}, run preprocess/build_recommender.py')
+    return load_build(build_dir, mmap_mode)
+
+
+def load_build(build_dir, mmap_mode='r'):
+    """
+    Load the recommender of one build directory, whichever build root/CURRENT points at.
+
+    Processes that must all see the same build (e.g. the workers of an export) resolve it once with
+    current_build and load it with this, as a new build may be published in between.
+
+    Raises:
+        ValueError: If the build was written with a different FORMAT_VERSION.
+    """
+    with open(os.path.join(build_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Recommender artifact {build_dir} has format version {manifest['format_version']}, "
+                         f"expected {FORMAT_VERSION}; rebuild it")
+
+    def load(name):
+        return np.load(os.path.join(build_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    titles = StringTable.load(build_dir, 'titles', mmap_mode)
+    vocabulary = StringTable.load(build_dir, 'vocabulary', mmap_mode)
+    matrix = sp.csr_matrix((load('matrix.data'), load('matrix.indices'), load('matrix.indptr')),
+                           shape=(manifest['n_titles'], manifest['n_terms']), copy=False)
+    neighbors = NeighborIndex(load('neighbors.indices'), load('neighbors.scores'), matrix,
+                              engine=manifest.get('engine', 'exact'))
+    title_index = TitleIndex(titles, load('title_index.slots'))
+
+    return Recommender(titles, vocabulary, neighbors, title_index, build=build_dir)
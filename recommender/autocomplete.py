@@ -0,0 +1,134 @@
+import numpy as np
+
+from recommender.index import normalize_title
+from recommender.strings import StringTable
+
+
+# share of the query's trigrams a title needs to be a typo tolerant match
+FUZZY_MIN_OVERLAP = 0.5
+
+
+def _pad(key):
+    return b'  ' + key.encode('utf-8') + b' '
+
+
+def _trigram_codes(buffer):
+    """
+    24-bit codes of every byte trigram starting in buffer (uint8 array), one per start position.
+    """
+    buffer = buffer.astype(np.int32)
+    return (buffer[:-2] << 16) | (buffer[1:-1] << 8) | buffer[2:]
+
+
+class TitleSuggester:
+    """
+    Server-side title autocomplete.
+
+    Prefix matches come from a binary search over the sorted, normalised titles, kept in a
+    StringTable so no per-title Python objects stay resident. Typo tolerant matches come from a
+    byte trigram inverted index stored as CSR arrays (sorted trigram codes, offsets, postings):
+    titles are ranked by how many of the query's trigrams they share, shorter titles first on ties.
+    """
+
+    def __init__(self, titles, fuzzy=True):
+        """
+        Args:
+            titles (iterable of str): Catalog titles in row order.
+            fuzzy (bool): Also build the trigram index for typo tolerant matching.
+        """
+        keys = {}
+        for row, title in enumerate(titles):
+            keys.setdefault(normalize_title(title), row)
+        ordered = sorted(keys)
+
+        self.keys = StringTable.from_strings(ordered)
+        self.rows = np.fromiter((keys[key] for key in ordered), dtype=np.int32, count=len(ordered))
+        self.lengths = np.diff(self.keys.offsets).astype(np.int32)
+
+        self.gram_codes = None
+        if fuzzy and ordered:
+            self._build_trigrams(ordered)
+
+    def _build_trigrams(self, ordered):
+        encoded = [_pad(key) for key in ordered]
+        padded_lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        del encoded
+
+        codes = _trigram_codes(buffer)
+        # title of every start position, and whether the trigram stays inside that title
+        positions = np.repeat(np.arange(len(ordered), dtype=np.int64), padded_lengths)[:len(codes)]
+        ends = np.cumsum(padded_lengths)
+        inside = np.arange(len(codes)) <= ends[positions] - 3
+
+        # sort (trigram, title) pairs and drop duplicates, np.unique is much slower on arrays this size
+        pairs = (codes[inside].astype(np.int64) << 32) | positions[inside]
+        pairs.sort()
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+
+        grams = pairs >> 32
+        starts = np.flatnonzero(np.r_[True, grams[1:] != grams[:-1]])
+        self.gram_codes = grams[starts].astype(np.int32)
+        self.gram_offsets = np.append(starts, len(pairs)).astype(np.int64)
+        self.postings = (pairs & 0xFFFFFFFF).astype(np.int32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _lower_bound(self, prefix):
+        lo, hi = 0, len(self.keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.keys[mid] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix(self, query, limit=10):
+        """
+        Row ids of up to limit titles starting with query, in alphabetical order.
+        """
+        prefix = normalize_title(query)
+        rows = []
+        position = self._lower_bound(prefix)
+        while position < len(self.keys) and len(rows) < limit and self.keys[position].startswith(prefix):
+            rows.append(int(self.rows[position]))
+            position += 1
+        return rows
+
+    def fuzzy(self, query, limit=10):
+        """
+        Row ids of up to limit titles closest to query, tolerating typos, best first.
+        """
+        key = normalize_title(query)
+        if self.gram_codes is None or not key:
+            return []
+
+        grams = np.unique(_trigram_codes(np.frombuffer(_pad(key), dtype=np.uint8)))
+        found = np.minimum(np.searchsorted(self.gram_codes, grams), len(self.gram_codes) - 1)
+        found = found[self.gram_codes[found] == grams]
+        if len(found) == 0:
+            return []
+
+        hits = np.concatenate([self.postings[self.gram_offsets[i]:self.gram_offsets[i + 1]] for i in found])
+        shared = np.bincount(hits, minlength=len(self.keys))
+        candidates = np.flatnonzero(shared >= max(1, int(np.ceil(FUZZY_MIN_OVERLAP * len(grams)))))
+        if len(candidates) == 0:
+            return []
+
+        # most shared trigrams first, then the title whose length is closest to the query
+        distance = np.abs(self.lengths[candidates] - len(key.encode('utf-8')))
+        order = np.lexsort((distance, -shared[candidates]))[:limit]
+        return [int(row) for row in self.rows[candidates[order]]]
+
+    def suggest(self, query, limit=10, fuzzy=False):
+        """
+        Up to limit row ids for the autocomplete box: prefix matches first, topped up with typo
+        tolerant matches when fuzzy is set.
+        """
+        rows = self.prefix(query, limit)
+        if fuzzy and len(rows) < limit:
+            seen = set(rows)
+            rows.extend(row for row in self.fuzzy(query, limit) if row not in seen)
+        return rows[:limit]
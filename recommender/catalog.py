@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from recommender.strings import StringTable
+
+
+CATALOG_MANIFEST = 'catalog.json'
+
+
+class CatalogWriter:
+    """
+    Streams DataFrame chunks into a columnar catalog directory with bounded memory.
+
+    Every string column is written as a StringTable (<column>.bin.npy + <column>.offsets.npy): the UTF-8
+    bytes are appended to a spill file as chunks arrive and only the int64 offsets are kept in memory.
+    load_catalog() memory-maps the result, so the app reads the catalog zero-copy instead of parsing a CSV.
+    """
+
+    def __init__(self, directory, columns):
+        self.directory = directory
+        self.columns = list(columns)
+        self.n_rows = 0
+        os.makedirs(directory, exist_ok=True)
+        self._spills = {column: open(self._spill_path(column), 'wb') for column in self.columns}
+        self._offsets = {column: [np.zeros(1, dtype=np.int64)] for column in self.columns}
+        self._sizes = {column: 0 for column in self.columns}
+
+    def _spill_path(self, column):
+        return os.path.join(self.directory, f'{column}.bin.tmp')
+
+    def append(self, df):
+        """
+        Append the rows of a DataFrame chunk (it must contain every catalog column).
+        """
+        for column in self.columns:
+            encoded = [str(value).encode('utf-8') for value in df[column]]
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+            self._offsets[column].append(self._sizes[column] + np.cumsum(lengths))
+            self._sizes[column] += int(lengths.sum())
+            self._spills[column].write(b''.join(encoded))
+        self.n_rows += len(df)
+
+    def close(self):
+        """
+        Turn the spill files into .npy arrays and write the catalog manifest.
+
+        A manifest left by an earlier catalog in the same directory is removed first and the new one is
+        written last, so an interrupted close never leaves a manifest next to half-written arrays.
+        """
+        manifest_path = os.path.join(self.directory, CATALOG_MANIFEST)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for column in self.columns:
+            self._spills[column].close()
+            size = self._sizes[column]
+            with open(os.path.join(self.directory, f'{column}.bin.npy'), 'wb') as out:
+                header = {'descr': '|u1', 'fortran_order': False, 'shape': (size,)}
+                np.lib.format.write_array_header_2_0(out, header)
+                with open(self._spill_path(column), 'rb') as spill:
+                    shutil.copyfileobj(spill, out)
+            os.remove(self._spill_path(column))
+            np.save(os.path.join(self.directory, f'{column}.offsets.npy'), np.concatenate(self._offsets[column]))
+
+        with open(manifest_path, 'w') as f:
+            json.dump({'columns': self.columns, 'n_rows': self.n_rows}, f, indent=2)
+
+    def abort(self):
+        """
+        Discard the rows written so far: delete the spill files, without writing arrays or a manifest.
+        """
+        for column in self.columns:
+            self._spills[column].close()
+            if os.path.exists(self._spill_path(column)):
+                os.remove(self._spill_path(column))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # a partial catalog must not look like a complete one to load_catalog / is_catalog
+        if exc[0] is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def is_catalog(path):
+    return os.path.isfile(os.path.join(path, CATALOG_MANIFEST))
+
+
+def load_catalog(directory, columns=None, mmap_mode='r'):
+    """
+    Load the columns of a catalog written by CatalogWriter.
+
+    Args:
+        directory (str): The catalog directory.
+        columns (list of str): Columns to load, all by default.
+        mmap_mode (str): Passed to np.load, None reads the arrays into memory.
+
+    Returns:
+        dict: Column name -> StringTable.
+    """
+    with open(os.path.join(directory, CATALOG_MANIFEST)) as f:
+        manifest = json.load(f)
+    return {column: StringTable.load(directory, column, mmap_mode) for column in columns or manifest['columns']}
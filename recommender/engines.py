@@ -0,0 +1,225 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from recommender.index import DEFAULT_BLOCK_BYTES, _block_rows, exact_search, normalize_rows, top_k
+
+
+DEFAULT_ENGINE = 'exact'
+
+# IVF defaults: lists probed per query and dimension of the random projection used to assign lists
+DEFAULT_NPROBE = 8
+DEFAULT_DIM = 64
+
+# dimension of the dense SVD embeddings
+DEFAULT_COMPONENTS = 128
+
+
+class ExactEngine:
+    """
+    Brute-force cosine similarity of every query against the whole catalog, O(N) per query.
+    """
+
+    name = 'exact'
+
+    def __init__(self, matrix, block_bytes=DEFAULT_BLOCK_BYTES):
+        """
+        Args:
+            matrix (scipy.sparse.csr_matrix): L2-normalised rows (see recommender.index.normalize_rows).
+            block_bytes (int): Memory budget for the dense score block of one batch of queries.
+        """
+        self.matrix = matrix
+        self.matrix_t = matrix.T.tocsc()
+        self.block_bytes = block_bytes
+
+    def search(self, rows, k):
+        """
+        Return (indices, scores) of the k nearest rows to each of rows, best first.
+        """
+        return exact_search(self.matrix, np.asarray(rows), k, self.block_bytes, self.matrix_t)
+
+
+class IVFEngine:
+    """
+    Inverted-file approximate search: the catalog is split into nlist clusters and a query is only
+    scored against the members of its nprobe closest clusters, about N * nprobe / nlist rows.
+
+    Clusters come from a spherical k-means over a Gaussian random projection of the rows (dim
+    dimensions, which preserves cosine similarity in expectation), so the coarse quantizer is pure
+    NumPy and independent of the vocabulary size. Candidates are then scored with the exact cosine
+    similarity on the sparse rows, so only recall (not the scores) is approximate.
+    """
+
+    name = 'ivf'
+
+    def __init__(self, matrix, nlist=None, nprobe=DEFAULT_NPROBE, dim=DEFAULT_DIM, n_iter=10, seed=0,
+                 block_bytes=DEFAULT_BLOCK_BYTES):
+        """
+        Args:
+            matrix (scipy.sparse.csr_matrix): L2-normalised rows (see recommender.index.normalize_rows).
+            nlist (int): Number of clusters, sqrt(N) when None.
+            nprobe (int): Clusters scored per query, the recall / latency knob.
+            dim (int): Dimension of the random projection the clusters are trained on.
+            n_iter (int): k-means iterations.
+            seed (int): Seed of the projection and of the k-means initialisation.
+            block_bytes (int): Memory budget for the dense score block of one batch of queries.
+        """
+        n_rows = matrix.shape[0]
+        self.matrix = matrix
+        self.nlist = max(1, min(nlist or int(round(np.sqrt(n_rows))), n_rows))
+        self.nprobe = max(1, min(nprobe, self.nlist))
+        self.block_bytes = block_bytes
+        rng = np.random.default_rng(seed)
+
+        projection = rng.standard_normal((matrix.shape[1], dim), dtype=np.float32)
+        self.reduced = normalize(np.asarray(matrix @ projection, dtype=np.float32))
+        self.centroids = self._train(rng, n_iter)
+
+        # members of every list, as a CSR-like (order, offsets) pair
+        assignment = self._nearest(self.reduced, 1)[:, 0]
+        self.order = np.argsort(assignment, kind='stable').astype(np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=self.nlist))])
+        # transposed rows in list order, the columns of a list are then a cheap CSC slice
+        self.lists_t = matrix[self.order].T.tocsc()
+
+    def _nearest(self, vectors, n):
+        """
+        Ids of the n closest centroids to every vector, closest first.
+        """
+        nearest = np.empty((len(vectors), n), dtype=np.intp)
+        step = max(1, self.block_bytes // (4 * self.nlist))
+        for start in range(0, len(vectors), step):
+            nearest[start:start + step], _ = top_k(vectors[start:start + step] @ self.centroids.T, n)
+        return nearest
+
+    def _train(self, rng, n_iter):
+        # spherical k-means on a sample of at most 64 points per cluster
+        n_rows = len(self.reduced)
+        sample = self.reduced[rng.choice(n_rows, min(n_rows, 64 * self.nlist), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), self.nlist, replace=False)]
+        for _ in range(n_iter):
+            assignment = self._nearest(sample, 1)[:, 0]
+            members = sp.csr_matrix((np.ones(len(sample), dtype=np.float32), (assignment, np.arange(len(sample)))),
+                                    shape=(self.nlist, len(sample)))
+            centroids = normalize(np.asarray(members @ sample))
+
+            # re-seed the clusters that lost all their points
+            empty = np.flatnonzero(np.bincount(assignment, minlength=self.nlist) == 0)
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+            self.centroids = centroids
+        return self.centroids
+
+    def search(self, rows, k):
+        """
+        Return (indices, scores) of the approximate k nearest rows to each of rows, best first.
+
+        Rows whose probed clusters hold fewer than k other titles are padded with -1 / -inf.
+        """
+        rows = np.asarray(rows)
+        k = max(0, min(k, self.matrix.shape[0] - 1))
+        indices = np.full((len(rows), k), -1, dtype=np.int32)
+        scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        if not k or not len(rows):
+            return indices, scores
+
+        # group the (query, list) pairs by list, every list is then scored once for all its queries
+        probes = self._nearest(self.reduced[rows], self.nprobe).ravel()
+        queries = np.repeat(np.arange(len(rows)), self.nprobe)
+        by_list = np.argsort(probes, kind='stable')
+        probes, queries = probes[by_list], queries[by_list]
+        starts = np.flatnonzero(np.r_[True, probes[1:] != probes[:-1]])
+        ends = np.r_[starts[1:], len(probes)]
+
+        for list_id, start, end in zip(probes[starts], starts, ends):
+            first, last = self.offsets[list_id], self.offsets[list_id + 1]
+            if first == last:
+                continue
+            members = self.order[first:last]
+            members_t = self.lists_t[:, first:last]
+
+            step = max(1, self.block_bytes // (8 * (k + len(members))))
+            for block_start in range(start, end, step):
+                q = queries[block_start:min(block_start + step, end)]
+                block = (self.matrix[rows[q]] @ members_t).toarray()
+                # the title itself is never one of its own neighbours
+                block[rows[q][:, None] == members[None, :]] = -np.inf
+
+                candidate_ids = np.hstack([indices[q], np.broadcast_to(members, (len(q), len(members)))])
+                candidate_scores = np.hstack([scores[q], block])
+                best, scores[q] = top_k(candidate_scores, k)
+                indices[q] = np.take_along_axis(candidate_ids, best, axis=1)
+
+        return indices, scores
+
+
+class SVDEngine:
+    """
+    Cosine similarity between dense low-rank embeddings of the rows.
+
+    The sparse rows are projected with TruncatedSVD to n_components dimensions and re-normalised,
+    giving one contiguous (N, n_components) float32 array. Scoring a block of queries is then a
+    single BLAS matrix product whose cost depends on n_components instead of on the vocabulary
+    size, at the price of approximate scores (see benchmarks/bench_svd.py for the overlap with
+    the exact neighbours).
+    """
+
+    name = 'svd'
+
+    def __init__(self, matrix, n_components=DEFAULT_COMPONENTS, n_iter=5, seed=0, block_bytes=DEFAULT_BLOCK_BYTES):
+        """
+        Args:
+            matrix (scipy.sparse.csr_matrix): L2-normalised rows (see recommender.index.normalize_rows).
+            n_components (int): Embedding dimension, at most the vocabulary size - 1.
+            n_iter (int): Iterations of the randomized SVD solver.
+            seed (int): Seed of the randomized SVD solver.
+            block_bytes (int): Memory budget for the dense score block of one batch of queries.
+        """
+        self.matrix = matrix
+        self.block_bytes = block_bytes
+        n_components = max(1, min(n_components, matrix.shape[1] - 1))
+        svd = TruncatedSVD(n_components=n_components, n_iter=n_iter, random_state=seed)
+        embeddings = svd.fit_transform(matrix)
+        self.embeddings = np.ascontiguousarray(normalize(embeddings), dtype=np.float32)
+
+    def search(self, rows, k):
+        """
+        Return (indices, scores) of the k nearest rows to each of rows by embedding cosine, best first.
+        """
+        rows = np.asarray(rows)
+        n_rows = len(self.embeddings)
+        k = max(0, min(k, n_rows - 1))
+        indices = np.empty((len(rows), k), dtype=np.int32)
+        scores = np.empty((len(rows), k), dtype=np.float32)
+
+        step = _block_rows(n_rows, self.block_bytes)
+        for start in range(0, len(rows), step):
+            stop = min(start + step, len(rows))
+            block = self.embeddings[rows[start:stop]] @ self.embeddings.T
+
+            # the title itself is never one of its own neighbours
+            block[np.arange(stop - start), rows[start:stop]] = -np.inf
+
+            indices[start:stop], scores[start:stop] = top_k(block, k)
+
+        return indices, scores
+
+
+ENGINES = {engine.name: engine for engine in (ExactEngine, IVFEngine, SVDEngine)}
+
+
+def make_engine(name, count_matrix, **params):
+    """
+    Build the similarity engine called name ('exact', 'ivf' or 'svd') over a bag-of-words count matrix.
+
+    Args:
+        name (str): Key of ENGINES.
+        count_matrix (scipy.sparse matrix): One row per title, L2-normalised here.
+        **params: Engine parameters, e.g. nprobe and nlist for 'ivf' or n_components for 'svd'.
+
+    Raises:
+        ValueError: If name is not a known engine.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown similarity engine {name!r}, expected one of {', '.join(ENGINES)}")
+    return ENGINES[name](normalize_rows(count_matrix), **params)
@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from recommender.artifact import DEFAULT_ARTIFACT_DIR, load_artifact, load_build
+from recommender.index import DEFAULT_BLOCK_BYTES, DEFAULT_K, _block_rows, exact_search
+from services.memory import peak_rss_bytes
+
+
+EXPORT_MANIFEST = 'export.json'
+
+# per worker process: the catalog matrix (memory-mapped from the artifact) and its transpose
+_worker = {}
+
+
+def _init_worker(build_dir, k, block_bytes):
+    matrix = load_build(build_dir).matrix.tocsr()
+    _worker.update(matrix=matrix, matrix_t=matrix.T.tocsc(), k=k, block_bytes=block_bytes)
+
+
+def _search_block(start, stop):
+    indices, scores = exact_search(_worker['matrix'], np.arange(start, stop), _worker['k'],
+                                   _worker['block_bytes'], _worker['matrix_t'])
+    return start, indices, scores
+
+
+def export_neighbors(out_dir, root=DEFAULT_ARTIFACT_DIR, k=DEFAULT_K, workers=None, block_rows=None,
+                     block_bytes=DEFAULT_BLOCK_BYTES, scores_dtype=np.float32):
+    """
+    Compute the exact top-k neighbours of every title of the current artifact and write them to out_dir.
+
+    The catalog is split into blocks of block_rows titles scored by a pool of worker processes, each
+    holding one dense block_bytes score block at a time, so memory grows with the block size and not
+    with N^2. Results are written straight into memory-mapped output files:
+
+        neighbors.indices.npy   (N, k) int32 row ids, most similar first
+        neighbors.scores.npy    (N, k) cosine similarities (scores_dtype)
+        titles.{bin,offsets}.npy   catalog titles (StringTable) to map row ids back to titles
+        export.json             build, k, sizes and throughput
+
+    Args:
+        out_dir (str): Output directory, created if needed.
+        root (str): Artifact root directory (see recommender.artifact).
+        k (int): Neighbours per title.
+        workers (int): Worker processes, os.cpu_count() when None.
+        block_rows (int): Titles per task, the rows whose scores fit into block_bytes when None.
+        block_bytes (int): Memory budget for the dense score block of one worker.
+        scores_dtype: float32, or float16 to halve the scores file.
+
+    Returns:
+        dict: The export manifest, including rows_per_sec and the peak RSS of the parent and workers.
+    """
+    start_time = time.perf_counter()
+    # the build is resolved once: workers load this directory even if a newer one is published meanwhile
+    recommender = load_artifact(root)
+    n_rows = len(recommender)
+    k = max(0, min(k, n_rows - 1))
+    block_rows = block_rows or _block_rows(n_rows, block_bytes)
+
+    os.makedirs(out_dir, exist_ok=True)
+    recommender.titles.save(out_dir, 'titles')
+    indices = np.lib.format.open_memmap(os.path.join(out_dir, 'neighbors.indices.npy'), mode='w+',
+                                        dtype=np.int32, shape=(n_rows, k))
+    scores = np.lib.format.open_memmap(os.path.join(out_dir, 'neighbors.scores.npy'), mode='w+',
+                                       dtype=scores_dtype, shape=(n_rows, k))
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(recommender.build, k, block_bytes)) as pool:
+        futures = [pool.submit(_search_block, start, min(start + block_rows, n_rows))
+                   for start in range(0, n_rows, block_rows)]
+        for future in as_completed(futures):
+            start, block_indices, block_scores = future.result()
+            indices[start:start + len(block_indices)] = block_indices
+            scores[start:start + len(block_scores)] = block_scores
+
+    indices.flush()
+    scores.flush()
+    seconds = time.perf_counter() - start_time
+
+    manifest = {
+        'build': recommender.build,
+        'n_titles': n_rows,
+        'k': k,
+        'scores_dtype': np.dtype(scores_dtype).name,
+        'block_rows': block_rows,
+        'workers': workers or os.cpu_count(),
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(n_rows / seconds, 1) if seconds else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'peak_worker_rss_bytes': peak_rss_bytes(children=True),
+    }
+    with open(os.path.join(out_dir, EXPORT_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,142 @@
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from recommender.engines import ExactEngine
+from recommender.index import DEFAULT_BLOCK_BYTES, NeighborIndex, TitleIndex, _block_rows, normalize_title, top_k
+from recommender.model import Recommender
+from recommender.strings import StringTable
+
+
+def _concat_strings(table, strings):
+    extra = StringTable.from_strings(strings)
+    buffer = np.concatenate([np.asarray(table.buffer), extra.buffer])
+    offsets = np.concatenate([np.asarray(table.offsets), extra.offsets[1:] + table.offsets[-1]])
+    return StringTable(buffer, offsets)
+
+
+def vectorize_new(vocabulary, all_info):
+    """
+    Count-vectorize new documents against an existing vocabulary, extending it with unseen terms.
+
+    Tokenization matches the CountVectorizer() the recommender was fitted with. Existing columns keep
+    their meaning, new terms are appended as new columns, so old rows never have to be re-vectorized.
+
+    Args:
+        vocabulary (StringTable): Terms in column order.
+        all_info (iterable of str): The new documents.
+
+    Returns:
+        tuple: (count matrix of the new rows as CSR, list of new terms in column order).
+    """
+    analyzer = CountVectorizer().build_analyzer()
+    columns = {term: i for i, term in enumerate(vocabulary)}
+    new_terms = []
+
+    data, indices, indptr = [], [], [0]
+    for document in all_info:
+        for term, count in Counter(analyzer(str(document))).items():
+            column = columns.get(term)
+            if column is None:
+                column = columns[term] = len(columns)
+                new_terms.append(term)
+            indices.append(column)
+            data.append(count)
+        indptr.append(len(indices))
+
+    matrix = sp.csr_matrix((np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32),
+                            np.asarray(indptr, dtype=np.int64)), shape=(len(indptr) - 1, len(columns)))
+    return matrix, new_terms
+
+
+def append_movies(recommender, titles, all_info, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Return a new Recommender with movies appended, without refitting the existing catalog.
+
+    The new rows are vectorized against the existing vocabulary (extended with unseen terms) and scored
+    against the whole catalog for their own neighbour lists. Existing titles only have their list
+    updated when one of the new movies beats their current K-th neighbour. The given recommender is
+    not modified, so requests can keep using it until the caller swaps in the result.
+
+    The new rows are scored with exact cosine similarity, so only a recommender built by the 'exact'
+    engine can be extended. The ivf / svd engines are not kept in the artifact (only their
+    neighbour table is), and exact neighbours mixed into an approximate table would not match it.
+
+    Args:
+        recommender (Recommender): The current recommender.
+        titles (list of str): Titles of the new movies.
+        all_info (list of str): Their `all_info` bag-of-words text.
+        block_bytes (int): Memory budget for dense score blocks.
+
+    Returns:
+        Recommender: The extended recommender. Titles already in the catalog (or repeated within the
+        batch) are skipped, like the drop_duplicates in the preprocess pipeline.
+
+    Raises:
+        ValueError: If the recommender was built by an approximate engine.
+    """
+    engine = recommender.neighbors.engine
+    if engine != ExactEngine.name:
+        raise ValueError(f"Cannot append movies to a recommender built with the {engine!r} engine, only to an "
+                         f"{ExactEngine.name!r} one: rebuild the artifact with preprocess/build_recommender.py "
+                         f"--engine {engine} on the full catalog instead")
+
+    seen = set()
+    keep = []
+    for i, title in enumerate(titles):
+        key = normalize_title(title)
+        if key not in seen and title not in recommender.title_index:
+            seen.add(key)
+            keep.append(i)
+    titles = [titles[i] for i in keep]
+    all_info = [all_info[i] for i in keep]
+    if not titles:
+        return recommender
+
+    n_old = len(recommender)
+    k = recommender.neighbors.k
+
+    new_counts, new_terms = vectorize_new(recommender.vocabulary, all_info)
+    n_terms = new_counts.shape[1]
+    new_rows = normalize(new_counts, norm='l2', copy=False).tocsr()
+
+    old_matrix = recommender.matrix.tocsr()
+    old_matrix = sp.csr_matrix((old_matrix.data, old_matrix.indices, old_matrix.indptr), shape=(n_old, n_terms))
+    matrix = sp.vstack([old_matrix, new_rows], format='csr', dtype=np.float32)
+    matrix_t = matrix.T.tocsc()
+
+    # neighbour lists of the new movies, scored against the whole (extended) catalog
+    new_indices = np.empty((new_rows.shape[0], k), dtype=np.int32)
+    new_scores = np.empty((new_rows.shape[0], k), dtype=np.float32)
+    step = _block_rows(matrix.shape[0], block_bytes)
+    for start in range(0, new_rows.shape[0], step):
+        stop = min(start + step, new_rows.shape[0])
+        block = (new_rows[start:stop] @ matrix_t).toarray()
+        rows = np.arange(stop - start)
+        block[rows, n_old + start + rows] = -np.inf
+        new_indices[start:stop], new_scores[start:stop] = top_k(block, k)
+
+    # existing titles that gain one of the new movies as a neighbour
+    indices = np.concatenate([np.asarray(recommender.neighbors.indices), new_indices])
+    scores = np.concatenate([np.asarray(recommender.neighbors.scores), new_scores])
+    if k and n_old:
+        cross = (old_matrix @ new_rows.T).tocsr()
+        best_new = cross.max(axis=1).toarray().ravel()
+        affected = np.flatnonzero(best_new > scores[:n_old, -1])
+        new_ids = np.arange(n_old, n_old + new_rows.shape[0], dtype=np.int32)
+
+        step = max(1, block_bytes // (8 * (k + len(new_ids))))
+        for start in range(0, len(affected), step):
+            rows = affected[start:start + step]
+            candidate_ids = np.hstack([indices[rows], np.broadcast_to(new_ids, (len(rows), len(new_ids)))])
+            candidate_scores = np.hstack([scores[rows], cross[rows].toarray()])
+            order, scores[rows] = top_k(candidate_scores, k)
+            indices[rows] = np.take_along_axis(candidate_ids, order, axis=1)
+
+    all_titles = _concat_strings(recommender.titles, titles)
+    vocabulary = _concat_strings(recommender.vocabulary, new_terms)
+    neighbors = NeighborIndex(indices, scores, matrix, engine=recommender.neighbors.engine)
+    return Recommender(all_titles, vocabulary, neighbors, TitleIndex(all_titles), build=recommender.build)
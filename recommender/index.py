@@ -0,0 +1,264 @@
+import hashlib
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+
+# number of neighbours kept per title in the precomputed table
+DEFAULT_K = 50
+
+# upper bound (in bytes) for the dense score block computed at once
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def normalize_title(title):
+    """
+    Normalise a movie title for lookups, so "The Matrix", "the matrix " and "THE MATRIX" hit the same row.
+    """
+    return str(title).strip().lower()
+
+
+def title_hash(key):
+    """
+    Stable (process independent) 64-bit hash of a normalised title.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def top_k(scores, k):
+    """
+    Select the k largest scores along the last axis without sorting the whole array.
+
+    np.argpartition finds k best entries in O(N). Where more entries than it kept tie with the k-th
+    score, those rows keep the first tied entries by position instead, and only the k are sorted (by
+    score descending, position ascending), so the result is the head of a stable sort of the array.
+
+    Args:
+        scores (np.ndarray): 1-D or 2-D array of scores.
+        k (int): Number of entries to keep.
+
+    Returns:
+        tuple: (positions, scores) of the k best entries, best first.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = max(0, min(k, n))
+    shape = scores.shape[:-1] + (k,)
+    if k == 0:
+        return np.empty(shape, dtype=np.intp), np.empty(shape, dtype=scores.dtype)
+
+    flat = scores.reshape(-1, n)
+    top = np.argpartition(-flat, k - 1, axis=-1)[:, :k]
+    top_scores = np.take_along_axis(flat, top, axis=-1)
+
+    # rows where argpartition picked arbitrary members of a tie at the k-th score
+    kth = top_scores.min(axis=1, keepdims=True)
+    ties = (flat == kth).sum(axis=1) > (top_scores == kth).sum(axis=1)
+    if ties.any():
+        tied_rows = flat[ties]
+        above = tied_rows > kth[ties]
+        tied = tied_rows == kth[ties]
+        missing = k - above.sum(axis=1, keepdims=True, dtype=np.int32)
+        above |= tied & (np.cumsum(tied, axis=1, dtype=np.int32) <= missing)
+        top[ties] = np.nonzero(above)[1].reshape(-1, k)
+        top_scores[ties] = np.take_along_axis(tied_rows, top[ties], axis=-1)
+
+    order = np.lexsort((top, -top_scores), axis=-1)
+    top = np.take_along_axis(top, order, axis=-1)
+    return top.reshape(shape), np.take_along_axis(top_scores, order, axis=-1).reshape(shape)
+
+
+def _block_rows(n_rows, block_bytes):
+    """
+    Number of query rows whose dense float32 scores against the whole catalog fit into block_bytes.
+    """
+    return max(1, min(n_rows, block_bytes // (4 * max(n_rows, 1))))
+
+
+def normalize_rows(count_matrix):
+    """
+    L2-normalised float32 CSR copy of count_matrix, which turns the dot product into the cosine similarity.
+    """
+    return normalize(count_matrix.astype(np.float32), norm='l2', copy=True).tocsr()
+
+
+def exact_search(matrix, rows, k, block_bytes=DEFAULT_BLOCK_BYTES, matrix_t=None):
+    """
+    Exact top-k cosine neighbours of the given rows of an L2-normalised matrix, in blocks of rows.
+
+    Args:
+        matrix (scipy.sparse.csr_matrix): L2-normalised rows (see normalize_rows).
+        rows (np.ndarray): Row ids to search for, a row is never its own neighbour.
+        k (int): Number of neighbours per row (at most the number of rows - 1).
+        block_bytes (int): Memory budget for the dense score block of one batch of rows.
+        matrix_t (scipy.sparse.csc_matrix): matrix.T in CSC format, computed when None.
+
+    Returns:
+        tuple: (indices int32, scores float32) arrays of shape (len(rows), k), best first.
+    """
+    if matrix_t is None:
+        matrix_t = matrix.T.tocsc()
+    n_rows = matrix.shape[0]
+    k = max(0, min(k, n_rows - 1))
+
+    indices = np.empty((len(rows), k), dtype=np.int32)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+
+    step = _block_rows(n_rows, block_bytes)
+    for start in range(0, len(rows), step):
+        stop = min(start + step, len(rows))
+        block = (matrix[rows[start:stop]] @ matrix_t).toarray()
+
+        # the title itself is never one of its own neighbours
+        block[np.arange(stop - start), rows[start:stop]] = -np.inf
+
+        indices[start:stop], scores[start:stop] = top_k(block, k)
+
+    return indices, scores
+
+
+class NeighborIndex:
+    """
+    Sparse top-K neighbour table replacing the dense N x N cosine similarity matrix.
+
+    Row i of `indices` holds the row ids of the K most similar titles to title i (most similar first)
+    and row i of `scores` the matching cosine similarities. Memory is N * K * 8 bytes instead of N * N * 8.
+    When the normalised matrix is kept, requests for more than K neighbours are answered on demand.
+    An approximate engine may find fewer than K candidates for a title, the rest of its row is then -1.
+    """
+
+    def __init__(self, indices, scores, matrix=None, engine='exact'):
+        self.indices = indices
+        self.scores = scores
+        self.matrix = matrix
+        self.engine = engine
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    @classmethod
+    def from_matrix(cls, count_matrix, k=DEFAULT_K, block_bytes=DEFAULT_BLOCK_BYTES):
+        """
+        Build the neighbour table from a (sparse) bag-of-words matrix such as the CountVectorizer output.
+
+        Args:
+            count_matrix (scipy.sparse matrix): One row per title.
+            k (int): Number of neighbours to keep for every title.
+            block_bytes (int): Memory budget for the dense score block of one batch of rows.
+
+        Returns:
+            NeighborIndex: The populated index.
+        """
+        matrix = normalize_rows(count_matrix)
+        indices, scores = exact_search(matrix, np.arange(matrix.shape[0]), k, block_bytes=block_bytes)
+        return cls(indices, scores, matrix)
+
+    @classmethod
+    def from_engine(cls, engine, k=DEFAULT_K):
+        """
+        Build the neighbour table with a similarity engine (see recommender.engines), e.g. an
+        approximate one for catalogs too large for the exact N x N scoring.
+        """
+        indices, scores = engine.search(np.arange(engine.matrix.shape[0]), k)
+        return cls(indices, scores, engine.matrix, engine=engine.name)
+
+    def neighbors(self, idx, n=10):
+        """
+        Return the row ids and scores of the n most similar titles to row idx.
+
+        Answered from the precomputed table when n <= K, otherwise scored on demand against the whole catalog.
+        """
+        if n <= self.k or self.matrix is None:
+            ids, scores = self.indices[idx, :n], self.scores[idx, :n]
+            found = ids >= 0
+            return ids[found], scores[found]
+
+        row = (self.matrix[idx] @ self.matrix.T).toarray().ravel()
+        row[idx] = -np.inf
+        return top_k(row, min(n, len(self) - 1))
+
+    def neighbors_many(self, rows, n=10):
+        """
+        Row ids and scores of the n most similar titles to each of rows, as (len(rows), n) arrays.
+
+        One gather from the precomputed table when n <= K, otherwise one blocked sparse product against
+        the whole catalog. Entries an approximate engine did not fill are -1.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if n <= self.k or self.matrix is None:
+            return self.indices[rows, :n], self.scores[rows, :n]
+        return exact_search(self.matrix, rows, n)
+
+
+class TitleIndex:
+    """
+    Hash index from normalised movie title to catalog row id.
+
+    An open-addressing table of row ids (int32, -1 for empty slots) keyed by a stable 64-bit
+    blake2b hash of the normalised title. Collisions are resolved by comparing against the catalog
+    titles themselves, so the index holds no per-title Python objects and can be saved and
+    memory-mapped with the rest of the recommender artifact.
+
+    Duplicate titles resolve to their first row, like the boolean-mask lookup it replaces.
+    """
+
+    def __init__(self, titles, slots=None):
+        """
+        Args:
+            titles (sequence of str): Catalog titles in row order (list or StringTable).
+            slots (np.ndarray): Previously built table (see slots), built from titles when None.
+        """
+        self.titles = titles
+        self.slots = slots if slots is not None else self._build(titles)
+        self._mask = len(self.slots) - 1
+
+    @staticmethod
+    def _build(titles):
+        # power of two with load factor <= 0.5 keeps linear probe chains short
+        slots = np.full(1 << max(3, (2 * len(titles) - 1).bit_length()), -1, dtype=np.int32)
+        mask = len(slots) - 1
+        keys = {}
+        for row, title in enumerate(titles):
+            key = normalize_title(title)
+            if key in keys:
+                continue
+            keys[key] = row
+            slot = title_hash(key) & mask
+            while slots[slot] != -1:
+                slot = (slot + 1) & mask
+            slots[slot] = row
+        return slots
+
+    def __len__(self):
+        return int(np.count_nonzero(self.slots != -1))
+
+    def __contains__(self, title):
+        return self.get(title) is not None
+
+    def get_many(self, titles):
+        """
+        Row ids of titles as an int array, -1 for the titles not in the catalog.
+        """
+        rows = np.empty(len(titles), dtype=np.intp)
+        for i, title in enumerate(titles):
+            row = self.get(title)
+            rows[i] = -1 if row is None else row
+        return rows
+
+    def get(self, title):
+        """
+        Return the row id of title, or None when it is not in the catalog.
+        """
+        key = normalize_title(title)
+        slot = title_hash(key) & self._mask
+        while True:
+            row = int(self.slots[slot])
+            if row == -1:
+                return None
+            if normalize_title(self.titles[row]) == key:
+                return row
+            slot = (slot + 1) & self._mask
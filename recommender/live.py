@@ -0,0 +1,70 @@
+import threading
+from collections import namedtuple
+
+from recommender.artifact import current_build, load_artifact
+from recommender.autocomplete import TitleSuggester
+
+
+# everything a request reads, swapped as one object so a request never mixes two catalog versions
+RecommenderState = namedtuple('RecommenderState', ['recommender', 'suggester'])
+
+
+class LiveRecommender:
+    """
+    Holder of the recommender a worker serves, replaced atomically when the catalog changes.
+
+    Requests call current() once and keep using that state; swap() builds the replacement's indexes
+    first and then rebinds a single attribute, so in-flight requests finish on the old catalog and
+    none are dropped. refresh() (or the polling thread from start_polling) reloads the artifact when
+    root/CURRENT points at a newer build, e.g. one written by preprocess/update_recommender.py.
+    """
+
+    def __init__(self, recommender, root=None):
+        self.root = root
+        self._lock = threading.Lock()
+        self._state = RecommenderState(recommender, TitleSuggester(recommender.titles))
+        self._stop = threading.Event()
+
+    def current(self):
+        return self._state
+
+    def swap(self, recommender):
+        """
+        Serve recommender from now on.
+        """
+        with self._lock:
+            self._state = RecommenderState(recommender, TitleSuggester(recommender.titles))
+        print(f"Recommender swapped: {len(recommender)} titles (build {recommender.build})")
+
+    def refresh(self):
+        """
+        Load and swap in the current artifact build if it differs from the one being served.
+
+        Returns:
+            bool: Whether a new build was swapped in.
+        """
+        if self.root is None:
+            return False
+        build = current_build(self.root)
+        if build is None or build == self._state.recommender.build:
+            return False
+        self.swap(load_artifact(self.root))
+        return True
+
+    def start_polling(self, interval):
+        """
+        Check for a new artifact build every interval seconds in a daemon thread.
+        """
+        def poll():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print("Error reloading recommender:", e)
+
+        thread = threading.Thread(target=poll, name='recommender-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def stop_polling(self):
+        self._stop.set()
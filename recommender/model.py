@@ -0,0 +1,115 @@
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from recommender.engines import DEFAULT_ENGINE, make_engine
+from recommender.index import DEFAULT_K, NeighborIndex, TitleIndex
+from recommender.strings import StringTable
+from services import metrics
+
+
+class Recommender:
+    """
+    Everything `/similar` needs: catalog titles, the bag-of-words vocabulary, the L2-normalised
+    count matrix, the top-K neighbour table and the title -> row id index.
+
+    Built either in-process from the final_data.csv DataFrame (from_frame) or columnar catalog
+    (from_catalog), or loaded from the precomputed on-disk artifact (see recommender.artifact), in which case `build` is the path of
+    the artifact build directory it came from.
+    """
+
+    def __init__(self, titles, vocabulary, neighbors, title_index=None, build=None):
+        self.titles = titles
+        self.vocabulary = vocabulary
+        self.neighbors = neighbors
+        self.title_index = title_index if title_index is not None else TitleIndex(titles)
+        self.build = build
+
+    @property
+    def matrix(self):
+        return self.neighbors.matrix
+
+    def __len__(self):
+        return len(self.titles)
+
+    @classmethod
+    def from_frame(cls, data, k=DEFAULT_K, engine=DEFAULT_ENGINE, **engine_params):
+        """
+        Vectorize the `all_info` column of a final_data.csv DataFrame and build the neighbour table.
+
+        Args:
+            data (pandas.DataFrame): DataFrame with 'movie_title' and 'all_info' columns.
+            k (int): Number of neighbours kept per title.
+            engine (str): Similarity engine computing the neighbour table, see recommender.engines.
+            **engine_params: Parameters of the engine.
+
+        Returns:
+            Recommender: The populated recommender.
+        """
+        return cls.from_catalog(StringTable.from_strings(data['movie_title']), data['all_info'], k=k,
+                                engine=engine, **engine_params)
+
+    @classmethod
+    def from_catalog(cls, titles, all_info, k=DEFAULT_K, engine=DEFAULT_ENGINE, **engine_params):
+        """
+        Vectorize all_info and build the neighbour table, keeping titles as given.
+
+        Args:
+            titles (StringTable): Catalog titles, e.g. the memory-mapped column of a catalog
+                written by preprocess (see recommender.catalog), which is used without copying.
+            all_info (iterable of str): The all_info text of every title, in the same order.
+            k (int): Number of neighbours kept per title.
+            engine (str): Similarity engine computing the neighbour table: 'exact' scores every pair,
+                'ivf' only the titles of nearby clusters, 'svd' compares dense low-rank embeddings
+                (see recommender.engines).
+            **engine_params: Parameters of the engine, e.g. nprobe for 'ivf', n_components for 'svd'.
+
+        Returns:
+            Recommender: The populated recommender.
+        """
+        # creating a count matrix
+        cv = CountVectorizer()
+        count_matrix = cv.fit_transform(all_info)
+        neighbors = NeighborIndex.from_engine(make_engine(engine, count_matrix, **engine_params), k=k)
+
+        vocabulary = StringTable.from_strings(cv.get_feature_names_out())
+        return cls(titles, vocabulary, neighbors)
+
+    def similar(self, title, n=10):
+        """
+        Return the n most similar titles to title, or None when the title is not in the catalog.
+        """
+        with metrics.stage('index_lookup'):
+            idx = self.title_index.get(title)
+        if idx is None:
+            return None
+
+        with metrics.stage('top_k'):
+            neighbor_ids, _ = self.neighbors.neighbors(idx, n)
+        return [self.titles[a] for a in neighbor_ids]
+
+    def resolve(self, queries):
+        """
+        Catalog row ids of a mix of titles and row ids, -1 for unknown titles and out of range ids.
+        """
+        rows = np.full(len(queries), -1, dtype=np.intp)
+        by_id = np.array([isinstance(q, int) and not isinstance(q, bool) for q in queries], dtype=bool)
+        ids = np.array([q for q, i in zip(queries, by_id) if i], dtype=np.int64)
+        rows[by_id] = np.where((ids >= 0) & (ids < len(self)), ids, -1)
+        with metrics.stage('index_lookup'):
+            rows[~by_id] = self.title_index.get_many([str(q) for q, i in zip(queries, by_id) if not i])
+        return rows
+
+    def similar_many(self, rows, n=10):
+        """
+        Neighbour titles of many catalog rows at once, computed in one vectorized lookup.
+
+        Args:
+            rows (array-like of int): Catalog row ids, e.g. from title_index.get_many.
+            n (int): Number of neighbours per row.
+
+        Returns:
+            list of list of str: The n most similar titles of every row, most similar first.
+        """
+        with metrics.stage('top_k'):
+            neighbor_ids, _ = self.neighbors.neighbors_many(rows, n)
+        return [[self.titles[a] for a in ids if a >= 0] for ids in neighbor_ids.tolist()]
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+
+
+# bytes of the buffer decoded at once when iterating over a table
+ITER_BLOCK_BYTES = 1 << 20
+
+
+class StringTable:
+    """
+    Immutable list of strings stored as one contiguous UTF-8 buffer plus an offsets array.
+
+    String i is buffer[offsets[i]:offsets[i + 1]]. Both arrays can be saved as .npy files and
+    memory-mapped back, so every worker process shares the same pages instead of holding its
+    own Python string objects.
+    """
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        Pack an iterable of strings (non-strings are converted with str()).
+        """
+        encoded = [str(s).encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(buffer, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.buffer[start:stop].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        # one block of whole strings (about ITER_BLOCK_BYTES) is copied out of the buffer at a time,
+        # never the whole memory-mapped buffer
+        n = len(self)
+        i = 0
+        while i < n:
+            base = int(self.offsets[i])
+            j = int(np.searchsorted(self.offsets, base + ITER_BLOCK_BYTES, side='right')) - 1
+            j = min(max(j, i + 1), n)
+            data = self.buffer[base:int(self.offsets[j])].tobytes()
+            offsets = (self.offsets[i:j + 1] - base).tolist()
+            for start, stop in zip(offsets, offsets[1:]):
+                yield data[start:stop].decode('utf-8')
+            i = j
+
+    def tolist(self):
+        return list(self)
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes + self.offsets.nbytes
+
+    def save(self, directory, name):
+        """
+        Write the table as <name>.bin.npy and <name>.offsets.npy inside directory.
+        """
+        np.save(os.path.join(directory, f'{name}.bin.npy'), self.buffer)
+        np.save(os.path.join(directory, f'{name}.offsets.npy'), self.offsets)
+
+    @classmethod
+    def load(cls, directory, name, mmap_mode='r'):
+        """
+        Load a table written by save(), memory-mapped by default.
+        """
+        buffer = np.load(os.path.join(directory, f'{name}.bin.npy'), mmap_mode=mmap_mode)
+        offsets = np.load(os.path.join(directory, f'{name}.offsets.npy'), mmap_mode=mmap_mode)
+        return cls(buffer, offsets)
@@ -2,11 +2,19 @@ import pandas as pd
 import numpy as np
 import nltk
 from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
 from sklearn import naive_bayes
 from sklearn.metrics import accuracy_score
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
 import pickle
+import resource
+import sys
+import time
 
 
 class SentimentAnalysis:
@@ -61,6 +69,173 @@ class SentimentAnalysis:
         return accuracy
 
 
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size of this process (or of its largest worker) in MB."""
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+# per worker process: the stateless hashing vectorizer and, once known, the idf weighting
+_worker = {}
+
+
+def _init_worker(hasher, tfidf):
+    _worker['hasher'] = hasher
+    _worker['tfidf'] = tfidf
+
+
+def _document_frequencies(reviews):
+    """Number of documents and per-feature document frequencies of one chunk."""
+    counts = _worker['hasher'].transform(reviews)
+    counts.sum_duplicates()
+    return len(reviews), np.bincount(counts.indices, minlength=counts.shape[1])
+
+
+def _tfidf(reviews):
+    """TF-IDF features of one chunk."""
+    return _worker['tfidf'].transform(_worker['hasher'].transform(reviews))
+
+
+def bounded_map(pool, fn, items, window):
+    """
+    pool.map that submits at most window items ahead of the consumer, in order.
+
+    Executor.map submits the whole iterable up front, which would read every chunk of the dataset
+    into memory before the first result comes back.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class StreamingSentimentAnalysis:
+    """
+    Out-of-core training of the same TF-IDF + MultinomialNB model, for corpora that do not fit in memory.
+
+    reviews.csv is read in chunks of chunksize rows, three times:
+    1. document frequencies of the hashed terms, summed over chunks, give the idf weights,
+    2. the training rows are turned into TF-IDF features and fed to MultinomialNB.partial_fit,
+    3. the held-out rows (test_size of every chunk, the same in every pass) measure the accuracy.
+    Vectorizing is stateless (HashingVectorizer), so chunks are vectorized in parallel worker
+    processes and only one chunk per worker is in memory at a time. MultinomialNB only sums feature
+    counts, so partial_fit over the chunks ends up with the model a single fit would give.
+
+    transform.pkl is a Pipeline (hashing + tfidf) with the same transform() as the TfidfVectorizer
+    it replaces, so main.py loads both artifacts unchanged.
+    """
+
+    def __init__(self, dataset_path='../reviews.csv', chunksize=20000, workers=None, n_features=2 ** 20,
+                 stopset=None):
+        """Initialize the streaming trainer, stopset defaults to NLTK's english stop words."""
+        self.dataset_path = dataset_path
+        self.chunksize = chunksize
+        self.workers = workers
+        # chunks read ahead of the classifier: enough to keep every worker busy
+        self.window = 2 * (workers or os.cpu_count())
+        self.stopset = stopset if stopset is not None else stopwords.words('english')
+        self.hasher = HashingVectorizer(n_features=n_features, lowercase=True, strip_accents='ascii',
+                                        stop_words=self.stopset, alternate_sign=False, norm=None)
+        self.tfidf = TfidfTransformer(use_idf=True)
+        self.n_docs = 0
+
+    def chunks(self):
+        """Yield the (review, sentiment) chunks of the dataset."""
+        for chunk in pd.read_csv(self.dataset_path, usecols=['review', 'sentiment'], chunksize=self.chunksize):
+            yield chunk.review.tolist(), chunk.sentiment.to_numpy()
+
+    def split(self, chunk_id, n_rows, test_size, random_state):
+        """Test mask of one chunk, identical in every pass."""
+        return np.random.default_rng([random_state, chunk_id]).random(n_rows) < test_size
+
+    def fit_idf(self, pool):
+        """Pass 1: document frequencies -> idf weights, and the set of classes."""
+        df = np.zeros(self.hasher.n_features, dtype=np.int64)
+        classes = set()
+        labels = []
+
+        def reviews():
+            for chunk_reviews, chunk_labels in self.chunks():
+                labels.append(chunk_labels)
+                yield chunk_reviews
+
+        for n_docs, chunk_df in bounded_map(pool, _document_frequencies, reviews(), self.window):
+            self.n_docs += n_docs
+            df += chunk_df
+            classes.update(labels.pop(0).tolist())
+
+        # TfidfVectorizer's smooth_idf formula
+        self.tfidf.idf_ = np.log((1 + self.n_docs) / (1 + df)) + 1
+        self.tfidf.n_features_in_ = self.hasher.n_features
+        return np.array(sorted(classes))
+
+    def stream_features(self, pool, test, test_size, random_state):
+        """Yield (features, labels) of the training (or, with test=True, held-out) rows of every chunk."""
+        labels = []
+
+        def reviews():
+            for chunk_id, (chunk_reviews, chunk_labels) in enumerate(self.chunks()):
+                mask = self.split(chunk_id, len(chunk_reviews), test_size, random_state)
+                if not test:
+                    mask = ~mask
+                labels.append(chunk_labels[mask])
+                yield [review for review, keep in zip(chunk_reviews, mask) if keep]
+
+        for features in bounded_map(pool, _tfidf, reviews(), self.window):
+            yield features, labels.pop(0)
+
+    def run_sentiment_analysis(self, test_size=0.20, random_state=42,
+                               transform_path='../artifact/transform.pkl', model_path='../artifact/sentiment_model.pkl'):
+        """Run the streaming training, save both artifacts and report throughput, peak memory and accuracy."""
+        start = time.perf_counter()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.hasher, None)) as pool:
+            classes = self.fit_idf(pool)
+        idf_seconds = time.perf_counter() - start
+
+        clf = naive_bayes.MultinomialNB()
+        correct = tested = 0
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.hasher, self.tfidf)) as pool:
+            for features, labels in self.stream_features(pool, False, test_size, random_state):
+                if len(labels):
+                    clf.partial_fit(features, labels, classes=classes)
+            train_seconds = time.perf_counter() - start - idf_seconds
+
+            for features, labels in self.stream_features(pool, True, test_size, random_state):
+                if len(labels):
+                    correct += int((clf.predict(features) == labels).sum())
+                    tested += len(labels)
+        seconds = time.perf_counter() - start
+
+        vectorizer = Pipeline([('hashing', self.hasher), ('tfidf', self.tfidf)])
+        pickle.dump(vectorizer, open(transform_path, 'wb'))
+        print(f"Vectorizer transformer saved as {transform_path}")
+        pickle.dump(clf, open(model_path, 'wb'))
+        print(f"Trained model saved as {model_path}")
+
+        accuracy = correct / tested * 100 if tested else float('nan')
+        print(f"{self.n_docs} reviews: idf pass {self.n_docs / idf_seconds:.0f} docs/s, "
+              f"training pass {self.n_docs / train_seconds:.0f} docs/s, {seconds:.1f}s in total")
+        print(f"Peak RSS: {peak_rss_mb():.0f} MB (trainer), {peak_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB (largest worker)")
+        print(f"Model accuracy: {accuracy:.2f}%")
+        return accuracy
+
+
 if __name__ == "__main__":
-    sentiment_analysis = SentimentAnalysis()
+    parser = argparse.ArgumentParser(description="Train the review sentiment model")
+    parser.add_argument("--data", default="../reviews.csv", help="csv with review and sentiment columns")
+    parser.add_argument("--streaming", action="store_true", help="train out-of-core in chunks across worker processes")
+    parser.add_argument("--chunksize", type=int, default=20000, help="streaming: reviews per chunk")
+    parser.add_argument("--workers", type=int, help="streaming: vectorizing processes (default: number of CPUs)")
+    parser.add_argument("--n-features", type=int, default=2 ** 20, help="streaming: hashed feature space size")
+    args = parser.parse_args()
+
+    if args.streaming:
+        sentiment_analysis = StreamingSentimentAnalysis(args.data, chunksize=args.chunksize, workers=args.workers,
+                                                        n_features=args.n_features)
+    else:
+        sentiment_analysis = SentimentAnalysis(args.data)
     sentiment_analysis.run_sentiment_analysis()
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from services import http_client
+from services import metrics
+from services.cache import cache_key
+from services.singleflight import AsyncSingleFlight
+
+
+# connections one event loop may open at once (across hosts), pending requests wait for a free one
+MAX_CONNECTIONS = int(os.environ.get('UPSTREAM_ASYNC_MAX_CONNECTIONS', 512))
+
+_session = None
+# the event loop _session was created on (and may only be used from)
+_session_loop = None
+
+
+def session():
+    """
+    The shared aiohttp.ClientSession of the running event loop, created on first use.
+
+    Timeouts, retries and backoff are the ones of the blocking client (UPSTREAM_* variables); the
+    connection limit is much higher, as a pending request costs a socket instead of a thread.
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        connect_timeout, read_timeout = http_client.DEFAULT_TIMEOUT
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=0),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout))
+        _session_loop = loop
+    return _session
+
+
+async def aclose():
+    """
+    Close the shared session (at application shutdown).
+    """
+    global _session, _session_loop
+    if _session is not None:
+        await _session.close()
+        _session = _session_loop = None
+
+
+def _backoff(attempt, response=None):
+    if response is not None:
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            pass
+    return http_client.BACKOFF_FACTOR * 2 ** attempt
+
+
+async def _send(url, params):
+    # connection errors, throttling and transient server errors are retried with the same
+    # backoff as the blocking client's urllib3 Retry
+    if params:
+        # like requests, parameters set to None are left out
+        params = {name: value for name, value in params.items() if value is not None}
+    for attempt in range(http_client.MAX_RETRIES + 1):
+        last = attempt == http_client.MAX_RETRIES
+        try:
+            response = await session().get(url, params=params)
+        except aiohttp.ClientConnectionError:
+            if last:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        if response.status not in http_client.RETRY_STATUSES or last:
+            return response
+        response.release()
+        await asyncio.sleep(_backoff(attempt, response))
+
+
+@asynccontextmanager
+async def stream(url, params=None):
+    """
+    Non-blocking GET of url whose body is read by the caller, with await response.read() or
+    response.content.iter_chunked().
+
+    Counted and timed (until the headers arrive) in the same upstream metrics as http_client.get.
+    """
+    host = urlsplit(url).netloc
+    status = 'error'
+    try:
+        with metrics.UPSTREAM_IN_FLIGHT.track_in_progress(), metrics.stage('upstream_http'):
+            response = await _send(url, params)
+        status = str(response.status)
+    finally:
+        metrics.UPSTREAM_REQUESTS.inc(host, status)
+    try:
+        yield response
+    finally:
+        response.release()
+
+
+# identical fetches in flight at the same time share one upstream call (see http_client.flights)
+flights = AsyncSingleFlight('async_fetch')
+
+
+async def _fetch_uncached(key, url, params, ttl):
+    body = http_client.cache.get(key)
+    if body is not None:
+        return body
+
+    async with stream(url, params) as response:
+        body = await response.read()
+    if response.ok:
+        http_client.cache.set(key, body, ttl)
+    return body
+
+
+async def fetch(url, params=None, ttl=None):
+    """
+    Non-blocking http_client.fetch: body of GET url, through the same response cache.
+    """
+    key = cache_key(url, params)
+    body = http_client.cache.get(key)
+    if body is not None:
+        return body
+    return await flights.do(key, _fetch_uncached, key, url, params, ttl)
+
+
+async def get_json(url, params=None, ttl=None):
+    """
+    Cached non-blocking GET of a JSON api, see fetch().
+    """
+    return json.loads(await fetch(url, params, ttl))
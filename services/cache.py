@@ -0,0 +1,245 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# query parameters that never take part in a cache key
+IGNORED_PARAMS = frozenset(['api_key'])
+
+
+def cache_key(url, params=None):
+    """
+    Normalised cache key for a GET request: lower-cased scheme/host, query parameters from the url
+    and from params merged and sorted, credentials such as api_key dropped.
+
+    Args:
+        url (str): The request url, possibly with a query string.
+        params (dict): Extra query parameters sent with the request.
+
+    Returns:
+        str: The cache key.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items() if v is not None)
+    query = sorted((k, v) for k, v in query if k not in IGNORED_PARAMS)
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+
+class SQLiteBackend:
+    """
+    Persistent cache storage in a SQLite file, shared by every worker process on the host.
+
+    The file is bounded: every prune_every writes (and when opened), expired rows are deleted and
+    the oldest written rows are evicted until at most max_entries rows and max_bytes of values remain.
+    """
+
+    def __init__(self, path, max_entries=None, max_bytes=None, prune_every=256):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS responses '
+                         '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)')
+        self.prune()
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return (value, expires) or None."""
+        row = self._connection().execute('SELECT value, expires FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= time.time():
+            self.delete(key)
+            return None
+        return bytes(row[0]), row[1]
+
+    def set(self, key, value, expires):
+        # INSERT OR REPLACE gives the row a new rowid, so rowid order is write order
+        self._connection().execute('INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)',
+                                   (key, value, expires))
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM responses')
+
+    def purge_expired(self):
+        self._connection().execute('DELETE FROM responses WHERE expires <= ?', (time.time(),))
+
+    def prune(self):
+        """
+        Delete expired rows, then the oldest written rows beyond max_entries or max_bytes.
+        """
+        conn = self._connection()
+        self.purge_expired()
+        if self.max_entries is not None:
+            conn.execute('DELETE FROM responses WHERE rowid IN '
+                         '(SELECT rowid FROM responses ORDER BY rowid DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        if self.max_bytes is not None:
+            conn.execute('DELETE FROM responses WHERE rowid IN (SELECT rowid FROM '
+                         '(SELECT rowid, SUM(LENGTH(value)) OVER (ORDER BY rowid DESC) AS total FROM responses) '
+                         'WHERE total > ?)', (self.max_bytes,))
+
+    def stats(self):
+        """Rows and bytes of values in the file."""
+        rows, size = self._connection().execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) '
+                                                'FROM responses').fetchone()
+        return {'entries': rows, 'bytes': size}
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache of upstream response bodies (bytes).
+
+    Entries expire after their TTL and the least recently used ones are evicted once either
+    max_entries or max_bytes is exceeded. An optional SQLiteBackend acts as a second level shared
+    across workers: memory misses fall through to it and its hits are promoted into memory.
+    """
+
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=24 * 3600, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()  # key -> (value, expires)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, prefix='RESPONSE_CACHE', max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=24 * 3600):
+        """
+        Build the cache from <prefix>_MAX_ENTRIES, _MAX_BYTES and _TTL environment variables (falling back
+        to the given defaults), <prefix>_PATH enables the SQLite backend, bounded by <prefix>_DISK_MAX_ENTRIES
+        and _DISK_MAX_BYTES (by default the same limits as memory).
+        """
+        path = os.environ.get(f'{prefix}_PATH')
+        max_entries = int(os.environ.get(f'{prefix}_MAX_ENTRIES', max_entries))
+        max_bytes = int(os.environ.get(f'{prefix}_MAX_BYTES', max_bytes))
+        backend = None
+        if path:
+            backend = SQLiteBackend(path, max_entries=int(os.environ.get(f'{prefix}_DISK_MAX_ENTRIES', max_entries)),
+                                    max_bytes=int(os.environ.get(f'{prefix}_DISK_MAX_BYTES', max_bytes)))
+        return cls(max_entries=max_entries, max_bytes=max_bytes, ttl=float(os.environ.get(f'{prefix}_TTL', ttl)),
+                   backend=backend)
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._remove(key)
+
+        stored = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.backend_hits += 1
+            self._insert(key, *stored)
+        return stored[0]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store value (bytes) under key for ttl seconds (default: the cache TTL).
+        """
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._insert(key, value, expires)
+        if self.backend is not None:
+            self.backend.set(key, value, expires)
+
+    def clear(self):
+        """
+        Drop every entry, from memory and from the backend.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        """
+        Counters and current size of the in-memory level.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'backend_hits': self.backend_hits,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def _insert(self, key, value, expires):
+        if len(value) > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (value, expires)
+        self._bytes += len(value)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+
+def cache_metrics(cache, name):
+    """
+    Statistics of cache as (name, type, documentation, value) metrics for services.metrics collectors.
+    """
+    stats = cache.stats()
+    name = f'filmflow_{name}'
+    return [
+        (f'{name}_hits_total', 'counter', 'Lookups served from memory or the backend.', stats['hits']),
+        (f'{name}_misses_total', 'counter', 'Lookups that missed.', stats['misses']),
+        (f'{name}_backend_hits_total', 'counter', 'Hits served by the shared backend.', stats['backend_hits']),
+        (f'{name}_hit_ratio', 'gauge', 'Share of lookups that were hits.', stats['hit_ratio']),
+        (f'{name}_evictions_total', 'counter', 'Entries evicted from memory.', stats['evictions']),
+        (f'{name}_entries', 'gauge', 'Entries held in memory.', stats['entries']),
+        (f'{name}_bytes', 'gauge', 'Bytes held in memory.', stats['bytes']),
+    ]
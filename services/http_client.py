@@ -0,0 +1,120 @@
+import json
+import os
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services import metrics
+from services.cache import ResponseCache, cache_key, cache_metrics
+from services.singleflight import SingleFlight
+
+
+# (connect, read) timeout in seconds for every upstream call
+DEFAULT_TIMEOUT = (float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3.05)),
+                   float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10)))
+
+# number of distinct hosts kept in the pool and keep-alive connections per host
+POOL_CONNECTIONS = int(os.environ.get('UPSTREAM_POOL_CONNECTIONS', 10))
+POOL_MAXSIZE = int(os.environ.get('UPSTREAM_POOL_MAXSIZE', 32))
+
+# retries for connection errors and throttling / transient server errors, with exponential backoff
+MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', 3))
+BACKOFF_FACTOR = float(os.environ.get('UPSTREAM_BACKOFF_FACTOR', 0.3))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                   max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """
+    Create a requests.Session with a keep-alive connection pool and retry/backoff.
+
+    Args:
+        pool_connections (int): Number of per-host pools to cache.
+        pool_maxsize (int): Maximum keep-alive connections kept per host.
+        max_retries (int): Retries on connection errors and RETRY_STATUSES.
+        backoff_factor (float): Exponential backoff factor between retries.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset(['GET', 'HEAD']), respect_retry_after_header=True,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=retry, pool_block=False)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# shared by every route, requests.Session is safe to use from multiple threads for plain GETs
+session = create_session()
+
+
+def get(url, params=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    GET url through the shared pooled session with the default timeout.
+    """
+    host = urlsplit(url).netloc
+    status = 'error'
+    try:
+        with metrics.UPSTREAM_IN_FLIGHT.track_in_progress(), metrics.stage('upstream_http'):
+            response = session.get(url, params=params, timeout=timeout, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        metrics.UPSTREAM_REQUESTS.inc(host, status)
+
+
+# response bodies of successful upstream calls, see services/cache.py
+cache = ResponseCache.from_env()
+metrics.REGISTRY.add_collector(lambda: cache_metrics(cache, 'response_cache'))
+
+# identical fetches in flight at the same time (e.g. a trending title) share one upstream call
+flights = SingleFlight('fetch')
+
+
+def _fetch_uncached(key, url, params, ttl):
+    # the call we waited for may have just filled the cache
+    body = cache.get(key)
+    if body is not None:
+        return body
+
+    response = get(url, params=params)
+    if response.ok:
+        cache.set(key, response.content, ttl)
+    return response.content
+
+
+def fetch(url, params=None, ttl=None):
+    """
+    Return the body (bytes) of GET url, served from the response cache when possible.
+
+    On a cache miss, concurrent fetches of the same cache key wait for a single upstream call and
+    share its body. Only 2xx responses are cached, other bodies are returned as-is (e.g. TMDb's JSON
+    error payloads).
+
+    Args:
+        url (str): The request url.
+        params (dict): Query parameters, api_key is sent but not part of the cache key.
+        ttl (float): Lifetime of the cached body in seconds, defaults to the cache TTL.
+
+    Returns:
+        bytes: The response body.
+    """
+    key = cache_key(url, params)
+    body = cache.get(key)
+    if body is not None:
+        return body
+    return flights.do(key, _fetch_uncached, key, url, params, ttl)
+
+
+def get_json(url, params=None, ttl=None):
+    """
+    Cached GET of a JSON api, see fetch().
+    """
+    return json.loads(fetch(url, params, ttl))
@@ -0,0 +1,50 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Unix only: peak RSS is not reported on Windows
+    resource = None
+
+
+def rss_bytes():
+    """
+    Current resident set size of this process in bytes, None where it cannot be measured.
+
+    Read from /proc/self/statm on Linux; elsewhere falls back to the peak RSS reported by getrusage.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes(children=False):
+    """
+    Peak resident set size of this process (or, with children, of its largest terminated child) in
+    bytes, None without the resource module (Windows).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def format_mb(n_bytes):
+    """
+    n_bytes as megabytes for log lines, "n/a" for a measurement that is not available.
+    """
+    return f"{n_bytes / 2 ** 20:.1f} MB" if n_bytes is not None else "n/a"
+
+
+def log_rss(label, since=None):
+    """
+    Print the worker's current RSS (and the growth since `since` bytes), return the current RSS.
+    """
+    rss = rss_bytes()
+    growth = f" (+{format_mb(rss - since)})" if since is not None and rss is not None else ""
+    print(f"[pid {os.getpid()}] RSS {label}: {format_mb(rss)}{growth}")
+    return rss
@@ -0,0 +1,217 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from services import async_http
+from services import http_client
+from services.reviews import get_reviews, get_reviews_async
+
+
+# overridable to point the app at a local stand-in (benchmarks/replay_server.py)
+TMDB_API_URL = os.environ.get('TMDB_API_URL', 'https://api.themoviedb.org/3')
+TMDB_IMAGE_URL = 'https://image.tmdb.org/t/p/original'
+
+# threads used to fan out the upstream calls of all concurrently built pages
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('MOVIE_PAGE_WORKERS', 32)),
+                              thread_name_prefix='movie-page')
+
+
+def _poster(path):
+    return TMDB_IMAGE_URL + path if path else None
+
+
+def search_movie(title, api_key):
+    """
+    First TMDb search result for title, or None.
+    """
+    response = http_client.get_json(f'{TMDB_API_URL}/search/movie', {'api_key': api_key, 'query': title})
+    results = response.get('results') or []
+    return results[0] if results else None
+
+
+def _top_cast(credits):
+    cast = credits.get('cast') or []
+    return cast[:10] if len(cast) >= 10 else cast[:5]
+
+
+def _cast_payload(cast, bios):
+    return [{
+        'id': member['id'],
+        'name': member.get('name'),
+        'character': member.get('character'),
+        'profile': _poster(member.get('profile_path')),
+        'birthday': bio.get('birthday'),
+        'biography': bio.get('biography'),
+        'place_of_birth': bio.get('place_of_birth'),
+    } for member, bio in zip(cast, bios)]
+
+
+def _reviews_payload(reviews_list, reviews_status, probabilities):
+    return [{'review': review, 'status': status, 'probability': float(probability)}
+            for review, status, probability in zip(reviews_list, reviews_status, probabilities)]
+
+
+def _page(title, match, details, cast, recommended, reviews):
+    return {
+        'title': title,
+        'movie': {
+            'id': match['id'],
+            'imdb_id': details.get('imdb_id'),
+            'title': details.get('original_title'),
+            'poster': _poster(details.get('poster_path')),
+            'overview': details.get('overview'),
+            'rating': details.get('vote_average'),
+            'release_date': details.get('release_date'),
+            'runtime': details.get('runtime'),
+            'genres': [genre.get('name') for genre in details.get('genres') or []],
+        },
+        'cast': cast,
+        'recommended': recommended,
+        'reviews': reviews,
+    }
+
+
+def get_cast(credits, api_key):
+    """
+    Top billed cast members (10 when available, like the browser flow, otherwise up to 5) with
+    their TMDb bios fetched concurrently. A failed bio leaves its fields empty instead of failing the page.
+    """
+    cast = _top_cast(credits)
+
+    def person(member):
+        try:
+            return http_client.get_json(f"{TMDB_API_URL}/person/{member['id']}", {'api_key': api_key})
+        except Exception as e:
+            print("Error fetching cast details:", e)
+            return {}
+
+    return _cast_payload(cast, executor.map(person, cast))
+
+
+def get_recommended(title, api_key):
+    """
+    A similar title with its poster, found through a TMDb search.
+    """
+    try:
+        match = search_movie(title, api_key)
+    except Exception as e:
+        print("Error fetching poster:", e)
+        match = None
+    return {'title': title, 'poster': _poster(match.get('poster_path')) if match else None}
+
+
+def get_reviews_sentiment(imdb_id, sentiment):
+    """
+    Scraped IMDb reviews with their predicted sentiment, empty when the scrape fails.
+    """
+    if not imdb_id:
+        return []
+    try:
+        reviews_list = get_reviews(imdb_id)
+    except Exception as e:
+        print("Error fetching reviews:", e)
+        return []
+    reviews_status, probabilities = sentiment.predict(reviews_list, title_id=imdb_id)
+    return _reviews_payload(reviews_list, reviews_status, probabilities)
+
+
+def build_movie_page(title, similar_titles, sentiment, api_key):
+    """
+    Assemble everything the movie page shows with concurrent upstream calls.
+
+    The TMDb search for the title, and the poster searches for the similar titles, start at once.
+    Details and credits follow as soon as the TMDb id is known, then cast bios and the IMDb review
+    scrape run in parallel, so the page takes about as long as its slowest chain of calls.
+
+    Args:
+        title (str): The requested movie title.
+        similar_titles (list of str): Titles returned by the recommender for it.
+        sentiment (SentimentClassifier): Classifier for the scraped reviews.
+        api_key (str): TMDb api key.
+
+    Returns:
+        dict: The page payload, or None when TMDb does not know the title.
+    """
+    # tasks are only submitted from the calling thread, never from inside the pool, so a busy
+    # pool can not deadlock on its own nested tasks
+    recommended = [executor.submit(get_recommended, similar, api_key) for similar in similar_titles]
+
+    match = search_movie(title, api_key)
+    if match is None:
+        for future in recommended:
+            future.cancel()
+        return None
+
+    movie_url = f"{TMDB_API_URL}/movie/{match['id']}"
+    details = executor.submit(http_client.get_json, movie_url, {'api_key': api_key})
+    credits = executor.submit(http_client.get_json, f'{movie_url}/credits', {'api_key': api_key})
+
+    details = details.result()
+    reviews = executor.submit(get_reviews_sentiment, details.get('imdb_id'), sentiment)
+    cast = get_cast(credits.result(), api_key)
+
+    return _page(title, match, details, cast, [future.result() for future in recommended], reviews.result())
+
+
+async def search_movie_async(title, api_key):
+    response = await async_http.get_json(f'{TMDB_API_URL}/search/movie', {'api_key': api_key, 'query': title})
+    results = response.get('results') or []
+    return results[0] if results else None
+
+
+async def get_cast_async(credits, api_key):
+    cast = _top_cast(credits)
+
+    async def person(member):
+        try:
+            return await async_http.get_json(f"{TMDB_API_URL}/person/{member['id']}", {'api_key': api_key})
+        except Exception as e:
+            print("Error fetching cast details:", e)
+            return {}
+
+    return _cast_payload(cast, await asyncio.gather(*map(person, cast)))
+
+
+async def get_recommended_async(title, api_key):
+    try:
+        match = await search_movie_async(title, api_key)
+    except Exception as e:
+        print("Error fetching poster:", e)
+        match = None
+    return {'title': title, 'poster': _poster(match.get('poster_path')) if match else None}
+
+
+async def get_reviews_sentiment_async(imdb_id, sentiment, cpu_executor):
+    if not imdb_id:
+        return []
+    try:
+        reviews_list = await get_reviews_async(imdb_id)
+    except Exception as e:
+        print("Error fetching reviews:", e)
+        return []
+    reviews_status, probabilities = await asyncio.get_running_loop().run_in_executor(
+        cpu_executor, lambda: sentiment.predict(reviews_list, title_id=imdb_id))
+    return _reviews_payload(reviews_list, reviews_status, probabilities)
+
+
+async def build_movie_page_async(title, similar_titles, sentiment, api_key, cpu_executor=None):
+    """
+    build_movie_page on the event loop: the same chains of upstream calls as tasks instead of
+    threads, non-blocking, with the sentiment prediction run in cpu_executor (the loop's default
+    executor when None).
+    """
+    recommended = [asyncio.ensure_future(get_recommended_async(similar, api_key)) for similar in similar_titles]
+
+    match = await search_movie_async(title, api_key)
+    if match is None:
+        for task in recommended:
+            task.cancel()
+        return None
+
+    movie_url = f"{TMDB_API_URL}/movie/{match['id']}"
+    details, credits = await asyncio.gather(async_http.get_json(movie_url, {'api_key': api_key}),
+                                            async_http.get_json(f'{movie_url}/credits', {'api_key': api_key}))
+    reviews = asyncio.ensure_future(get_reviews_sentiment_async(details.get('imdb_id'), sentiment, cpu_executor))
+    cast = await get_cast_async(credits, api_key)
+
+    return _page(title, match, details, cast, await asyncio.gather(*recommended), await reviews)
@@ -0,0 +1,167 @@
+import json
+import os
+import time
+
+from lxml import etree
+
+from services import async_http
+from services import http_client
+from services import metrics
+from services.cache import cache_key
+from services.singleflight import AsyncSingleFlight, SingleFlight
+
+
+# {} is the imdb id, overridable like TMDB_API_URL in movie_page.py
+IMDB_REVIEWS_URL = os.environ.get('IMDB_REVIEWS_URL', 'https://www.imdb.com/title/{}/reviews?ref_=tt_ov_rt')
+
+# class attribute of the review text nodes on the reviews page
+REVIEW_CLASS = 'text show-more__control'
+
+# reviews kept per title (the first page holds 25) and overall time budget of one scrape in seconds
+REVIEWS_LIMIT = int(os.environ.get('IMDB_REVIEWS_LIMIT', 25))
+REVIEWS_TIMEOUT = float(os.environ.get('IMDB_REVIEWS_TIMEOUT', 5))
+
+# bytes read from the socket and fed to the parser at a time
+CHUNK_SIZE = 16 * 1024
+
+# concurrent scrapes of the same page share one download
+flights = SingleFlight('imdb_reviews')
+async_flights = AsyncSingleFlight('async_imdb_reviews')
+
+
+class ReviewParser:
+    """
+    Incremental extraction of the review texts of an IMDb reviews page, fed one chunk at a time.
+
+    The chunks go to an lxml pull parser that only reports <div> end events; review nodes are read
+    as they complete and every finished div is cleared, so the page is never held as a full tree.
+    Like the former BeautifulSoup `find_all(...)` + `.string`, only reviews made of a single text
+    node are kept.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.parser = etree.HTMLPullParser(events=('end',), tag='div')
+        self.reviews = []
+        self.parse_seconds = 0.0
+
+    def feed(self, chunk):
+        """
+        Parse the next chunk of the page, return True once limit reviews were found.
+        """
+        start = time.perf_counter()
+        self.parser.feed(chunk)
+        for _, element in self.parser.read_events():
+            if element.get('class') == REVIEW_CLASS and len(element) == 0 and element.text:
+                self.reviews.append(element.text)
+            element.clear(keep_tail=True)
+        self.parse_seconds += time.perf_counter() - start
+        return self.limit is not None and len(self.reviews) >= self.limit
+
+    def result(self):
+        """
+        The review texts found so far in page order (at most limit), the parse time goes to the metrics.
+        """
+        metrics.STAGE_LATENCY.observe(self.parse_seconds, 'html_parse')
+        return self.reviews[:self.limit]
+
+
+def extract_reviews(chunks, limit=None, deadline=None):
+    """
+    Pull the review texts out of an IMDb reviews page while it is being downloaded.
+
+    The chunks are fed to a ReviewParser, parsing stops as soon as limit reviews were found or
+    the deadline passed.
+
+    Args:
+        chunks (iterable of bytes): The page body, e.g. response.iter_content().
+        limit (int): Stop after this many reviews, all of them when None.
+        deadline (float): time.monotonic() value after which the partial result is returned.
+
+    Returns:
+        list of str: The review texts in page order.
+    """
+    parser = ReviewParser(limit)
+    for chunk in chunks:
+        if parser.feed(chunk) or (deadline is not None and time.monotonic() > deadline):
+            break
+    return parser.result()
+
+
+async def extract_reviews_async(chunks, limit=None, deadline=None):
+    """
+    extract_reviews over an async iterable of chunks, e.g. response.aiter_bytes().
+    """
+    parser = ReviewParser(limit)
+    async for chunk in chunks:
+        if parser.feed(chunk) or (deadline is not None and time.monotonic() > deadline):
+            break
+    return parser.result()
+
+
+def _scrape(key, url, limit, timeout):
+    # the scrape we waited for may have just filled the cache
+    cached = http_client.cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    deadline = time.monotonic() + timeout
+    # web scraping to get user reviews from IMDB site
+    with http_client.get(url, stream=True) as response:
+        reviews = extract_reviews(response.iter_content(CHUNK_SIZE), limit, deadline)
+
+    # a scrape cut short by the deadline is returned but not cached
+    if response.ok and time.monotonic() <= deadline:
+        http_client.cache.set(key, json.dumps(reviews).encode('utf-8'))
+    return reviews
+
+
+def get_reviews(imdb_id, limit=REVIEWS_LIMIT, timeout=REVIEWS_TIMEOUT):
+    """
+    Scrape the user reviews of a title from its IMDb reviews page.
+
+    The page is streamed through extract_reviews and the connection is closed as soon as limit
+    reviews were read. Complete results are kept in the shared response cache as a small JSON list
+    instead of the page itself, and concurrent scrapes of the same title share one download.
+
+    Args:
+        imdb_id (str): IMDb id of the movie, e.g. "tt0137523".
+        limit (int): Maximum number of reviews, all of the page when None.
+        timeout (float): Seconds after which the reviews read so far are returned.
+
+    Returns:
+        list of str: The review texts in page order.
+    """
+    url = IMDB_REVIEWS_URL.format(imdb_id)
+    key = cache_key(url, {'limit': limit})
+    cached = http_client.cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    # every caller gets its own list
+    return list(flights.do(key, _scrape, key, url, limit, timeout))
+
+
+async def _scrape_async(key, url, limit, timeout):
+    cached = http_client.cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    deadline = time.monotonic() + timeout
+    async with async_http.stream(url) as response:
+        reviews = await extract_reviews_async(response.content.iter_chunked(CHUNK_SIZE), limit, deadline)
+
+    if response.ok and time.monotonic() <= deadline:
+        http_client.cache.set(key, json.dumps(reviews).encode('utf-8'))
+    return reviews
+
+
+async def get_reviews_async(imdb_id, limit=REVIEWS_LIMIT, timeout=REVIEWS_TIMEOUT):
+    """
+    Non-blocking get_reviews for the async serving mode (asgi.py), sharing its cache.
+    """
+    url = IMDB_REVIEWS_URL.format(imdb_id)
+    key = cache_key(url, {'limit': limit})
+    cached = http_client.cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    return list(await async_flights.do(key, _scrape_async, key, url, limit, timeout))
@@ -0,0 +1,368 @@
+import hashlib
+import json
+import os
+import pickle
+import struct
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import logsumexp
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from recommender.strings import StringTable
+from services import metrics
+
+
+# default locations of the trained artifacts (see sentiment-model/naive-bayes.py)
+TRANSFORM_PATH = 'artifact/transform.pkl'
+MODEL_PATH = 'artifact/sentiment_model.pkl'
+# default location of the compact model exported from them (see export_compact_model)
+COMPACT_MODEL_DIR = 'artifact/sentiment'
+
+# bump whenever the compact on-disk layout changes, old exports are then rejected at load time
+COMPACT_FORMAT_VERSION = 1
+COMPACT_MANIFEST = 'manifest.json'
+
+# tokenizer settings shared by the TfidfVectorizer and the HashingVectorizer pipeline
+ANALYZER_PARAMS = ('lowercase', 'strip_accents', 'token_pattern', 'ngram_range', 'stop_words')
+
+# class labels the training data may use for a positive review
+POSITIVE_CLASSES = ('positive', 1, True)
+
+# cached prediction of one review: is_good, P(positive)
+REVIEW_FORMAT = '<?d'
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+FNV_PRIME = np.uint64(0x100000001b3)
+
+
+def _pack(terms):
+    """UTF-8 bytes of terms as one uint8 buffer, plus the start and length of every term."""
+    encoded = [term.encode('utf-8') for term in terms]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    starts = np.zeros(len(encoded), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), starts, lengths
+
+
+def term_hashes(buffer, starts, lengths):
+    """
+    Stable 64-bit FNV-1a hashes of the packed terms, computed one byte position at a time over
+    all terms (so the Python loop runs over the longest term, not over the terms).
+    """
+    hashes = np.full(len(starts), FNV_OFFSET, dtype=np.uint64)
+    order = np.argsort(-lengths, kind='stable')
+    remaining = len(order)
+    for position in range(int(lengths.max()) if len(lengths) else 0):
+        # terms sorted longest first: the ones still active are a prefix of order
+        while lengths[order[remaining - 1]] <= position:
+            remaining -= 1
+        active = order[:remaining]
+        hashes[active] = (hashes[active] ^ buffer[starts[active] + position]) * FNV_PRIME
+    return hashes
+
+
+def _idf(tfidf):
+    try:
+        return tfidf.idf_
+    except AttributeError:
+        # pickled by scikit-learn < 1.5, which kept the weights as a sparse diagonal matrix
+        transformer = getattr(tfidf, '_tfidf', tfidf)
+        return transformer._idf_diag.diagonal()
+
+
+def export_compact_model(vectorizer, clf, directory):
+    """
+    Write a fitted vectorizer and MultinomialNB as a directory of memory-mappable arrays.
+
+    Layout:
+        manifest.json                   format version, tokenizer settings, classes, model version
+        vocabulary.{bin,offsets}.npy    terms in column order (StringTable), TfidfVectorizer only
+        vocabulary.hashes.npy           sorted 64-bit term hashes (uint64) ...
+        vocabulary.columns.npy          ... and the column of each (int32)
+        idf.npy                         idf weights (float32)
+        feature_log_prob_t.npy          (n_features, n_classes) log P(term | class) (float32)
+        class_log_prior.npy             log P(class) (float32)
+
+    The vectorizer is a TfidfVectorizer, or the HashingVectorizer + TfidfTransformer pipeline the
+    streaming trainer saves (which needs no vocabulary). The manifest version is the sha256 of the
+    written arrays, so sentiment cache keys change whenever the model does.
+
+    Args:
+        vectorizer: The fitted transform.pkl object.
+        clf (MultinomialNB): The fitted sentiment_model.pkl object.
+        directory (str): Output directory, created if needed.
+
+    Returns:
+        dict: The manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(vectorizer, CountVectorizer):
+        analyzer, tfidf = vectorizer, vectorizer
+        terms = vectorizer.get_feature_names_out().tolist()
+        hashes = term_hashes(*_pack(terms))
+        order = np.argsort(hashes)
+        if np.any(hashes[order][1:] == hashes[order][:-1]):
+            raise ValueError('vocabulary term hashes collide')
+        StringTable.from_strings(terms).save(directory, 'vocabulary')
+        np.save(os.path.join(directory, 'vocabulary.hashes.npy'), hashes[order])
+        np.save(os.path.join(directory, 'vocabulary.columns.npy'), order.astype(np.int32))
+        kind = 'vocabulary'
+        n_features = len(terms)
+    else:
+        # Pipeline([('hashing', HashingVectorizer), ('tfidf', TfidfTransformer)])
+        analyzer, tfidf = vectorizer.steps[0][1], vectorizer.steps[-1][1]
+        kind = 'hashing'
+        n_features = analyzer.n_features
+
+    arrays = {'feature_log_prob_t': np.ascontiguousarray(clf.feature_log_prob_.T, dtype=np.float32),
+              'class_log_prior': clf.class_log_prior_.astype(np.float32)}
+    if tfidf.use_idf:
+        arrays['idf'] = _idf(tfidf).astype(np.float32)
+    digest = hashlib.sha256()
+    for name, array in sorted(arrays.items()):
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+        digest.update(array.tobytes())
+
+    manifest = {
+        'format_version': COMPACT_FORMAT_VERSION,
+        'kind': kind,
+        'n_features': n_features,
+        'analyzer': {name: getattr(analyzer, name) for name in ANALYZER_PARAMS},
+        'alternate_sign': getattr(analyzer, 'alternate_sign', False),
+        'binary': analyzer.binary,
+        'norm': tfidf.norm,
+        'sublinear_tf': tfidf.sublinear_tf,
+        'classes': clf.classes_.tolist(),
+        'version': digest.hexdigest(),
+    }
+    with open(os.path.join(directory, COMPACT_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class CompactSentimentModel:
+    """
+    TF-IDF + MultinomialNB inference over the arrays written by export_compact_model.
+
+    The arrays are memory-mapped, so worker processes share one copy of the model pages, and loading
+    does not rebuild the vectorizer's vocabulary dict. Terms are looked up once per distinct token
+    of a batch in the sorted hash array (and checked against the vocabulary table), after which
+    scoring is a sparse TF-IDF matrix times the (n_features, n_classes) log-probability array.
+
+    It offers the transform / predict_proba / classes_ subset of the sklearn objects that
+    SentimentClassifier uses, so it stands in for both pickles.
+    """
+
+    def __init__(self, manifest, arrays, vocabulary=None):
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.classes_ = np.array(manifest['classes'])
+        self.n_features = manifest['n_features']
+        self.idf = arrays.get('idf')
+        self.feature_log_prob_t = arrays['feature_log_prob_t']
+        self.class_log_prior = arrays['class_log_prior']
+        self.vocabulary = vocabulary
+        self.hashes = arrays.get('vocabulary.hashes')
+        self.columns = arrays.get('vocabulary.columns')
+
+        params = dict(manifest['analyzer'], ngram_range=tuple(manifest['analyzer']['ngram_range']))
+        if manifest['kind'] == 'hashing':
+            self.hasher = HashingVectorizer(n_features=self.n_features, alternate_sign=manifest['alternate_sign'],
+                                            binary=manifest['binary'], norm=None, dtype=np.float32, **params)
+        else:
+            self.analyzer = CountVectorizer(**params).build_analyzer()
+
+    @classmethod
+    def load(cls, directory=COMPACT_MODEL_DIR, mmap_mode='r'):
+        """
+        Load a model written by export_compact_model, memory-mapped by default.
+        """
+        with open(os.path.join(directory, COMPACT_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != COMPACT_FORMAT_VERSION:
+            raise ValueError(f"unsupported sentiment model format {manifest.get('format_version')} in {directory}")
+
+        names = ['feature_log_prob_t', 'class_log_prior', 'idf', 'vocabulary.hashes', 'vocabulary.columns']
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in names if os.path.exists(os.path.join(directory, f'{name}.npy'))}
+        vocabulary = StringTable.load(directory, 'vocabulary', mmap_mode) if manifest['kind'] == 'vocabulary' else None
+        return cls(manifest, arrays, vocabulary)
+
+    def lookup(self, terms):
+        """
+        Columns of terms as an int array, -1 for the terms not in the vocabulary.
+        """
+        buffer, term_starts, term_lengths = _pack(terms)
+        hashes = term_hashes(buffer, term_starts, term_lengths)
+        positions = np.searchsorted(self.hashes, hashes).clip(max=len(self.hashes) - 1)
+        columns = np.where(self.hashes[positions] == hashes, self.columns[positions], -1).astype(np.intp)
+
+        # the hash hits are compared byte for byte with the vocabulary table, all at once
+        found = np.flatnonzero(columns >= 0)
+        starts = self.vocabulary.offsets[columns[found]]
+        lengths = self.vocabulary.offsets[columns[found] + 1] - starts
+        same_length = lengths == term_lengths[found]
+        columns[found[~same_length]] = -1
+        found, starts, lengths = found[same_length], starts[same_length], lengths[same_length]
+        if len(found):
+            offsets = np.zeros(len(found), dtype=np.int64)
+            np.cumsum(lengths[:-1], out=offsets[1:])
+            within = np.arange(lengths.sum()) - np.repeat(offsets, lengths)
+            differs = self.vocabulary.buffer[np.repeat(starts, lengths) + within] \
+                != buffer[np.repeat(term_starts[found], lengths) + within]
+            columns[found[np.add.reduceat(differs, offsets) > 0]] = -1
+        return columns
+
+    def _counts(self, reviews):
+        if self.manifest['kind'] == 'hashing':
+            return self.hasher.transform(reviews)
+
+        # token ids within the batch, each distinct token is looked up once
+        distinct = {}
+        codes = []
+        indptr = [0]
+        for review in reviews:
+            codes.extend(distinct.setdefault(token, len(distinct)) for token in self.analyzer(review))
+            indptr.append(len(codes))
+        columns = self.lookup(list(distinct))[np.asarray(codes, dtype=np.intp)] if codes else np.empty(0, np.intp)
+        rows = np.repeat(np.arange(len(reviews)), np.diff(indptr))
+        known = columns >= 0
+        counts = sp.csr_matrix((np.ones(known.sum(), dtype=np.float32), (rows[known], columns[known])),
+                               shape=(len(reviews), self.n_features))
+        counts.sum_duplicates()
+        if self.manifest['binary']:
+            counts.data[:] = 1
+        return counts
+
+    def transform(self, reviews):
+        """
+        TF-IDF matrix of the reviews, float32 CSR.
+        """
+        features = self._counts(reviews)
+        if self.manifest['sublinear_tf']:
+            np.log(features.data, out=features.data)
+            features.data += 1
+        if self.idf is not None:
+            features.data *= self.idf[features.indices]
+        if self.manifest['norm']:
+            features = normalize(features, norm=self.manifest['norm'], copy=False)
+        return features
+
+    def predict_proba(self, features):
+        """
+        Class probabilities of TF-IDF rows, in the order of classes_.
+        """
+        jll = np.asarray(features @ self.feature_log_prob_t, dtype=np.float64) + self.class_log_prior
+        return np.exp(jll - logsumexp(jll, axis=1, keepdims=True))
+
+    def predict(self, features):
+        return self.classes_[self.predict_proba(features).argmax(axis=1)]
+
+
+class SentimentClassifier:
+    """
+    Batched inference wrapper around the pickled TF-IDF vectorizer and MultinomialNB model.
+
+    With a cache (a services.cache.ResponseCache), predictions are memoised by content hash: per
+    review, so a review shared by several titles or pages is classified once, and per title, so a
+    title whose reviews did not change is answered with a single lookup. Keys include the version
+    (the sha256 of the model files), so retraining never serves stale predictions.
+    """
+
+    def __init__(self, vectorizer, clf, version=None, cache=None):
+        """Initialize the classifier from a fitted vectorizer and model, caching only when version is set."""
+        self.vectorizer = vectorizer
+        self.clf = clf
+        self.version = version
+        self.cache = cache if version is not None else None
+        classes = list(clf.classes_)
+        self.positive_column = next(i for i, c in enumerate(classes) if c in POSITIVE_CLASSES)
+
+    @classmethod
+    def load(cls, transform_path=TRANSFORM_PATH, model_path=MODEL_PATH, cache=None):
+        """Load the vectorizer and model pickles from disk, versioned by their sha256."""
+        digest = hashlib.sha256()
+        with open(transform_path, 'rb') as f:
+            data = f.read()
+        digest.update(data)
+        vectorizer = pickle.loads(data)
+        with open(model_path, 'rb') as f:
+            data = f.read()
+        digest.update(data)
+        clf = pickle.loads(data)
+        return cls(vectorizer, clf, version=digest.hexdigest(), cache=cache)
+
+    @classmethod
+    def load_compact(cls, directory=COMPACT_MODEL_DIR, cache=None):
+        """Load the memory-mapped model written by export_compact_model, versioned by its manifest."""
+        model = CompactSentimentModel.load(directory)
+        return cls(model, model, version=model.version, cache=cache)
+
+    def _classify(self, reviews):
+        with metrics.stage('vectorize'):
+            movie_vectors = self.vectorizer.transform(reviews)
+        with metrics.stage('predict'):
+            proba = self.clf.predict_proba(movie_vectors)
+        positive = proba[:, self.positive_column]
+
+        # argmax over the class probabilities is exactly what clf.predict returns
+        is_good = proba.argmax(axis=1) == self.positive_column
+        labels = ['Good' if good else 'Bad' for good in is_good]
+        return labels, positive
+
+    def predict(self, reviews, title_id=None):
+        """
+        Classify all reviews, with one vectorizer and one model call for the ones not cached.
+
+        Args:
+            reviews (list of str): The review texts.
+            title_id (str): Optional id of the title (e.g. its IMDb id) the reviews belong to,
+                enables the per-title cache.
+
+        Returns:
+            tuple: (labels, probabilities) where labels are 'Good'/'Bad' strings and probabilities
+            the float array of P(positive), both in the order of reviews.
+        """
+        if len(reviews) == 0:
+            return [], np.empty(0)
+        if self.cache is None:
+            return self._classify(reviews)
+
+        prefix = f'sentiment:{self.version[:16]}'
+        digests = [_digest(review) for review in reviews]
+        title_key = None
+        if title_id is not None:
+            title_key = f'{prefix}:title:{title_id}:{_digest("".join(digests))}'
+            cached = self.cache.get(title_key)
+            if cached is not None:
+                labels, probabilities = json.loads(cached)
+                return labels, np.asarray(probabilities)
+
+        keys = [f'{prefix}:review:{digest}' for digest in digests]
+        labels = [None] * len(reviews)
+        probabilities = np.empty(len(reviews))
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(i)
+                continue
+            good, probabilities[i] = struct.unpack(REVIEW_FORMAT, cached)
+            labels[i] = 'Good' if good else 'Bad'
+
+        if missing:
+            new_labels, new_probabilities = self._classify([reviews[i] for i in missing])
+            for i, label, probability in zip(missing, new_labels, new_probabilities):
+                labels[i], probabilities[i] = label, probability
+                self.cache.set(keys[i], struct.pack(REVIEW_FORMAT, label == 'Good', probability))
+
+        if title_key is not None:
+            self.cache.set(title_key, json.dumps([labels, probabilities.tolist()]).encode('utf-8'))
+        return labels, probabilities
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+from services import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Duplicate call suppression: concurrent calls with the same key share one execution.
+
+    The first caller of a key (the leader) runs the function, callers arriving while it is in flight
+    (followers) wait for it and get the same result, or the same exception. Nothing is kept once the
+    call returns, a later call with the key runs again (caching is the response cache's job).
+
+    Calls are counted in metrics.SINGLE_FLIGHT_CALLS by group name and role, the follower count is
+    the number of calls collapsed into another one.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Return fn(*args, **kwargs), sharing the execution with the concurrent calls of the same key.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.SINGLE_FLIGHT_CALLS.inc(self.name, 'follower')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.SINGLE_FLIGHT_CALLS.inc(self.name, 'leader')
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """
+        Number of keys currently being fetched.
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop (see services/async_http.py).
+
+    The leader's call runs as its own task that every caller awaits through asyncio.shield, so a
+    caller that goes away (e.g. a client disconnect cancelling its request) never cancels the fetch
+    the others are waiting for.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Return await fn(*args, **kwargs), sharing the execution with the concurrent calls of the same key.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            metrics.SINGLE_FLIGHT_CALLS.inc(self.name, 'leader')
+            task = self._calls[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            task.add_done_callback(lambda done: self._done(key, done))
+        else:
+            metrics.SINGLE_FLIGHT_CALLS.inc(self.name, 'follower')
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        del self._calls[key]
+        # retrieved here, in case every caller was cancelled before the task failed
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self):
+        """
+        Number of keys currently being fetched.
+        """
+        return len(self._calls)
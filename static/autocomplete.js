@@ -1,35 +1,51 @@
 let films_title = [];
+let suggestRequest = null;
+let suggestTimer = null;
 
-function MoviesTitle() {
-  $.ajax({
-    url: "/titles",
+// Ask the server for the best matches of the typed text instead of filtering the whole catalog here
+function suggestTitles(input) {
+  if (suggestRequest) {
+    suggestRequest.abort();
+  }
+  suggestRequest = $.ajax({
+    url: "/titles/suggest",
     type: "GET",
-    contentType: "application/json",
+    data: { q: input, limit: 10 },
     success: function (response) {
+      // ignore answers for text that is no longer in the box
+      if (inputBox.value !== input) {
+        return;
+      }
       films_title = response;
-
-      // Attach event listener after updating films_title array
-      inputBox.onkeyup = function () {
-        let result = [];
-        let input = inputBox.value;
-
-        if (input.length > 0) {
-          result = films_title.filter((title) => {
-            return title.toLowerCase().includes(input.toLowerCase());
-          });
-          displayResult(result);
-        }
-        if (!result.length) {
-          resultBox.innerHTML = "";
-        }
-      };
+      if (response.length) {
+        displayResult(response);
+      } else {
+        resultBox.innerHTML = "";
+      }
     },
     error: function (error) {
-      console.log(error);
+      if (error.statusText !== "abort") {
+        console.log(error);
+      }
     },
   });
 }
 
+function MoviesTitle() {
+  inputBox.onkeyup = function () {
+    let input = inputBox.value;
+
+    clearTimeout(suggestTimer);
+    if (input.trim().length > 0) {
+      // debounce so fast typing sends one request
+      suggestTimer = setTimeout(() => suggestTitles(input), 120);
+    } else {
+      films_title = [];
+      resultBox.innerHTML = "";
+    }
+  };
+}
+
 const resultBox = document.querySelector(".result-box");
 const inputBox = document.getElementById("input-box");
 
@@ -61,5 +77,5 @@ function selectItem(element) {
   resultBox.innerHTML = "";
 }
 
-// Get Movies title
+// Attach the autocomplete handler
 MoviesTitle();
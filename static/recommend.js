@@ -73,6 +73,9 @@ function getSimilarMovies(title) {
       },
       error: function (error) {
         console.error("Error in getSimilarMovies:", error);
+        if (error.status === 404) {
+          alert("Movie not found in our database");
+        }
         reject(error); // Reject the Promise with the error
 
         $("#loader").delay(500).fadeOut();
@@ -313,9 +316,9 @@ function searchMovie() {
   console.log("Search for movie started");
   let title = inputBox.value;
   console.log("title", title);
-  // if title not in films_title
+  // the catalog is no longer shipped to the browser, /similar reports unknown titles
 
-  if (title == "" || title == null || !films_title.includes(title)) {
+  if (title == "" || title == null) {
     alert("Movie not found in our database");
   } else {
     console.log("Movie found in our database", title);